@@ -0,0 +1,103 @@
+"""
+Segmenty archiwum tłumaczeń: zamiast jednego małego TXT na tłumaczenie rekordy są dopisywane
+do plików data/translations/{lang}/seg-NNNNNN.zseg (limit rozmiaru, potem nowy segment).
+
+Ramka rekordu: MAGIC | len(nagłówka) | len(danych) | nagłówek JSON | treść TXT skompresowana zlib.
+Każda ramka jest niezależna — odczyt jednego rekordu to seek + read + decompress (offset i długość
+trzyma indeks archive.db), a nagłówek (lang, filename) pozwala odbudować indeks skanem segmentów.
+
+Dopisywanie nie jest synchronizowane tutaj — wołający trzyma blokadę zapisu (BEGIN IMMEDIATE na archive.db).
+
+ENV: ARCHIVE_SEGMENT_MAX_MB — rozmiar, po którym zaczynamy nowy segment (64).
+"""
+import json
+import mmap
+import os
+import re
+import struct
+import zlib
+from typing import Iterator, Optional, Tuple
+
+MAGIC = b"ENZ1"
+_FRAME = struct.Struct(">4sII")
+SEGMENT_EXT = ".zseg"
+_SEGMENT_RE = re.compile(r"^seg-(\d{6})\.zseg$")
+
+
+def segment_max_bytes() -> int:
+    try:
+        return int(float(os.environ.get("ARCHIVE_SEGMENT_MAX_MB") or 64) * 1024 * 1024)
+    except ValueError:
+        return 64 * 1024 * 1024
+
+
+def list_segments(lang_dir: str) -> list:
+    if not os.path.isdir(lang_dir):
+        return []
+    return sorted(n for n in os.listdir(lang_dir) if _SEGMENT_RE.match(n))
+
+
+def encode_frame(meta: dict, text: str) -> bytes:
+    header = json.dumps(meta, ensure_ascii=False).encode("utf-8")
+    payload = zlib.compress(text.encode("utf-8"), 6)
+    return _FRAME.pack(MAGIC, len(header), len(payload)) + header + payload
+
+
+def _decode(frame: bytes) -> Tuple[dict, str]:
+    magic, hlen, plen = _FRAME.unpack_from(frame)
+    if magic != MAGIC or len(frame) < _FRAME.size + hlen + plen:
+        raise ValueError("Uszkodzona ramka segmentu")
+    start = _FRAME.size
+    meta = json.loads(frame[start:start + hlen].decode("utf-8"))
+    text = zlib.decompress(frame[start + hlen:start + hlen + plen]).decode("utf-8")
+    return meta, text
+
+
+def append(lang_dir: str, meta: dict, text: str) -> Tuple[str, int, int]:
+    """Dopisuje rekord do bieżącego segmentu. Zwraca (segment, offset, długość ramki)."""
+    os.makedirs(lang_dir, exist_ok=True)
+    segments = list_segments(lang_dir)
+    name = segments[-1] if segments else "seg-000001.zseg"
+    path = os.path.join(lang_dir, name)
+    if os.path.exists(path) and os.path.getsize(path) >= segment_max_bytes():
+        name = f"seg-{int(_SEGMENT_RE.match(name).group(1)) + 1:06d}{SEGMENT_EXT}"
+    frame = encode_frame(meta, text)
+    with open(os.path.join(lang_dir, name), "ab") as f:
+        offset = f.seek(0, os.SEEK_END)
+        f.write(frame)
+    return name, offset, len(frame)
+
+
+def read_record(lang_dir: str, segment: str, offset: int, length: int) -> str:
+    with open(os.path.join(lang_dir, os.path.basename(segment)), "rb") as f:
+        f.seek(offset)
+        return _decode(f.read(length))[1]
+
+
+def iter_records(path: str) -> Iterator[Tuple[int, int, dict, str]]:
+    """(offset, długość, nagłówek, tekst) dla każdej ramki; uszkodzone fragmenty są pomijane."""
+    if not os.path.getsize(path):
+        return
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        yield from _scan(data)
+
+
+def _scan(data) -> Iterator[Tuple[int, int, dict, str]]:
+    pos = 0
+    while pos + _FRAME.size <= len(data):
+        magic, hlen, plen = _FRAME.unpack_from(data, pos)
+        length = _FRAME.size + hlen + plen
+        frame: Optional[bytes] = data[pos:pos + length] if magic == MAGIC else None
+        try:
+            if frame is None:
+                raise ValueError
+            meta, text = _decode(frame)
+        except (ValueError, zlib.error, UnicodeDecodeError):
+            # np. niedokończony zapis po awarii — szukamy następnej ramki
+            nxt = data.find(MAGIC, pos + 1)
+            if nxt < 0:
+                break
+            pos = nxt
+            continue
+        yield pos, length, meta, text
+        pos += length
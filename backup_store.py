@@ -0,0 +1,357 @@
+"""
+Przyrostowy backup data/ z deduplikacją (content-addressed store):
+- pliki dzielone na kawałki (CHUNK_SIZE), każdy zapisany raz jako chunks/<sha256[:2]>/<sha256>.zlib,
+- snapshot = manifest JSON (manifests/<id>.json): ścieżka → rozmiar, mtime, lista hashy kawałków,
+- pliki z niezmienionym rozmiarem i mtime nie są nawet czytane (filecache.json), więc czas snapshotu
+  zależy od tego, co się zmieniło, a nie od rozmiaru całego data/,
+- retencja (ostatnie N + dzienne + tygodniowe, osobno dla każdego scope) i gc nieużywanych kawałków.
+
+Store leży w data/backup/store — trafia do backupu ZIP, sam nie jest snapshotowany.
+
+CLI:
+    python backup_store.py snapshot [--label TEKST]
+    python backup_store.py list
+    python backup_store.py restore <id> [--to KATALOG] [--path data/glossary_de.csv ...]
+    python backup_store.py prune [--keep-last N] [--keep-daily N] [--keep-weekly N]
+    python backup_store.py verify
+
+ENV: BACKUP_STORE_DIR, BACKUP_STORE_KEEP_LAST (10), BACKUP_STORE_KEEP_DAILY (14), BACKUP_STORE_KEEP_WEEKLY (8)
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
+from typing import Callable, Dict, Iterable, List, Optional
+
+DATA_DIR = "data"
+STORE_DIR = os.environ.get("BACKUP_STORE_DIR") or os.path.join(DATA_DIR, "backup", "store")
+CHUNK_SIZE = 1024 * 1024
+# pliki pomocnicze SQLite (WAL / journal) — snapshot bazy już je uwzględnia
+SKIP_SUFFIXES = ("-wal", "-shm", "-journal")
+
+# snapshot i gc w jednym procesie nie mogą się przeplatać (gc usunąłby świeże kawałki)
+_lock = threading.Lock()
+
+
+def _chunks_dir() -> str:
+    return os.path.join(STORE_DIR, "chunks")
+
+
+def _manifests_dir() -> str:
+    return os.path.join(STORE_DIR, "manifests")
+
+
+def _chunk_path(digest: str) -> str:
+    return os.path.join(_chunks_dir(), digest[:2], f"{digest}.zlib")
+
+
+def _write_atomic(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex[:8]}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _put_chunk(data: bytes) -> tuple:
+    """Zapisuje kawałek, jeśli go jeszcze nie ma. Zwraca (hash, czy_nowy)."""
+    digest = hashlib.sha256(data).hexdigest()
+    path = _chunk_path(digest)
+    if os.path.exists(path):
+        return digest, False
+    _write_atomic(path, zlib.compress(data, 6))
+    return digest, True
+
+
+def _get_chunk(digest: str) -> bytes:
+    with open(_chunk_path(digest), "rb") as f:
+        data = zlib.decompress(f.read())
+    if hashlib.sha256(data).hexdigest() != digest:
+        raise ValueError(f"Uszkodzony kawałek: {digest}")
+    return data
+
+
+def _is_sqlite(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(16) == b"SQLite format 3\x00"
+    except OSError:
+        return False
+
+
+def _mtime_ns(path: str) -> int:
+    # baza w trybie WAL zmienia się w pliku -wal, a nie w samym .db
+    mtimes = [os.stat(path).st_mtime_ns]
+    if os.path.exists(path + "-wal"):
+        mtimes.append(os.stat(path + "-wal").st_mtime_ns)
+    return max(mtimes)
+
+
+def _iter_files(data_dir: str) -> Iterable[str]:
+    store = os.path.abspath(STORE_DIR)
+    for root, dirs, names in os.walk(data_dir):
+        dirs[:] = sorted(d for d in dirs if os.path.abspath(os.path.join(root, d)) != store)
+        for name in sorted(names):
+            if not name.endswith(SKIP_SUFFIXES):
+                yield os.path.join(root, name)
+
+
+def _load_filecache() -> Dict[str, dict]:
+    try:
+        with open(os.path.join(STORE_DIR, "filecache.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _store_file(path: str, stats: dict) -> List[str]:
+    chunks = []
+    with open(path, "rb") as f:
+        while True:
+            data = f.read(CHUNK_SIZE)
+            if not data:
+                break
+            digest, new = _put_chunk(data)
+            chunks.append(digest)
+            if new:
+                stats["new_chunks"] += 1
+                stats["new_bytes"] += len(data)
+    return chunks
+
+
+def create_snapshot(
+    paths: Optional[List[str]] = None,
+    label: str = "",
+    scope: str = "data",
+    data_dir: str = DATA_DIR,
+    progress: Optional[Callable[[int, int, str], None]] = None,
+) -> dict:
+    """
+    Snapshot całego data_dir albo tylko wskazanych plików (paths — np. glossary przed overwrite).
+    scope grupuje snapshoty dla retencji. progress(done, total, plik). Zwraca manifest.
+    """
+    with _lock:
+        files = list(_iter_files(data_dir)) if paths is None else [p for p in paths if os.path.isfile(p)]
+        filecache = _load_filecache()
+        stats = {"files": len(files), "changed_files": 0, "new_chunks": 0, "new_bytes": 0, "total_bytes": 0}
+        entries = {}
+        snapshot_dir = tempfile.mkdtemp(prefix="enzo-snapshot-db-")
+        try:
+            for i, path in enumerate(files, 1):
+                rel = os.path.relpath(path, data_dir).replace(os.sep, "/")
+                size, mtime = os.path.getsize(path), _mtime_ns(path)
+                cached = filecache.get(rel)
+                if (cached and cached["size"] == size and cached["mtime_ns"] == mtime
+                        and all(os.path.exists(_chunk_path(c)) for c in cached["chunks"])):
+                    entry = cached
+                else:
+                    stats["changed_files"] += 1
+                    if _is_sqlite(path):
+                        # spójna kopia także gdy baza jest w trakcie zapisu
+                        snap = os.path.join(snapshot_dir, "db")
+                        src, dst = sqlite3.connect(path), sqlite3.connect(snap)
+                        try:
+                            src.backup(dst)
+                        finally:
+                            src.close()
+                            dst.close()
+                        chunks = _store_file(snap, stats)
+                        stored = os.path.getsize(snap)
+                        os.remove(snap)
+                    else:
+                        chunks = _store_file(path, stats)
+                        stored = size
+                    # size / mtime_ns: plik w data/ (porównanie z cache), stored_size: bajty w kawałkach
+                    # (kopia backup API bazy SQLite bywa innej wielkości niż plik bazy)
+                    entry = {"size": size, "mtime_ns": mtime, "stored_size": stored, "chunks": chunks}
+                    filecache[rel] = entry
+                entries[rel] = entry
+                stats["total_bytes"] += entry.get("stored_size", entry["size"])
+                if progress:
+                    progress(i, len(files), rel)
+        finally:
+            shutil.rmtree(snapshot_dir, ignore_errors=True)
+
+        created = datetime.now()
+        manifest = {
+            "id": f"{created.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}",
+            "created": created.isoformat(timespec="seconds"),
+            "scope": scope,
+            "label": label,
+            "files": entries,
+            "stats": stats,
+        }
+        _write_atomic(os.path.join(_manifests_dir(), f"{manifest['id']}.json"),
+                      json.dumps(manifest, ensure_ascii=False).encode("utf-8"))
+        if paths is None:
+            # pełny snapshot: pliki usunięte z data/ znikają z cache (ich kawałki może zabrać gc)
+            filecache = {rel: e for rel, e in filecache.items() if rel in entries}
+        _write_atomic(os.path.join(STORE_DIR, "filecache.json"), json.dumps(filecache).encode("utf-8"))
+    return manifest
+
+
+def load_manifest(snapshot_id: str) -> dict:
+    with open(os.path.join(_manifests_dir(), f"{snapshot_id}.json"), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def list_snapshots(scope: Optional[str] = None) -> List[dict]:
+    """Najnowsze pierwsze; bez listy plików (tylko id, created, scope, label, stats)."""
+    out = []
+    if not os.path.isdir(_manifests_dir()):
+        return out
+    for name in os.listdir(_manifests_dir()):
+        if not name.endswith(".json"):
+            continue
+        m = load_manifest(name[:-5])
+        if scope is None or m["scope"] == scope:
+            m.pop("files")
+            out.append(m)
+    return sorted(out, key=lambda m: m["id"], reverse=True)
+
+
+def restore(snapshot_id: str, target_dir: str, only: Optional[List[str]] = None) -> List[str]:
+    """
+    Odtwarza pliki snapshotu w target_dir (ścieżki względne jak w data/). only: wybrane ścieżki
+    (względne albo z prefiksem data/). Zwraca listę zapisanych plików.
+    """
+    manifest = load_manifest(snapshot_id)
+    wanted = None
+    if only:
+        wanted = {os.path.relpath(p, DATA_DIR).replace(os.sep, "/") if p.startswith(DATA_DIR + "/") else p
+                  for p in only}
+    written = []
+    for rel, entry in manifest["files"].items():
+        if wanted is not None and rel not in wanted:
+            continue
+        dest = os.path.join(target_dir, *rel.split("/"))
+        os.makedirs(os.path.dirname(dest) or ".", exist_ok=True)
+        tmp = dest + ".restore.tmp"
+        with open(tmp, "wb") as f:
+            for digest in entry["chunks"]:
+                f.write(_get_chunk(digest))
+        os.replace(tmp, dest)
+        written.append(dest)
+    return written
+
+
+def _keep_ids(snapshots: List[dict], keep_last: int, keep_daily: int, keep_weekly: int) -> set:
+    keep = {m["id"] for m in snapshots[:keep_last]}
+    for fmt, limit in (("%Y-%m-%d", keep_daily), ("%G-W%V", keep_weekly)):
+        periods = set()
+        for m in snapshots:  # najnowsze pierwsze → zostaje ostatni snapshot z danego dnia/tygodnia
+            period = datetime.fromisoformat(m["created"]).strftime(fmt)
+            if period not in periods and len(periods) < limit:
+                periods.add(period)
+                keep.add(m["id"])
+    return keep
+
+
+def prune(keep_last: Optional[int] = None, keep_daily: Optional[int] = None,
+          keep_weekly: Optional[int] = None) -> dict:
+    """Retencja per scope, potem gc kawałków bez odwołań. Zwraca {"removed": [...], "chunks_removed": n}."""
+    keep_last = int(os.environ.get("BACKUP_STORE_KEEP_LAST") or 10) if keep_last is None else keep_last
+    keep_daily = int(os.environ.get("BACKUP_STORE_KEEP_DAILY") or 14) if keep_daily is None else keep_daily
+    keep_weekly = int(os.environ.get("BACKUP_STORE_KEEP_WEEKLY") or 8) if keep_weekly is None else keep_weekly
+    with _lock:
+        by_scope: Dict[str, List[dict]] = {}
+        for m in list_snapshots():
+            by_scope.setdefault(m["scope"], []).append(m)
+        removed = []
+        for snaps in by_scope.values():
+            keep = _keep_ids(snaps, keep_last, keep_daily, keep_weekly)
+            for m in snaps:
+                if m["id"] not in keep:
+                    os.remove(os.path.join(_manifests_dir(), f"{m['id']}.json"))
+                    removed.append(m["id"])
+        chunks_removed = _gc()
+    return {"removed": removed, "chunks_removed": chunks_removed}
+
+
+def _gc() -> int:
+    referenced = set()
+    for m in list_snapshots():
+        for entry in load_manifest(m["id"])["files"].values():
+            referenced.update(entry["chunks"])
+    # filecache też wskazuje na kawałki — bez nich następny snapshot musiałby je zapisać ponownie
+    for entry in _load_filecache().values():
+        referenced.update(entry["chunks"])
+    removed = 0
+    if not os.path.isdir(_chunks_dir()):
+        return removed
+    for root, _, names in os.walk(_chunks_dir()):
+        for name in names:
+            if name.endswith(".zlib") and name[:-5] not in referenced:
+                os.remove(os.path.join(root, name))
+                removed += 1
+    return removed
+
+
+def verify() -> List[str]:
+    """Sprawdza, czy wszystkie kawałki z manifestów istnieją i mają poprawny hash. Zwraca listę problemów."""
+    problems, checked = [], set()
+    for m in list_snapshots():
+        for rel, entry in load_manifest(m["id"])["files"].items():
+            for digest in entry["chunks"]:
+                if digest in checked:
+                    continue
+                checked.add(digest)
+                try:
+                    _get_chunk(digest)
+                except (OSError, ValueError, zlib.error) as e:
+                    problems.append(f"{m['id']} {rel}: {e}")
+    return problems
+
+
+def store_size() -> int:
+    total = 0
+    for root, _, names in os.walk(STORE_DIR):
+        total += sum(os.path.getsize(os.path.join(root, n)) for n in names)
+    return total
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Przyrostowy backup data/ (deduplikacja kawałków).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_snap = sub.add_parser("snapshot")
+    p_snap.add_argument("--label", default="")
+    sub.add_parser("list")
+    p_restore = sub.add_parser("restore")
+    p_restore.add_argument("snapshot_id")
+    p_restore.add_argument("--to", default=None, help="katalog docelowy (domyślnie restore/<id>)")
+    p_restore.add_argument("--path", action="append", help="tylko wybrane pliki (można powtórzyć)")
+    p_prune = sub.add_parser("prune")
+    p_prune.add_argument("--keep-last", type=int)
+    p_prune.add_argument("--keep-daily", type=int)
+    p_prune.add_argument("--keep-weekly", type=int)
+    sub.add_parser("verify")
+    args = ap.parse_args()
+
+    if args.cmd == "snapshot":
+        started = time.perf_counter()
+        m = create_snapshot(label=args.label)
+        print(f"{m['id']}: {m['stats']} ({time.perf_counter() - started:.2f} s)")
+    elif args.cmd == "list":
+        for m in list_snapshots():
+            print(m["id"], m["scope"], m["label"], m["stats"])
+    elif args.cmd == "restore":
+        target = args.to or os.path.join("restore", args.snapshot_id)
+        written = restore(args.snapshot_id, target, args.path)
+        print(f"Odtworzono {len(written)} plików do {target}")
+    elif args.cmd == "prune":
+        print(prune(args.keep_last, args.keep_daily, args.keep_weekly))
+    elif args.cmd == "verify":
+        problems = verify()
+        print("\n".join(problems) or "OK")
+
+
+if __name__ == "__main__":
+    main()
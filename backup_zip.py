@@ -0,0 +1,148 @@
+"""
+Backup ZIP katalogu data/ zapisywany strumieniowo do pliku tymczasowego (pamięć stała niezależnie
+od rozmiaru danych). Pliki już skompresowane trafiają do ZIP bez ponownej kompresji (ZIP_STORED),
+bazy SQLite są kopiowane przez API backup (spójny snapshot także w trakcie zapisu).
+
+Retencja w OUT_DIR: usuwane są tylko gotowe ZIP-y (nie pliki .part backupów w toku) starsze niż
+BACKUP_KEEP_HOURS i poza BACKUP_KEEP_LAST najnowszymi.
+
+Ograniczenie: st.download_button na stronie Data Backup wczytuje cały plik do pamięci serwera —
+strumieniowy jest zapis ZIP, nie pobieranie. Backupy większe niż BACKUP_DOWNLOAD_MAX_MB strona
+pokazuje tylko jako ścieżkę na dysku (kopiowanie np. przez scp).
+
+CLI:
+    python backup_zip.py [plik_docelowy.zip]
+"""
+import time
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import zipfile
+from datetime import datetime
+from typing import Callable, List, Optional, Tuple
+
+DATA_DIR = "data"
+OUT_DIR = os.environ.get("BACKUP_OUT_DIR") or os.path.join(tempfile.gettempdir(), "enzo-backups")
+KEEP_LAST = int(os.environ.get("BACKUP_KEEP_LAST") or 3)
+KEEP_HOURS = float(os.environ.get("BACKUP_KEEP_HOURS") or 24)
+
+# formaty już skompresowane — deflate tylko zużywa CPU
+STORED_EXTENSIONS = {
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar", ".zlib", ".zseg",
+    ".png", ".jpg", ".jpeg", ".gif", ".webp", ".pdf", ".xlsx", ".docx", ".parquet", ".mp4",
+}
+# pliki pomocnicze SQLite (WAL / journal) — snapshot bazy już je uwzględnia
+SKIP_SUFFIXES = ("-wal", "-shm", "-journal")
+CHUNK = 1024 * 1024
+
+
+def list_files(data_dir: str = DATA_DIR) -> List[Tuple[str, int]]:
+    files = []
+    for root, dirs, names in os.walk(data_dir):
+        dirs.sort()
+        for name in sorted(names):
+            if name.endswith(SKIP_SUFFIXES):
+                continue
+            path = os.path.join(root, name)
+            try:
+                files.append((path, os.path.getsize(path)))
+            except OSError:
+                continue
+    return files
+
+
+def _is_sqlite(path: str) -> bool:
+    try:
+        with open(path, "rb") as f:
+            return f.read(16) == b"SQLite format 3\x00"
+    except OSError:
+        return False
+
+
+def _write_file(zipf: zipfile.ZipFile, path: str, arcname: str, on_bytes: Callable[[int], None]) -> None:
+    ext = os.path.splitext(path)[1].lower()
+    compress = zipfile.ZIP_STORED if ext in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+    info = zipfile.ZipInfo.from_file(path, arcname)
+    info.compress_type = compress
+    # kopiowanie kawałkami (zamiast zipf.write) — postęp w bajtach także dla dużych plików
+    with open(path, "rb") as src, zipf.open(info, "w", force_zip64=True) as dst:
+        while True:
+            chunk = src.read(CHUNK)
+            if not chunk:
+                break
+            dst.write(chunk)
+            on_bytes(len(chunk))
+
+
+def _cleanup(out_dir: str, keep: int, keep_hours: float = KEEP_HOURS) -> None:
+    # tylko gotowe .zip — .part należy do backupu w toku (np. z innej sesji); świeże ZIP-y czekają na pobranie
+    done = sorted(
+        (os.path.join(out_dir, n) for n in os.listdir(out_dir)
+         if n.startswith("enzo-translator-backup-") and n.endswith(".zip")),
+        key=os.path.getmtime,
+    )
+    cutoff = time.time() - keep_hours * 3600
+    for path in done[:-keep] if keep > 0 else done:
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def build_backup(
+    dest: Optional[str] = None,
+    data_dir: str = DATA_DIR,
+    progress: Optional[Callable[[int, int, str], None]] = None,
+) -> str:
+    """
+    Zapisuje ZIP do dest (domyślnie OUT_DIR/enzo-translator-backup-<ts>.zip) i zwraca ścieżkę.
+    progress(bytes_done, bytes_total, bieżący plik) — wołane po każdym pliku.
+    """
+    ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
+    if dest is None:
+        os.makedirs(OUT_DIR, exist_ok=True)
+        _cleanup(OUT_DIR, KEEP_LAST - 1)
+        dest = os.path.join(OUT_DIR, f"enzo-translator-backup-{ts}.zip")
+    files = list_files(data_dir)
+    total = sum(size for _, size in files)
+    done = 0
+
+    def on_bytes(n: int) -> None:
+        nonlocal done
+        done += n
+
+    # najpierw do pliku .part — przerwany backup nie wygląda na kompletny
+    part = dest + ".part"
+    snapshot_dir = tempfile.mkdtemp(prefix="enzo-backup-db-")
+    try:
+        with zipfile.ZipFile(part, "w", allowZip64=True) as zipf:
+            for path, _ in files:
+                arcname = os.path.relpath(path, data_dir)
+                if _is_sqlite(path):
+                    snap = os.path.join(snapshot_dir, os.path.basename(path))
+                    src, dst = sqlite3.connect(path), sqlite3.connect(snap)
+                    try:
+                        src.backup(dst)
+                    finally:
+                        src.close()
+                        dst.close()
+                    _write_file(zipf, snap, arcname, on_bytes)
+                    os.remove(snap)
+                else:
+                    _write_file(zipf, path, arcname, on_bytes)
+                if progress:
+                    progress(done, total, arcname)
+        os.replace(part, dest)
+    finally:
+        shutil.rmtree(snapshot_dir, ignore_errors=True)
+        if os.path.exists(part):
+            os.remove(part)
+    return dest
+
+
+if __name__ == "__main__":
+    out = build_backup(sys.argv[1] if len(sys.argv) > 1 else None)
+    print(f"{out} ({os.path.getsize(out) / 1024 / 1024:.1f} MB)")
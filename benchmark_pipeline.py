@@ -0,0 +1,234 @@
+"""
+Powtarzalny benchmark wydajności pipeline'u tłumaczeń (glossary → filtr → prompt → provider → review).
+
+Przykłady:
+    # offline, bez kosztów (mock w procesie, review też mock)
+    LLM_REVIEW_PROVIDER=mock MOCK_LATENCY=lognormal:400:0.5 MOCK_SEED=1 \\
+        python benchmark_pipeline.py --provider mock --lang de --repeat 3 --concurrency 4
+
+    # na żywo + porównanie z poprzednim wynikiem
+    python benchmark_pipeline.py --provider openai --lang de --compare latest --fail-on-regression
+
+Korpus: JSONL z polami name/body (albo title/body, jak requests.jsonl). Wyniki: data/benchmarks/*.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from common import LANGS, build_source
+from llm_metrics import percentile
+from translation_pipeline import load_glossary_df, stage, translate_and_review
+
+RESULTS_DIR = os.path.join("data", "benchmarks")
+DEFAULT_CORPUS = os.path.join("benchmarks", "corpus_pl.jsonl")
+
+STAGES = ["glossary_load", "term_filter", "prompt_build", "translate_call", "precheck", "review_call"]
+
+# metryki porównywane między przebiegami: (klucz, True = większe jest lepsze)
+COMPARED = [
+    ("throughput_per_s", True),
+    ("latency_p50_ms", False),
+    ("latency_p95_ms", False),
+    ("latency_p99_ms", False),
+    ("memory_peak_mb", False),
+]
+
+
+def load_corpus(path: str, limit: Optional[int] = None) -> List[dict]:
+    items = []
+    with open(path, "r", encoding="utf-8") as f:
+        for i, line in enumerate(f):
+            line = line.strip()
+            if not line:
+                continue
+            row = json.loads(line)
+            items.append({
+                "id": str(row.get("id") or row.get("request_id") or i),
+                "name": row.get("name") or row.get("title") or "",
+                "body": row.get("body") or "",
+            })
+            if limit and len(items) >= limit:
+                break
+    return items
+
+
+def run_item(item: dict, args, label: str) -> dict:
+    timings: Dict[str, float] = {}
+    started = time.perf_counter()
+    error = None
+    try:
+        with stage(timings, "source_build"):
+            source = build_source(item["name"], item["body"])
+        translate_and_review(
+            source,
+            lang=args.lang,
+            label=label,
+            provider=args.provider,
+            context=args.context,
+            temperature=args.temperature,
+            review=not args.no_review,
+            # glossary czytamy per element — tak jak robi to strona Translate
+            glossary_df=None,
+            timings=timings,
+        )
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"[:300]
+    return {
+        "id": item["id"],
+        "ok": error is None,
+        "error": error,
+        "total_ms": round((time.perf_counter() - started) * 1000, 2),
+        "stages_ms": {k: round(v, 2) for k, v in timings.items()},
+    }
+
+
+def summarize(items: List[dict], wall_s: float, memory_peak_mb: float) -> dict:
+    ok = [r for r in items if r["ok"]]
+    totals = [r["total_ms"] for r in ok]
+    stages = {}
+    for name in STAGES:
+        values = [r["stages_ms"][name] for r in ok if name in r["stages_ms"]]
+        if values:
+            stages[name] = {
+                "mean_ms": round(sum(values) / len(values), 2),
+                "p50_ms": round(percentile(values, 50), 2),
+                "p95_ms": round(percentile(values, 95), 2),
+            }
+    return {
+        "items": len(items),
+        "errors": len(items) - len(ok),
+        # przy REVIEW_POLICY=adaptive część próbek nie ma review_call
+        "reviewed": sum(1 for r in ok if "review_call" in r["stages_ms"]),
+        "wall_s": round(wall_s, 3),
+        "throughput_per_s": round(len(ok) / wall_s, 3) if wall_s > 0 else None,
+        "latency_p50_ms": round(percentile(totals, 50), 2) if totals else None,
+        "latency_p95_ms": round(percentile(totals, 95), 2) if totals else None,
+        "latency_p99_ms": round(percentile(totals, 99), 2) if totals else None,
+        "memory_peak_mb": round(memory_peak_mb, 2),
+        "stages": stages,
+    }
+
+
+def latest_result(exclude: Optional[str] = None) -> Optional[str]:
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, "bench_*.json")))
+    files = [f for f in files if f != exclude]
+    return files[-1] if files else None
+
+
+def compare(current: dict, previous: dict, threshold_pct: float) -> List[dict]:
+    rows = []
+    for key, higher_is_better in COMPARED:
+        cur, prev = current["summary"].get(key), previous["summary"].get(key)
+        if cur is None or not prev:
+            continue
+        delta_pct = (cur - prev) / prev * 100
+        worse = -delta_pct if higher_is_better else delta_pct
+        rows.append({
+            "metric": key,
+            "previous": prev,
+            "current": cur,
+            "delta_pct": round(delta_pct, 1),
+            "regression": worse > threshold_pct,
+        })
+    return rows
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark wydajności pipeline'u tłumaczeń.")
+    ap.add_argument("--corpus", default=DEFAULT_CORPUS)
+    ap.add_argument("--limit", type=int, default=None, help="tylko N pierwszych próbek")
+    ap.add_argument("--repeat", type=int, default=1, help="ile razy przejść korpus")
+    ap.add_argument("--provider", default="mock", help="openai | gemini | qwen | mock")
+    ap.add_argument("--lang", default="de")
+    ap.add_argument("--context", default="sprzęt fryzjerski, ton profesjonalny")
+    ap.add_argument("--temperature", type=float, default=0.2)
+    ap.add_argument("--concurrency", type=int, default=1)
+    ap.add_argument("--no-review", action="store_true")
+    ap.add_argument("--warmup", type=int, default=1, help="próbki rozgrzewkowe (nieliczone)")
+    ap.add_argument("--tag", default="", help="etykieta przebiegu (np. nazwa brancha)")
+    ap.add_argument("--compare", default=None, help="'latest' albo ścieżka do wcześniejszego wyniku JSON")
+    ap.add_argument("--regression-threshold", type=float, default=10.0, help="próg regresji w %%")
+    ap.add_argument("--fail-on-regression", action="store_true")
+    args = ap.parse_args(argv)
+
+    labels = dict(LANGS)
+    label = labels.get(args.lang, args.lang)
+    corpus = load_corpus(args.corpus, args.limit)
+    if not corpus:
+        print(f"Pusty korpus: {args.corpus}", file=sys.stderr)
+        return 2
+
+    for item in corpus[: args.warmup]:
+        run_item(item, args, label)
+
+    work = corpus * max(1, args.repeat)
+    tracemalloc.start()
+    started = time.perf_counter()
+    if args.concurrency > 1:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            results = list(pool.map(lambda it: run_item(it, args, label), work))
+    else:
+        results = [run_item(it, args, label) for it in work]
+    wall_s = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "tag": args.tag,
+        "config": {
+            "corpus": args.corpus,
+            "corpus_items": len(corpus),
+            "repeat": args.repeat,
+            "provider": args.provider,
+            "lang": args.lang,
+            "concurrency": args.concurrency,
+            "review": not args.no_review,
+            "glossary_terms": int(len(load_glossary_df(args.lang))),
+            "mock_latency": os.environ.get("MOCK_LATENCY") if args.provider == "mock" else None,
+            "python": platform.python_version(),
+        },
+        "summary": summarize(results, wall_s, peak / 1024 / 1024),
+        "items": results,
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"bench_{datetime.now().strftime('%Y%m%d_%H%M%S')}_{args.provider}_{args.lang}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    s = report["summary"]
+    print(f"Wynik: {out_path}")
+    print(f"items={s['items']} errors={s['errors']} reviewed={s.get('reviewed')} wall={s['wall_s']}s throughput={s['throughput_per_s']}/s")
+    print(f"latency p50={s['latency_p50_ms']}ms p95={s['latency_p95_ms']}ms p99={s['latency_p99_ms']}ms "
+          f"memory_peak={s['memory_peak_mb']}MB")
+    for name, vals in s["stages"].items():
+        print(f"  {name:<15} mean={vals['mean_ms']:>9}ms p95={vals['p95_ms']:>9}ms")
+
+    if args.compare:
+        prev_path = latest_result(exclude=out_path) if args.compare == "latest" else args.compare
+        if not prev_path:
+            print("Brak wcześniejszego wyniku do porównania.")
+            return 0
+        with open(prev_path, "r", encoding="utf-8") as f:
+            previous = json.load(f)
+        rows = compare(report, previous, args.regression_threshold)
+        print(f"Porównanie z {prev_path}:")
+        for r in rows:
+            flag = "  <-- REGRESJA" if r["regression"] else ""
+            print(f"  {r['metric']:<17} {r['previous']:>10} -> {r['current']:>10} ({r['delta_pct']:+.1f}%){flag}")
+        if args.fail_on_regression and any(r["regression"] for r in rows):
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
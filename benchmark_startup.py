@@ -0,0 +1,163 @@
+"""
+Benchmark startu aplikacji: czas importu modułów na zimno (osobny proces na pomiar) oraz czas
+pierwszego renderu i kolejnych rerunów stron Streamlit (AppTest, osobny proces na stronę).
+
+Przykłady:
+    python benchmark_startup.py
+    python benchmark_startup.py --repeat 5 --reruns 5 --compare latest
+
+Wyniki: data/benchmarks/startup_*.json
+"""
+import argparse
+import glob
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import List, Optional
+
+RESULTS_DIR = os.path.join("data", "benchmarks")
+
+MODULES = ["common", "jobs", "translations_archive", "llm_providers", "translation_pipeline", "worker_pool"]
+PAGES = [
+    "app.py",
+    "pages/1_Configuration.py",
+    "pages/2_Glossary.py",
+    "pages/3_Translate.py",
+    "pages/4_Glossary_Monitoring.py",
+    "pages/6_Translations_Archive.py",
+    "pages/8_Benchmark.py",
+    "pages/9_LLM_Metrics.py",
+]
+# ciężkie zależności — raport, które z nich wczytał dany import
+HEAVY = ["pandas", "openai", "google.genai", "streamlit"]
+
+_IMPORT_SNIPPET = (
+    "import json, sys, time; t = time.perf_counter(); import {module}; "
+    "print(json.dumps({{'ms': (time.perf_counter() - t) * 1000, "
+    "'loaded': [m for m in {heavy!r} if m in sys.modules]}}))"
+)
+
+
+def measure_import(module: str, repeat: int) -> dict:
+    runs = []
+    loaded: List[str] = []
+    for _ in range(repeat):
+        out = subprocess.run(
+            [sys.executable, "-c", _IMPORT_SNIPPET.format(module=module, heavy=HEAVY)],
+            capture_output=True, text=True,
+        )
+        if out.returncode != 0:
+            return {"error": (out.stderr or out.stdout).strip().splitlines()[-1:]}
+        res = json.loads(out.stdout.strip().splitlines()[-1])
+        runs.append(res["ms"])
+        loaded = res["loaded"]
+    return {"median_ms": round(statistics.median(runs), 1), "min_ms": round(min(runs), 1), "loaded": loaded}
+
+
+def _page_child(page: str, reruns: int) -> None:
+    """Uruchamiane w osobnym procesie: pierwszy render (zimny proces) + reruny."""
+    from streamlit.testing.v1 import AppTest
+
+    started = time.perf_counter()
+    at = AppTest.from_file(os.path.abspath(page), default_timeout=120)
+    at.session_state["target_language"] = "de"
+    at.session_state["target_market_label"] = "Niemiecki (DE)"
+    at.run()
+    first_ms = (time.perf_counter() - started) * 1000
+    rerun_ms = []
+    for _ in range(reruns):
+        t = time.perf_counter()
+        at.run()
+        rerun_ms.append((time.perf_counter() - t) * 1000)
+    print(json.dumps({
+        "first_ms": round(first_ms, 1),
+        "rerun_median_ms": round(statistics.median(rerun_ms), 1) if rerun_ms else None,
+        "exceptions": [e.message for e in at.exception],
+    }))
+
+
+def measure_page(page: str, reruns: int) -> dict:
+    out = subprocess.run(
+        [sys.executable, __file__, "--page-child", page, "--reruns", str(reruns)],
+        capture_output=True, text=True, env={**os.environ, "PYTHONPATH": os.getcwd()},
+    )
+    if out.returncode != 0:
+        return {"error": (out.stderr or out.stdout).strip().splitlines()[-1:]}
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def latest_result(exclude: Optional[str] = None) -> Optional[str]:
+    files = sorted(glob.glob(os.path.join(RESULTS_DIR, "startup_*.json")))
+    files = [f for f in files if f != exclude]
+    return files[-1] if files else None
+
+
+def _delta(prev: Optional[float], cur: Optional[float]) -> str:
+    if not prev or cur is None:
+        return ""
+    return f"({(cur - prev) / prev * 100:+.1f}%)"
+
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(description="Benchmark startu: importy na zimno i czasy renderu stron.")
+    ap.add_argument("--repeat", type=int, default=3, help="pomiary importu na moduł")
+    ap.add_argument("--reruns", type=int, default=3, help="reruny strony po pierwszym renderze")
+    ap.add_argument("--no-pages", action="store_true")
+    ap.add_argument("--tag", default="")
+    ap.add_argument("--compare", default=None, help="'latest' albo ścieżka do wcześniejszego wyniku JSON")
+    ap.add_argument("--page-child", default=None, help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.page_child:
+        _page_child(args.page_child, args.reruns)
+        return 0
+
+    report = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "tag": args.tag,
+        "config": {"repeat": args.repeat, "reruns": args.reruns, "python": platform.python_version()},
+        "imports": {m: measure_import(m, args.repeat) for m in MODULES},
+        "pages": {} if args.no_pages else {p: measure_page(p, args.reruns) for p in PAGES},
+    }
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    out_path = os.path.join(RESULTS_DIR, f"startup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    previous = None
+    if args.compare:
+        prev_path = latest_result(exclude=out_path) if args.compare == "latest" else args.compare
+        if prev_path:
+            with open(prev_path, "r", encoding="utf-8") as f:
+                previous = json.load(f)
+            print(f"Porównanie z {prev_path}")
+
+    print(f"Wynik: {out_path}")
+    print("Import na zimno (mediana):")
+    for m, r in report["imports"].items():
+        if "error" in r:
+            print(f"  {m:<22} błąd: {r['error']}")
+            continue
+        prev = (previous or {}).get("imports", {}).get(m, {}).get("median_ms")
+        print(f"  {m:<22} {r['median_ms']:>8} ms {_delta(prev, r['median_ms']):>9}  ładuje: {', '.join(r['loaded']) or '—'}")
+    if report["pages"]:
+        print("Strony (pierwszy render w nowym procesie / mediana rerunu):")
+    for p, r in report["pages"].items():
+        if "error" in r:
+            print(f"  {p:<34} błąd: {r['error']}")
+            continue
+        prev = (previous or {}).get("pages", {}).get(p, {})
+        print(f"  {p:<34} {r['first_ms']:>8} ms {_delta(prev.get('first_ms'), r['first_ms']):>9}"
+              f" | {r['rerun_median_ms']:>7} ms {_delta(prev.get('rerun_median_ms'), r['rerun_median_ms']):>9}"
+              + (f"  wyjątki: {r['exceptions']}" if r["exceptions"] else ""))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
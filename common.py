@@ -0,0 +1,143 @@
+"""
+Wspólne stałe i helpery glossary dla stron Streamlit, pipeline'u i narzędzi CLI.
+
+Bez importu Streamlit, pandas ładowany dopiero przy pierwszym użyciu — moduł jest tani
+do zaimportowania także w procesach worker_pool i skryptach.
+"""
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING, Iterable, List
+
+from profiling import span
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+DATA_DIR = "data"
+
+LANGS = [
+    ("ro", "Rumuński (RO)"),
+    ("hu", "Węgierski (HU)"),
+    ("el", "Grecki (GR)"),
+    ("de", "Niemiecki (DE)"),
+    ("cs", "Czeski (CZ)"),
+    ("sk", "Słowacki (SK)"),
+    ("nl", "Niderlandzki (NL)"),
+    ("it", "Włoski (IT)"),
+    ("fr", "Francuski (FR)"),
+    ("hr", "Chorwacki (HR)"),
+    ("lt", "Litewski (LT)"),
+    ("fi", "Fiński (FI)"),
+    ("sv", "Szwedzki (SE)"),
+]
+LANG_LABELS = dict(LANGS)
+
+REQUIRED_COLS = ["term_pl", "term_target", "locked", "notes"]
+
+# mapowanie alternatywnych nazw kolumn (importy z różnych źródeł)
+GLOSSARY_RENAME_MAP = {
+    "pl": "term_pl",
+    "source": "term_pl",
+    "term_source": "term_pl",
+    "term": "term_pl",
+    "target": "term_target",
+    "translation": "term_target",
+    "is_locked": "locked",
+}
+
+
+def glossary_path(lang_code: str) -> str:
+    return os.path.join(DATA_DIR, f"glossary_{lang_code}.csv")
+
+
+def build_source(title_pl: str, body_pl: str) -> str:
+    return f"NAME:\n{(title_pl or '').strip()}\n\nBODY:\n{(body_pl or '').strip()}"
+
+
+def parse_locked(value) -> bool:
+    # locked bywa "TRUE"/"FALSE" albo 1/0; bool() na stringu nie zadziała jak chcesz
+    return str(value).strip().lower() in ["true", "1", "yes", "y", "t"]
+
+
+def term_matches(term: str, source_lower: str) -> bool:
+    """Czy termin glossary występuje w tekście (już lower()); terminy ≤ 2 znaków pomijamy."""
+    t = (term or "").strip().lower()
+    return len(t) > 2 and t in source_lower
+
+
+def matched_terms(source: str, terms: Iterable[str]) -> List[str]:
+    """Terminy (lower, bez duplikatów) występujące w tekście źródłowym — klucze indeksu termin → tłumaczenia."""
+    src = (source or "").lower()
+    return sorted({t.strip().lower() for t in terms if term_matches(t, src)})
+
+
+def normalize_glossary_df(df: "pd.DataFrame") -> "pd.DataFrame":
+    """Ujednolica kolumny, typy, trim, usuwa puste i deduplikuje po term_pl (ostatni wygrywa)."""
+    with span("glossary_normalize"):
+        return _normalize_glossary_df(df)
+
+
+def _normalize_glossary_df(df: "pd.DataFrame") -> "pd.DataFrame":
+    df = df.copy()
+    df.columns = [str(c).strip().lower() for c in df.columns]
+    for k, v in GLOSSARY_RENAME_MAP.items():
+        if k in df.columns and v not in df.columns:
+            df = df.rename(columns={k: v})
+
+    for col in REQUIRED_COLS:
+        if col not in df.columns:
+            df[col] = "" if col != "locked" else False
+
+    df = df[REQUIRED_COLS]
+    # puste komórki CSV to NaN — bez fillna zamieniały się w tekst "nan" (i wyglądały na uzupełnione)
+    df["term_pl"] = df["term_pl"].fillna("").astype(str).str.strip()
+    df["term_target"] = df["term_target"].fillna("").astype(str).str.strip()
+    df["notes"] = df["notes"].fillna("").astype(str)
+    df["locked"] = df["locked"].apply(parse_locked)
+
+    df = df[df["term_pl"].str.len() > 0].copy()
+    df = df.drop_duplicates(subset=["term_pl"], keep="last").reset_index(drop=True)
+    return df
+
+
+@lru_cache(maxsize=64)
+def _read_glossary(path: str, mtime_ns: int, size: int) -> "pd.DataFrame":
+    # klucz z mtime/rozmiarem — zapis pliku unieważnia cache bez jawnego czyszczenia
+    import pandas as pd
+
+    return normalize_glossary_df(pd.read_csv(path))
+
+
+def load_glossary(lang_code: str) -> "pd.DataFrame":
+    """Znormalizowane glossary języka (pusty DataFrame, gdy brak pliku). Zwraca kopię — można ją modyfikować."""
+    import pandas as pd
+
+    path = glossary_path(lang_code)
+    with span("glossary_read"):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return pd.DataFrame(columns=REQUIRED_COLS)
+        return _read_glossary(path, st.st_mtime_ns, st.st_size).copy()
+
+
+def save_glossary(lang_code: str, df: "pd.DataFrame") -> str:
+    """
+    Zapis glossary; aktualizuje macierz termin × język (glossary_matrix), a zmiany term_target / locked
+    trafiają do kolejki ponownych tłumaczeń (retranslation).
+    """
+    from glossary_matrix import sync_lang
+    from retranslation import on_glossary_change
+
+    os.makedirs(DATA_DIR, exist_ok=True)
+    path = glossary_path(lang_code)
+    with span("glossary_save"):
+        old = load_glossary(lang_code)
+        new = normalize_glossary_df(df)
+        with span("glossary_write_csv"):
+            new.to_csv(path, index=False)
+        with span("glossary_matrix_sync"):
+            sync_lang(lang_code, new)
+        with span("retranslation_check"):
+            on_glossary_change(lang_code, old, new)
+    return path
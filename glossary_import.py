@@ -0,0 +1,264 @@
+"""
+Strumieniowy import glossary (CSV i TBX) dla dużych termbaz od dostawców:
+- CSV czytany kawałkami (pandas chunksize), TBX przez iterparse z czyszczeniem przetworzonych
+  elementów — w pamięci jest tylko bieżący kawałek i docelowe glossary, a nie cały plik + kopie,
+- każdy wiersz jest walidowany osobno (błędy z numerem wiersza / wpisu, zły wiersz nie przerywa importu),
+- wynik trafia do glossary przez upsert po term_pl i zapis common.save_glossary (macierz pokrycia,
+  ponowne tłumaczenia).
+
+Scal (merge): import nadpisuje term_target / locked / notes istniejących terminów, ale pusty term_target
+z importu nie kasuje istniejącego tłumaczenia. Nadpisz (overwrite): glossary = tylko to, co w imporcie.
+
+CLI (pliki zbyt duże na upload przez przeglądarkę):
+    python glossary_import.py termbase.tbx --lang de [--mode merge|overwrite] [--dry-run]
+"""
+import argparse
+import os
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass, field
+from typing import IO, Callable, Dict, Iterator, List, Optional, Tuple
+
+from common import GLOSSARY_RENAME_MAP, REQUIRED_COLS, load_glossary, save_glossary
+
+CHUNK_ROWS = 20_000
+MAX_ERRORS = 1000  # zapamiętane szczegóły; licznik liczy wszystkie
+
+_LOCKED_VALUES = {"true": True, "1": True, "yes": True, "y": True, "t": True,
+                  "false": False, "0": False, "no": False, "n": False, "f": False, "": False}
+# TBX: status terminu → locked
+_TBX_LOCKED = {"preferredterm-admn-sts", "preferred"}
+_XML_LANG = "{http://www.w3.org/XML/1998/namespace}lang"
+
+Progress = Callable[[int, int, str], None]
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0            # przeczytane wiersze / wpisy
+    added: int = 0
+    updated: int = 0
+    unchanged: int = 0
+    removed: int = 0         # overwrite: terminy, których nie ma w imporcie
+    duplicates: int = 0      # ten sam term_pl kilka razy w imporcie — ostatni wygrywa
+    kept_target: int = 0     # merge: pusty term_target w imporcie, zostało istniejące tłumaczenie
+    error_count: int = 0
+    errors: List[dict] = field(default_factory=list)
+    preview: List[dict] = field(default_factory=list)
+
+    def error(self, row: int, term_pl: str, message: str) -> None:
+        self.error_count += 1
+        if len(self.errors) < MAX_ERRORS:
+            self.errors.append({"row": row, "term_pl": term_pl, "error": message})
+
+
+def detect_format(filename: str) -> str:
+    return "tbx" if os.path.splitext(filename or "")[1].lower() in (".tbx", ".xml") else "csv"
+
+
+def _size(f: IO) -> int:
+    pos = f.tell()
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(pos)
+    return size
+
+
+def validate_row(row_no: int, raw: dict, report: ImportReport) -> Optional[dict]:
+    """Normalizuje jeden wiersz; None (i wpis w report.errors), gdy wiersz trzeba pominąć."""
+    term_pl = str(raw.get("term_pl") or "").strip()
+    if not term_pl:
+        report.error(row_no, "", "pusty term_pl — pominięto")
+        return None
+    target = str(raw.get("term_target") or "").strip()
+    if "\n" in term_pl or "\n" in target:
+        # glossary trafia do promptu linia po linii
+        report.error(row_no, term_pl, "znak nowej linii w terminie — pominięto")
+        return None
+    locked_raw = str(raw.get("locked") if raw.get("locked") is not None else "").strip().lower()
+    locked = _LOCKED_VALUES.get(locked_raw)
+    if locked is None:
+        report.error(row_no, term_pl, f"locked: nieznana wartość {locked_raw!r} — przyjęto False")
+        locked = False
+    return {"term_pl": term_pl, "term_target": target, "locked": locked, "notes": str(raw.get("notes") or "")}
+
+
+def iter_csv(f: IO, report: ImportReport, progress: Optional[Progress] = None,
+             chunk_rows: int = CHUNK_ROWS) -> Iterator[dict]:
+    """Wiersze CSV (kawałkami); kolumny jak w normalize_glossary_df, łącznie z alternatywnymi nazwami."""
+    import pandas as pd
+
+    total = _size(f)
+    row_no = 1  # numer wiersza w pliku (1 = nagłówek)
+    reader = pd.read_csv(f, chunksize=chunk_rows, dtype=str, keep_default_na=False, encoding="utf-8-sig")
+    for chunk in reader:
+        chunk.columns = [str(c).strip().lower() for c in chunk.columns]
+        for k, v in GLOSSARY_RENAME_MAP.items():
+            if k in chunk.columns and v not in chunk.columns:
+                chunk = chunk.rename(columns={k: v})
+        if "term_pl" not in chunk.columns:
+            raise ValueError(f"Brak kolumny term_pl (są: {', '.join(chunk.columns)}).")
+        cols = [c for c in REQUIRED_COLS if c in chunk.columns]
+        for values in chunk[cols].itertuples(index=False, name=None):
+            row_no += 1
+            report.rows += 1
+            row = validate_row(row_no, dict(zip(cols, values)), report)
+            if row is not None:
+                yield row
+        if progress:
+            progress(min(f.tell(), total), total, f"wiersz {row_no}")
+
+
+def _lang_matches(value: str, lang: str) -> bool:
+    value = (value or "").lower()
+    return value == lang or value.startswith(lang + "-") or value.startswith(lang + "_")
+
+
+def _tbx_terms(entry: ET.Element) -> Dict[str, List[Tuple[str, str]]]:
+    """lang → [(termin, status)] dla wpisu TBX (TBX 2 termEntry/langSet/tig i TBX 3 conceptEntry/langSec/termSec)."""
+    out: Dict[str, List[Tuple[str, str]]] = {}
+    for lang_set in entry:
+        if _local(lang_set.tag) not in ("langSet", "langSec"):
+            continue
+        lang = lang_set.get(_XML_LANG) or lang_set.get("lang") or ""
+        for holder in lang_set.iter():
+            if _local(holder.tag) not in ("tig", "ntig", "termSec"):
+                continue
+            term, status = "", ""
+            for el in holder.iter():
+                name = _local(el.tag)
+                if name == "term":
+                    term = "".join(el.itertext()).strip()
+                elif name == "termNote" and el.get("type") == "administrativeStatus":
+                    status = (el.text or "").strip().lower()
+            if term:
+                out.setdefault(lang, []).append((term, status))
+    return out
+
+
+def _local(tag) -> str:
+    return tag.rsplit("}", 1)[-1] if isinstance(tag, str) else ""
+
+
+def _entry_notes(entry: ET.Element) -> str:
+    return "; ".join(
+        (el.text or "").strip() for el in entry.iter()
+        if _local(el.tag) in ("note", "descrip") and (el.text or "").strip()
+    )
+
+
+def iter_tbx(f: IO, lang: str, report: ImportReport, progress: Optional[Progress] = None,
+             source_lang: str = "pl") -> Iterator[dict]:
+    """
+    Wpisy TBX → wiersze glossary: termin w source_lang → term_pl, pierwszy termin w lang → term_target,
+    locked = status preferred w języku docelowym. Wpis bez polskiego terminu jest błędem wiersza.
+    """
+    total = _size(f)
+    entry_no = 0
+    parents: List[ET.Element] = []
+    for event, el in ET.iterparse(f, events=("start", "end")):
+        if event == "start":
+            parents.append(el)
+            continue
+        parents.pop()
+        if _local(el.tag) not in ("termEntry", "conceptEntry"):
+            continue
+        entry_no += 1
+        report.rows += 1
+        terms = _tbx_terms(el)
+        source = next((t for code, items in terms.items() if _lang_matches(code, source_lang) for t in items), None)
+        target = next((t for code, items in terms.items() if _lang_matches(code, lang) for t in items), None)
+        entry_id = el.get("id") or str(entry_no)
+        notes = _entry_notes(el)
+        # przetworzony wpis usuwamy z drzewa — bez tego iterparse trzyma cały dokument
+        if parents:
+            parents[-1].remove(el)
+        if source is None:
+            report.error(entry_no, "", f"wpis {entry_id}: brak terminu w języku {source_lang}")
+            continue
+        row = validate_row(entry_no, {
+            "term_pl": source[0],
+            "term_target": target[0] if target else "",
+            "locked": "true" if target and target[1] in _TBX_LOCKED else "false",
+            "notes": notes,
+        }, report)
+        if row is not None:
+            yield row
+        if progress and entry_no % 1000 == 0:
+            progress(min(f.tell(), total), total, f"wpis {entry_no}")
+    if progress:
+        progress(total, total, f"wpis {entry_no}")
+
+
+def import_glossary(f: IO, lang: str, fmt: str = "csv", mode: str = "merge", dry_run: bool = False,
+                    progress: Optional[Progress] = None, preview_rows: int = 20) -> ImportReport:
+    """
+    Upsert importu do glossary języka (mode: merge | overwrite). dry_run: tylko walidacja i liczniki.
+    Zapis przez common.save_glossary — raz, po przeczytaniu całego pliku.
+    """
+    import pandas as pd
+
+    report = ImportReport()
+    # term_pl → (term_target, locked, notes); krotki zamiast dict — przy setkach tysięcy terminów to połowa pamięci
+    g = load_glossary(lang)
+    current = {pl: (target, locked, notes) for pl, target, locked, notes in zip(
+        g["term_pl"], g["term_target"], g["locked"], g["notes"])}
+    del g
+    store: Dict[str, tuple] = {} if mode == "overwrite" else dict(current)
+    seen = set()
+    rows = iter_tbx(f, lang, report, progress) if fmt == "tbx" else iter_csv(f, report, progress)
+    for row in rows:
+        key = row["term_pl"]
+        if len(report.preview) < preview_rows:
+            report.preview.append(row)
+        if key in seen:
+            report.duplicates += 1
+        seen.add(key)
+        previous = store.get(key)
+        target = row["term_target"]
+        if mode == "merge" and previous is not None and not target:
+            target = previous[0]
+            if target:
+                report.kept_target += 1
+        store[key] = (target, row["locked"], row["notes"])
+
+    # liczniki względem obecnego glossary (nie względem kolejnych wierszy importu)
+    for key in seen:
+        if key not in current:
+            report.added += 1
+        elif current[key] == store[key]:
+            report.unchanged += 1
+        else:
+            report.updated += 1
+    if mode == "overwrite":
+        report.removed = len(current.keys() - seen)
+
+    if not dry_run:
+        save_glossary(lang, pd.DataFrame([(k, *v) for k, v in store.items()], columns=REQUIRED_COLS))
+    return report
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Import glossary z dużego pliku CSV / TBX (strumieniowo).")
+    ap.add_argument("path")
+    ap.add_argument("--lang", required=True, help="kod języka docelowego, np. de")
+    ap.add_argument("--mode", choices=["merge", "overwrite"], default="merge")
+    ap.add_argument("--format", choices=["csv", "tbx"], default=None, help="domyślnie wg rozszerzenia")
+    ap.add_argument("--dry-run", action="store_true", help="tylko walidacja, bez zapisu")
+    args = ap.parse_args()
+
+    def progress(done: int, total: int, current: str) -> None:
+        print(f"\r{done * 100 // max(total, 1):3d}%  {current}", end="", flush=True)
+
+    with open(args.path, "rb") as f:
+        report = import_glossary(f, args.lang, args.format or detect_format(args.path), args.mode,
+                                 dry_run=args.dry_run, progress=progress)
+    print()
+    print(f"Wiersze: {report.rows}, dodane: {report.added}, zmienione: {report.updated}, "
+          f"bez zmian: {report.unchanged}, usunięte: {report.removed}, duplikaty: {report.duplicates}, "
+          f"zostawione tłumaczenia (pusty term_target): {report.kept_target}, błędy: {report.error_count}")
+    for e in report.errors[:50]:
+        print(f"  wiersz {e['row']}: {e['term_pl']!r} — {e['error']}")
+
+
+if __name__ == "__main__":
+    main()
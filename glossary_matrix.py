@@ -0,0 +1,310 @@
+"""
+Macierz termin × język dla wszystkich glossary (data/glossary_matrix.db): jeden wiersz na
+(język, term_pl), aktualizowana przyrostowo przy każdym zapisie glossary (common.save_glossary —
+także seed i import) oraz dociągana z plików CSV zmienionych poza aplikacją (sygnatura mtime/rozmiar).
+
+Dla każdego terminu utrzymywane jest podsumowanie (glossary_terms): w ilu językach jest wiersz,
+ile ma term_target, ile jest locked i w ilu językach tłumaczenie koliduje z innym terminem
+(ten sam term_target dla różnych term_pl). Przeliczane są tylko terminy dotknięte zmianą, więc
+widok pokrycia w Monitoring to zapytania po indeksach, a nie czytanie 13 plików CSV.
+"""
+import os
+import sqlite3
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from common import DATA_DIR, LANGS, glossary_path, load_glossary, parse_locked
+
+DB_PATH = os.path.join(DATA_DIR, "glossary_matrix.db")
+
+# filtry widoku pokrycia
+FILTERS = {
+    "all": "",
+    "gaps": "t.filled < ?",
+    "conflicts": "t.conflicts > 0",
+    "locked_mismatch": "t.locked > 0 AND t.locked < t.langs",
+}
+
+
+def connect_db() -> sqlite3.Connection:
+    os.makedirs(DATA_DIR, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(
+        """
+        CREATE TABLE IF NOT EXISTS glossary_entries (
+            lang TEXT NOT NULL, term_key TEXT NOT NULL, term_pl TEXT NOT NULL,
+            term_target TEXT NOT NULL, target_key TEXT NOT NULL, locked INTEGER NOT NULL,
+            PRIMARY KEY (lang, term_key)
+        ) WITHOUT ROWID;
+        CREATE INDEX IF NOT EXISTS idx_entries_term ON glossary_entries(term_key);
+        CREATE INDEX IF NOT EXISTS idx_entries_target ON glossary_entries(lang, target_key);
+        CREATE TABLE IF NOT EXISTS glossary_terms (
+            term_key TEXT PRIMARY KEY, term_pl TEXT NOT NULL, langs INTEGER NOT NULL,
+            filled INTEGER NOT NULL, locked INTEGER NOT NULL, conflicts INTEGER NOT NULL
+        ) WITHOUT ROWID;
+        CREATE TABLE IF NOT EXISTS glossary_files (
+            lang TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER
+        );
+        """
+    )
+    return conn
+
+
+def _file_signature(lang_code: str) -> Optional[Tuple[int, int]]:
+    try:
+        st = os.stat(glossary_path(lang_code))
+    except FileNotFoundError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _entries(df) -> Dict[str, Tuple[str, str, int]]:
+    """term_key → (term_pl, term_target, locked); warianty wielkości liter — ostatni wygrywa jak w normalize."""
+    out = {}
+    for pl, target, locked in zip(df["term_pl"], df["term_target"], df["locked"]):
+        pl = str(pl).strip()
+        if pl:
+            out[pl.lower()] = (pl, str(target).strip(), int(parse_locked(locked)))
+    return out
+
+
+def _chunks(items: List[str], size: int = 500) -> Iterable[List[str]]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+# term_target używany w danym języku przez więcej niż jeden termin
+_SHARED_TARGETS = (
+    "SELECT lang, target_key FROM glossary_entries WHERE target_key <> ''"
+    " GROUP BY lang, target_key HAVING COUNT(*) > 1"
+)
+# powyżej tylu terminów taniej przeliczyć wszystko jednym zapytaniem niż sprawdzać kolizje per wiersz
+_FULL_REFRESH = 5000
+
+
+def _refresh_terms(conn: sqlite3.Connection, keys: Set[str]) -> None:
+    """Przelicza podsumowania podanych terminów (usuwa te, których nie ma już w żadnym języku)."""
+    if len(keys) > _FULL_REFRESH:
+        conn.execute("DELETE FROM glossary_terms")
+        conn.execute(
+            f"""
+            WITH shared AS ({_SHARED_TARGETS})
+            INSERT INTO glossary_terms (term_key, term_pl, langs, filled, locked, conflicts)
+            SELECT e.term_key, MIN(e.term_pl), COUNT(*), SUM(e.target_key <> ''), SUM(e.locked),
+                   COUNT(s.lang)
+            FROM glossary_entries e LEFT JOIN shared s ON s.lang = e.lang AND s.target_key = e.target_key
+            GROUP BY e.term_key
+            """
+        )
+        return
+    for chunk in _chunks(sorted(keys)):
+        marks = ",".join("?" * len(chunk))
+        conn.execute(f"DELETE FROM glossary_terms WHERE term_key IN ({marks})", chunk)
+        conn.execute(
+            f"""
+            INSERT INTO glossary_terms (term_key, term_pl, langs, filled, locked, conflicts)
+            SELECT e.term_key, MIN(e.term_pl), COUNT(*), SUM(e.target_key <> ''), SUM(e.locked),
+                   SUM(e.target_key <> '' AND EXISTS (
+                       SELECT 1 FROM glossary_entries o
+                       WHERE o.lang = e.lang AND o.target_key = e.target_key AND o.term_key <> e.term_key))
+            FROM glossary_entries e WHERE e.term_key IN ({marks}) GROUP BY e.term_key
+            """,
+            chunk,
+        )
+
+
+def _apply_lang(conn: sqlite3.Connection, lang_code: str, df=None) -> Set[str]:
+    """Zapisuje różnice glossary języka względem bazy (bez commitu). Zwraca terminy do przeliczenia."""
+    new = _entries(df if df is not None else load_glossary(lang_code))
+    old = {
+        r["term_key"]: (r["term_pl"], r["term_target"], r["locked"])
+        for r in conn.execute(
+            "SELECT term_key, term_pl, term_target, locked FROM glossary_entries WHERE lang = ?", (lang_code,)
+        )
+    }
+    upserts = [k for k, v in new.items() if old.get(k) != v]
+    removed = [k for k in old if k not in new]
+
+    # kolizje tłumaczeń: przeliczyć trzeba też terminy dzielące stary lub nowy term_target
+    touched_targets = {old[k][1].lower() for k in upserts + removed if k in old} | {new[k][1].lower() for k in upserts}
+    touched_targets.discard("")
+    touched = set(upserts) | set(removed)
+    for chunk in _chunks(sorted(touched_targets) if len(touched) <= _FULL_REFRESH else []):
+        touched.update(r[0] for r in conn.execute(
+            f"SELECT term_key FROM glossary_entries WHERE lang = ? AND target_key IN ({','.join('?' * len(chunk))})",
+            [lang_code, *chunk],
+        ))
+
+    conn.executemany(
+        "INSERT OR REPLACE INTO glossary_entries (lang, term_key, term_pl, term_target, target_key, locked)"
+        " VALUES (?, ?, ?, ?, ?, ?)",
+        [(lang_code, k, new[k][0], new[k][1], new[k][1].lower(), new[k][2]) for k in upserts],
+    )
+    conn.executemany("DELETE FROM glossary_entries WHERE lang = ? AND term_key = ?", [(lang_code, k) for k in removed])
+
+    sig = _file_signature(lang_code)
+    conn.execute(
+        "INSERT OR REPLACE INTO glossary_files (lang, mtime_ns, size) VALUES (?, ?, ?)",
+        (lang_code, *(sig or (None, None))),
+    )
+    return touched
+
+
+def sync_lang(lang_code: str, df=None) -> int:
+    """
+    Wprowadza glossary języka do macierzy — zapisuje tylko różnice względem tego, co już jest w bazie.
+    df=None: wczytanie z pliku CSV. Zwraca liczbę terminów, których podsumowanie przeliczono.
+    """
+    conn = connect_db()
+    try:
+        touched = _apply_lang(conn, lang_code, df)
+        _refresh_terms(conn, touched)
+        conn.commit()
+        return len(touched)
+    finally:
+        conn.close()
+
+
+def ensure_synced() -> List[str]:
+    """Dociąga języki, których plik CSV zmienił się poza aplikacją (albo macierzy jeszcze nie ma). Zwraca ich kody."""
+    conn = connect_db()
+    try:
+        known = {r["lang"]: (r["mtime_ns"], r["size"]) for r in conn.execute("SELECT * FROM glossary_files")}
+        stale, touched = [], set()
+        for code, _ in LANGS:
+            sig = _file_signature(code)
+            if code not in known or known[code] != (sig or (None, None)):
+                touched |= _apply_lang(conn, code)
+                stale.append(code)
+        # podsumowania raz dla wszystkich języków (pierwsze zbudowanie = jedno zapytanie zbiorcze)
+        _refresh_terms(conn, touched)
+        conn.commit()
+        return stale
+    finally:
+        conn.close()
+
+
+def active_langs(conn: sqlite3.Connection) -> List[str]:
+    """Języki mające jakiekolwiek glossary (w kolejności LANGS)."""
+    return [
+        code for code, _ in LANGS
+        if conn.execute("SELECT 1 FROM glossary_entries WHERE lang = ? LIMIT 1", (code,)).fetchone()
+    ]
+
+
+def language_summary() -> List[dict]:
+    """Per język: wiersze, brakujące terminy (są w innych językach, tu nie ma / pusty term_target), locked, kolizje."""
+    conn = connect_db()
+    try:
+        n_terms = conn.execute("SELECT COUNT(*) FROM glossary_terms").fetchone()[0]
+        rows = conn.execute(
+            f"""
+            WITH shared AS ({_SHARED_TARGETS})
+            SELECT e.lang, COUNT(*) AS rows, SUM(e.target_key <> '') AS filled, SUM(e.locked) AS locked,
+                   COUNT(s.lang) AS conflicts
+            FROM glossary_entries e LEFT JOIN shared s ON s.lang = e.lang AND s.target_key = e.target_key
+            GROUP BY e.lang
+            """
+        ).fetchall()
+    finally:
+        conn.close()
+    by_lang = {r["lang"]: dict(r) for r in rows}
+    return [
+        {**by_lang[code], "missing": n_terms - by_lang[code]["filled"], "coverage": by_lang[code]["filled"] / n_terms}
+        for code, _ in LANGS if code in by_lang and n_terms
+    ]
+
+
+def _where(kind: str, langs: List[str], search: str, missing_in: Optional[str]) -> Tuple[str, list]:
+    clauses, params = [], []
+    if FILTERS.get(kind):
+        clauses.append(FILTERS[kind])
+        if kind == "gaps":
+            params.append(len(langs))
+    if search:
+        clauses.append("t.term_key LIKE ?")
+        params.append(f"%{search.strip().lower()}%")
+    if missing_in:
+        clauses.append(
+            "NOT EXISTS (SELECT 1 FROM glossary_entries e"
+            " WHERE e.lang = ? AND e.term_key = t.term_key AND e.target_key <> '')"
+        )
+        params.append(missing_in)
+    return (" WHERE " + " AND ".join(clauses)) if clauses else "", params
+
+
+def coverage(kind: str = "all", search: str = "", missing_in: Optional[str] = None,
+             limit: int = 500, offset: int = 0) -> dict:
+    """
+    Strona macierzy dla filtra: {"total", "langs", "rows"}; wiersz = termin z kolumną na język
+    (term_target, None gdy brak wiersza, "" gdy pusty) oraz locked_<lang>.
+    kind: all | gaps | conflicts | locked_mismatch; missing_in: tylko terminy bez tłumaczenia w tym języku.
+    """
+    conn = connect_db()
+    try:
+        langs = active_langs(conn)
+        where, params = _where(kind, langs, search, missing_in)
+        total = conn.execute(f"SELECT COUNT(*) FROM glossary_terms t{where}", params).fetchone()[0]
+        terms = conn.execute(
+            f"SELECT t.* FROM glossary_terms t{where} ORDER BY t.term_key LIMIT ? OFFSET ?",
+            [*params, int(limit), int(offset)],
+        ).fetchall()
+        keys = [t["term_key"] for t in terms]
+        cells: Dict[str, dict] = {k: {} for k in keys}
+        for chunk in _chunks(keys):
+            for e in conn.execute(
+                f"SELECT term_key, lang, term_target, locked FROM glossary_entries"
+                f" WHERE term_key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ):
+                cells[e["term_key"]][e["lang"]] = (e["term_target"], bool(e["locked"]))
+    finally:
+        conn.close()
+
+    rows = []
+    for t in terms:
+        row = {"term_pl": t["term_pl"], "filled": t["filled"], "locked": t["locked"], "conflicts": t["conflicts"]}
+        for code in langs:
+            target, locked = cells[t["term_key"]].get(code, (None, False))
+            row[code] = target
+            row[f"locked_{code}"] = locked
+        rows.append(row)
+    return {"total": total, "langs": langs, "rows": rows}
+
+
+def conflicts_for(term_pl: str, max_shown: int = 10) -> List[dict]:
+    """Dla terminu: w których językach jego term_target jest też tłumaczeniem innych terminów (i których)."""
+    key = term_pl.strip().lower()
+    conn = connect_db()
+    try:
+        rows = conn.execute(
+            """
+            SELECT e.lang, e.term_target, o.term_pl
+            FROM glossary_entries e
+            JOIN glossary_entries o ON o.lang = e.lang AND o.target_key = e.target_key AND o.term_key <> e.term_key
+            WHERE e.term_key = ? AND e.target_key <> ''
+            ORDER BY e.lang, o.term_key
+            """,
+            (key,),
+        ).fetchall()
+    finally:
+        conn.close()
+    by_lang: Dict[str, dict] = {}
+    for r in rows:
+        item = by_lang.setdefault(r["lang"], {"lang": r["lang"], "term_target": r["term_target"], "shared_with": []})
+        item["shared_with"].append(r["term_pl"])
+    return [
+        {**item, "count": len(item["shared_with"]),
+         "shared_with": ", ".join(item["shared_with"][:max_shown]) + (" …" if len(item["shared_with"]) > max_shown else "")}
+        for item in by_lang.values()
+    ]
+
+
+def matrix_version() -> str:
+    """Zmienia się przy każdej synchronizacji języka — klucz cache dla stron."""
+    conn = connect_db()
+    try:
+        return ";".join(f"{r[0]}:{r[1]}:{r[2]}" for r in conn.execute("SELECT lang, mtime_ns, size FROM glossary_files ORDER BY lang"))
+    finally:
+        conn.close()
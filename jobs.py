@@ -0,0 +1,353 @@
+"""
+Zadania w tle dla zakładek Translate / Benchmark: wywołania LLM nie blokują skryptu Streamlit,
+więc rerun (kliknięcie widgetu), zmiana zakładki albo odświeżenie przeglądarki nie przerywa pracy.
+
+Stan: data/jobs/jobs.db (SQLite). Pula wątków żyje w procesie serwera (jedna na proces);
+zadania "queued" / "running" z poprzedniego uruchomienia są wznawiane przy starcie puli.
+
+ENV: JOB_WORKERS — ile zadań naraz (domyślnie 4).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, Dict, List, Optional
+
+JOBS_DIR = os.path.join("data", "jobs")
+DB_PATH = os.path.join(JOBS_DIR, "jobs.db")
+
+ACTIVE_STATUSES = ("queued", "running")
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+_handlers: Dict[str, Callable[[dict, "JobContext"], dict]] = {}
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(JOBS_DIR, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        " id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, params_json TEXT NOT NULL,"
+        " result_json TEXT, error TEXT, done INTEGER NOT NULL DEFAULT 0, total INTEGER NOT NULL DEFAULT 0,"
+        " created REAL NOT NULL, started REAL, finished REAL)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created ON jobs(created)")
+    return conn
+
+
+def _update(job_id: str, **fields) -> None:
+    sets = ", ".join(f"{k} = ?" for k in fields)
+    with _lock:
+        conn = _connect()
+        try:
+            conn.execute(f"UPDATE jobs SET {sets} WHERE id = ?", (*fields.values(), job_id))
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def register(kind: str):
+    """Dekorator: handler(params, ctx) -> dict (wynik zapisywany jako result_json)."""
+    def wrap(fn):
+        _handlers[kind] = fn
+        return fn
+    return wrap
+
+
+class JobContext:
+    """Przekazywany do handlera — zapis postępu i częściowych wyników (widoczne w UI od razu)."""
+
+    def __init__(self, job_id: str, previous: Optional[dict] = None):
+        self.job_id = job_id
+        # częściowy wynik przerwanego uruchomienia (restart serwera) — handler może pominąć zrobione kroki
+        self.previous = previous or {}
+
+    def progress(self, done: int, total: int, partial: Optional[dict] = None) -> None:
+        fields = {"done": done, "total": total}
+        if partial is not None:
+            fields["result_json"] = json.dumps(partial, ensure_ascii=False, default=str)
+        _update(self.job_id, **fields)
+
+
+def _pool() -> ThreadPoolExecutor:
+    global _executor
+    with _lock:
+        if _executor is not None:
+            return _executor
+        _executor = ThreadPoolExecutor(
+            max_workers=max(1, int(os.environ.get("JOB_WORKERS") or 4)), thread_name_prefix="job"
+        )
+        conn = _connect()
+        try:
+            # przerwane przez restart serwera — wracają do kolejki
+            resume = [r["id"] for r in conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created"
+            )]
+            conn.execute("UPDATE jobs SET status = 'queued' WHERE status = 'running'")
+            conn.commit()
+        finally:
+            conn.close()
+    for job_id in resume:
+        _executor.submit(_run, job_id)
+    return _executor
+
+
+def _run(job_id: str) -> None:
+    job = get_job(job_id)
+    if job is None or job["status"] not in ACTIVE_STATUSES:
+        return
+    handler = _handlers.get(job["kind"])
+    if handler is None:
+        _update(job_id, status="failed", error=f"Nieznany typ zadania: {job['kind']}", finished=time.time())
+        return
+    # atomowe queued → running: to samo zadanie nie wykona się dwa razy
+    with _lock:
+        conn = _connect()
+        try:
+            claimed = conn.execute(
+                "UPDATE jobs SET status = 'running', started = ? WHERE id = ? AND status = 'queued'",
+                (time.time(), job_id),
+            ).rowcount
+            conn.commit()
+        finally:
+            conn.close()
+    if not claimed:
+        return
+    try:
+        result = handler(job["params"], JobContext(job_id, previous=job.get("result")))
+        _update(job_id, status="done", result_json=json.dumps(result, ensure_ascii=False, default=str),
+                finished=time.time())
+    except Exception as e:
+        _update(job_id, status="failed", error=f"{type(e).__name__}: {e}"[:2000], finished=time.time())
+        traceback.print_exc()
+
+
+def submit(kind: str, params: dict) -> str:
+    if kind not in _handlers:
+        raise ValueError(f"Nieznany typ zadania: {kind}")
+    job_id = f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    pool = _pool()  # najpierw pula (wznowienie starych zadań), potem nowe — inaczej wystartowałoby dwa razy
+    with _lock:
+        conn = _connect()
+        try:
+            conn.execute(
+                "INSERT INTO jobs (id, kind, status, params_json, created) VALUES (?, ?, 'queued', ?, ?)",
+                (job_id, kind, json.dumps(params, ensure_ascii=False), time.time()),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    pool.submit(_run, job_id)
+    return job_id
+
+
+def _row_to_job(row: sqlite3.Row) -> dict:
+    job = dict(row)
+    job["params"] = json.loads(job.pop("params_json") or "{}")
+    job["result"] = json.loads(job.pop("result_json") or "null")
+    end = job["finished"] or time.time()
+    job["elapsed_s"] = round(end - job["started"], 1) if job["started"] else None
+    return job
+
+
+def get_job(job_id: str) -> Optional[dict]:
+    with _lock:
+        conn = _connect()
+        try:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        finally:
+            conn.close()
+    return _row_to_job(row) if row else None
+
+
+def list_jobs(limit: int = 50, kind: Optional[str] = None) -> List[dict]:
+    with _lock:
+        conn = _connect()
+        try:
+            if kind:
+                rows = conn.execute("SELECT * FROM jobs WHERE kind = ? ORDER BY created DESC LIMIT ?", (kind, limit))
+            else:
+                rows = conn.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,))
+            rows = rows.fetchall()
+        finally:
+            conn.close()
+    return [_row_to_job(r) for r in rows]
+
+
+def ensure_started() -> None:
+    """Start puli (i wznowienie przerwanych zadań) — wołane przez strony przy wejściu."""
+    _pool()
+
+
+# -------------------------
+# Handlery
+# -------------------------
+
+@register("translate")
+def _translate_job(params: dict, ctx: JobContext) -> dict:
+    """
+    params: source, title_pl, langs [[code, label], ...], provider, context, temperature.
+    Języki równolegle (TRANSLATE_FANOUT_WORKERS), każdy wynik od razu w archiwum.
+    """
+    from translation_pipeline import stage, translate_and_review
+    from translations_archive import save_translation
+
+    langs = [tuple(x) for x in params["langs"]]
+    source, provider = params["source"], params["provider"]
+    # wznowione po restarcie: języki już zapisane w archiwum nie idą drugi raz
+    previous = ctx.previous.get("langs") or {}
+    results = {
+        code: previous[code] if (previous.get(code) or {}).get("status") == "done"
+        else {"label": label, "status": "queued"}
+        for code, label in langs
+    }
+    todo = [(code, label) for code, label in langs if results[code]["status"] != "done"]
+    done = len(langs) - len(todo)
+    ctx.progress(done, len(langs), {"langs": results})
+    if not todo:
+        return {"langs": results}
+
+    def run_one(code: str, label: str) -> dict:
+        results[code]["status"] = "running"
+        started = time.perf_counter()
+        # czasy etapów wracają w wyniku — panel czasów strony Translate (profiling) pokazuje je per język
+        timings: Dict[str, float] = {}
+        res = translate_and_review(
+            source, lang=code, label=label, provider=provider,
+            context=params.get("context", ""), temperature=float(params.get("temperature", 0.2)),
+            timings=timings,
+        )
+        # provider "auto" → w archiwum provider wybrany przez llm_router
+        with stage(timings, "archive_write"):
+            filename = save_translation(
+                code, label, res["provider"], source, res["translation"], res["review"],
+                title_pl=params.get("title_pl", ""), review_model=res["review_model"],
+                review_parsed=res["review_parsed"], qa=res["qa"], terms=res["matched_terms"],
+            )
+        return {
+            "label": label, "status": "done", "provider": res["provider"], "translation": res["translation"],
+            "review": res["review"],
+            "review_model": res["review_model"], "qa": res["qa"], "filename": filename,
+            "elapsed_s": round(time.perf_counter() - started, 1),
+            "timings_ms": {k: round(v, 1) for k, v in timings.items()},
+        }
+
+    workers = int(os.environ.get("TRANSLATE_FANOUT_WORKERS") or len(todo))
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(todo))), thread_name_prefix="translate-fanout") as pool:
+        futures = {pool.submit(run_one, code, label): code for code, label in todo}
+        for fut in as_completed(futures):
+            code = futures[fut]
+            try:
+                results[code] = fut.result()
+            except Exception as e:
+                # po wyczerpaniu retry (429/5xx) albo przy otwartym circuit breakerze
+                results[code] = {"label": results[code]["label"], "status": "error", "error": str(e)}
+            done += 1
+            ctx.progress(done, len(langs), {"langs": results})
+    return {"langs": results}
+
+
+@register("benchmark")
+def _benchmark_job(params: dict, ctx: JobContext) -> dict:
+    """params: source, lang, label, context, temperature, providers [[code, name], ...]."""
+    from llm_providers import chat_llm
+    from llm_router import record_quality
+    from translation_pipeline import (
+        build_translate_messages,
+        filter_glossary_for_source,
+        fit_glossary_block,
+        load_glossary_df,
+        prompt_glossary_block,
+        run_review,
+    )
+
+    source, lang = params["source"], params["lang"]
+    gdf_all = load_glossary_df(lang)
+    gdf_filtered = filter_glossary_for_source(gdf_all, source)
+    glossary_block = fit_glossary_block(gdf_filtered)
+    # ten sam stały prefiks dla wszystkich providerów (prompt caching; budżet tokenów domyślny, nie per model)
+    messages = build_translate_messages(source, prompt_glossary_block(gdf_all, gdf_filtered), params["label"],
+                                        params.get("context", ""))
+    providers = [tuple(p) for p in params["providers"]]
+    out = {
+        "context": params.get("context", ""),
+        "source": source,
+        "glossary_all_count": int(len(gdf_all)),
+        "glossary_locked_count": int(gdf_all["locked"].sum()) if not gdf_all.empty else 0,
+        "glossary_used": gdf_filtered.to_dict(orient="records"),
+        "results": {},
+    }
+    total, done = 2 * len(providers), 0
+
+    for code, name in providers:
+        started = time.perf_counter()
+        try:
+            translated = chat_llm(provider=code, temperature=float(params.get("temperature", 0.2)), lang=lang,
+                                  messages=messages)
+            out["results"][code] = {"translation": translated, "translate_s": round(time.perf_counter() - started, 2)}
+        except Exception as e:
+            out["results"][code] = {"translation": "", "error": str(e)}
+        done += 1
+        ctx.progress(done, total, out)
+
+    for code, name in providers:
+        res = out["results"][code]
+        if res.get("error"):
+            done += 1
+            continue
+        started = time.perf_counter()
+        try:
+            review, review_parsed = run_review(source, res["translation"], name, glossary_block, lang=lang)
+            res.update({"review": review, "verdict": review_parsed["verdict"],
+                        "confidence": review_parsed["confidence"], "review_s": round(time.perf_counter() - started, 2)})
+            # wyniki benchmarku zasilają routing (provider "auto")
+            record_quality(lang, code, review_parsed["verdict"], review_parsed["confidence"], source="benchmark")
+        except Exception as e:
+            res["review"] = f"Błąd review: {e}"
+        done += 1
+        ctx.progress(done, total, out)
+    return out
+
+
+@register("backup")
+def _backup_job(params: dict, ctx: JobContext) -> dict:
+    """Backup ZIP data/ do pliku tymczasowego (backup_zip.build_backup), postęp w bajtach."""
+    from backup_zip import build_backup
+
+    last = [0.0]
+
+    def progress(done: int, total: int, current: str) -> None:
+        # zapis postępu najwyżej 2× na sekundę (tysiące małych plików)
+        now = time.time()
+        if now - last[0] >= 0.5 or done >= total:
+            last[0] = now
+            ctx.progress(done, total, {"current": current})
+
+    path = build_backup(progress=progress)
+    return {"path": path, "size": os.path.getsize(path)}
+
+
+@register("snapshot")
+def _snapshot_job(params: dict, ctx: JobContext) -> dict:
+    """Przyrostowy snapshot data/ (backup_store) + retencja. params: label."""
+    from backup_store import create_snapshot, prune
+
+    last = [0.0]
+
+    def progress(done: int, total: int, current: str) -> None:
+        now = time.time()
+        if now - last[0] >= 0.5 or done >= total:
+            last[0] = now
+            ctx.progress(done, total, {"current": current})
+
+    started = time.perf_counter()
+    manifest = create_snapshot(label=params.get("label", ""), progress=progress)
+    pruned = prune()
+    return {"id": manifest["id"], "stats": manifest["stats"], "elapsed_s": round(time.perf_counter() - started, 2),
+            "pruned": pruned}
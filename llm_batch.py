@@ -0,0 +1,493 @@
+"""
+Batch (asynchroniczne) tłumaczenia dużych katalogów przez OpenAI Batch API i Gemini batch mode.
+Wyższa przepustowość i niższy koszt w zamian za czas realizacji do 24h.
+
+Stan zadań: data/batch/batch_jobs.db (przetrwa restart). Backend "local" wykonuje te same
+zadania przez chat_llm (np. provider "mock") — do testów offline.
+
+Przebieg: translate job → (opcjonalnie) review job → archiwum (translations_archive) + llm_cache.
+Po pobraniu wyników zadanie ma status "archiving", aż wszystkie elementy trafią do archiwum —
+błąd zapisu nie gubi wyników, kolejny poll kończy archiwizację (zapisane elementy są pomijane).
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import List, Optional, Tuple
+
+import llm_cache
+from llm_providers import (
+    _openai_json_kwargs,
+    chat_llm_detailed,
+    default_model,
+    default_review_model,
+    prefix_cache_key,
+    prepare_prompt,
+    provider_client,
+    review_provider,
+)
+from common import build_source, matched_terms
+from token_budget import output_budget
+from translation_pipeline import (
+    build_review_messages,
+    build_translate_messages,
+    filter_glossary_for_source,
+    fit_glossary_block,
+    load_glossary_df,
+    prompt_glossary_block,
+)
+from qa_checks import validate
+from review_parsing import format_review, parse_review
+from translations_archive import save_translation
+
+BATCH_DIR = os.path.join("data", "batch")
+DB_PATH = os.path.join(BATCH_DIR, "batch_jobs.db")
+
+BACKENDS = ["openai", "gemini", "local"]
+ACTIVE_STATUSES = ("submitted", "running", "archiving")
+
+# stany zadań po stronie providera → nasz status
+_OPENAI_STATES = {
+    "validating": "running", "in_progress": "running", "finalizing": "running",
+    "completed": "completed", "failed": "failed", "expired": "failed", "cancelling": "running", "cancelled": "failed",
+}
+_GEMINI_STATES = {
+    "JOB_STATE_PENDING": "running", "JOB_STATE_QUEUED": "running", "JOB_STATE_RUNNING": "running",
+    "JOB_STATE_SUCCEEDED": "completed", "JOB_STATE_FAILED": "failed", "JOB_STATE_CANCELLED": "failed",
+    "JOB_STATE_EXPIRED": "failed",
+}
+
+_lock = threading.Lock()
+# zadania, które ten proces właśnie sprawdza / archiwizuje (praca poza _lock, bez podwójnego wykonania)
+_polling: set = set()
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(BATCH_DIR, exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS jobs ("
+        " id TEXT PRIMARY KEY, backend TEXT NOT NULL, provider TEXT NOT NULL, kind TEXT NOT NULL,"
+        " status TEXT NOT NULL, provider_job_id TEXT, parent_job_id TEXT, with_review INTEGER NOT NULL DEFAULT 0,"
+        " created REAL NOT NULL, updated REAL NOT NULL, n_items INTEGER NOT NULL DEFAULT 0,"
+        " n_done INTEGER NOT NULL DEFAULT 0, n_errors INTEGER NOT NULL DEFAULT 0, error TEXT)"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS items ("
+        " job_id TEXT NOT NULL, custom_id TEXT NOT NULL, lang TEXT, label TEXT, title_pl TEXT,"
+        " source TEXT, glossary_block TEXT, model TEXT, temperature REAL, system_text TEXT, user_text TEXT,"
+        " translation TEXT, result TEXT, error TEXT, PRIMARY KEY (job_id, custom_id))"
+    )
+    # kolumny dodane później — starsze bazy uzupełniamy w miejscu
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(items)")}
+    for name in ("truncated", "archived"):
+        if name not in cols:
+            conn.execute(f"ALTER TABLE items ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
+    return conn
+
+
+# -------------------------
+# Tworzenie zadań
+# -------------------------
+
+def _insert_job(conn, backend: str, provider: str, kind: str, items: List[dict], with_review: bool,
+                parent_job_id: Optional[str] = None) -> str:
+    job_id = f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    now = time.time()
+    conn.execute(
+        "INSERT INTO jobs (id, backend, provider, kind, status, parent_job_id, with_review, created, updated, n_items) "
+        "VALUES (?, ?, ?, ?, 'new', ?, ?, ?, ?, ?)",
+        (job_id, backend, provider, kind, parent_job_id, int(with_review), now, now, len(items)),
+    )
+    conn.executemany(
+        "INSERT INTO items (job_id, custom_id, lang, label, title_pl, source, glossary_block, model, temperature,"
+        " system_text, user_text, translation) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        [(job_id, it["custom_id"], it["lang"], it["label"], it["title_pl"], it["source"], it["glossary_block"],
+          it["model"], it["temperature"], it["system_text"], it["user_text"], it.get("translation"))
+         for it in items],
+    )
+    conn.commit()
+    return job_id
+
+
+def create_translate_job(
+    samples: List[dict],
+    langs: List[Tuple[str, str]],
+    backend: str,
+    provider: Optional[str] = None,
+    context: str = "",
+    temperature: float = 0.2,
+    with_review: bool = True,
+) -> str:
+    """
+    samples: [{"name": ..., "body": ...}], langs: [(code, label)].
+    backend: openai | gemini | local (local → provider, np. "mock").
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Nieznany backend batch: {backend}")
+    provider = backend if backend != "local" else (provider or "mock")
+    model = default_model(provider)
+
+    items = []
+    for code, label in langs:
+        # glossary raz na język, nie raz na tekst
+        gdf = load_glossary_df(code)
+        for i, sample in enumerate(samples):
+            source = build_source(sample.get("name", ""), sample.get("body", ""))
+            gdf_filtered = filter_glossary_for_source(gdf, source)
+            glossary_block = fit_glossary_block(gdf_filtered, provider, model)
+            # długie teksty nie są tu dzielone na kawałki (jeden request = jeden element) — przycina budżet user
+            system_text, user_text = prepare_prompt(
+                build_translate_messages(source, prompt_glossary_block(gdf, gdf_filtered, provider, model), label, context),
+                provider, model,
+            )
+            items.append({
+                "custom_id": f"{code}-{i:06d}",
+                "lang": code, "label": label, "title_pl": sample.get("name", ""),
+                "source": source, "glossary_block": glossary_block, "model": model, "temperature": temperature,
+                "system_text": system_text, "user_text": user_text,
+            })
+
+    with _lock:
+        conn = _connect()
+        try:
+            job_id = _insert_job(conn, backend, provider, "translate", items, with_review)
+            _submit(conn, job_id)
+        finally:
+            conn.close()
+    return job_id
+
+
+def _create_review_job(conn, parent: sqlite3.Row) -> str:
+    rows = conn.execute(
+        "SELECT * FROM items WHERE job_id = ? AND result IS NOT NULL AND error IS NULL", (parent["id"],)
+    ).fetchall()
+    backend = "local" if parent["backend"] == "local" else "gemini"
+    provider = review_provider() if backend == "local" else "gemini"
+    model = default_model(provider, default_review_model() if provider == "gemini" else None)
+
+    items = []
+    for r in rows:
+        system_text, user_text = prepare_prompt(
+            build_review_messages(r["source"], r["result"], parent["provider"], r["glossary_block"]), provider, model
+        )
+        items.append({
+            "custom_id": r["custom_id"], "lang": r["lang"], "label": r["label"], "title_pl": r["title_pl"],
+            "source": r["source"], "glossary_block": r["glossary_block"], "model": model, "temperature": 0.1,
+            "system_text": system_text, "user_text": user_text, "translation": r["result"],
+        })
+    job_id = _insert_job(conn, backend, provider, "review", items, False, parent_job_id=parent["id"])
+    _submit(conn, job_id)
+    return job_id
+
+
+# -------------------------
+# Submit / poll per backend
+# -------------------------
+
+def _set_job(conn, job_id: str, **fields) -> None:
+    fields["updated"] = time.time()
+    cols = ", ".join(f"{k} = ?" for k in fields)
+    conn.execute(f"UPDATE jobs SET {cols} WHERE id = ?", (*fields.values(), job_id))
+    conn.commit()
+
+
+def _submit(conn, job_id: str) -> None:
+    job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    items = conn.execute("SELECT * FROM items WHERE job_id = ?", (job_id,)).fetchall()
+    if not items:
+        _complete(conn, job_id)
+        return
+    try:
+        if job["backend"] == "openai":
+            provider_job_id = _openai_submit(job, items)
+        elif job["backend"] == "gemini":
+            provider_job_id = _gemini_submit(job, items)
+        else:
+            provider_job_id = None
+        _set_job(conn, job_id, status="submitted", provider_job_id=provider_job_id)
+    except Exception as e:
+        _set_job(conn, job_id, status="failed", error=f"{type(e).__name__}: {e}"[:500])
+
+
+def _input_path(job_id: str) -> str:
+    return os.path.join(BATCH_DIR, f"{job_id}_input.jsonl")
+
+
+def _max_tokens(job, it) -> int:
+    return output_budget(job["provider"], it["model"], job["kind"], it["lang"], it["user_text"])
+
+
+def _openai_submit(job, items) -> str:
+    path = _input_path(job["id"])
+    with open(path, "w", encoding="utf-8") as f:
+        for it in items:
+            f.write(json.dumps({
+                "custom_id": it["custom_id"],
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": {
+                    "model": it["model"],
+                    "temperature": it["temperature"],
+                    "messages": [
+                        {"role": "system", "content": it["system_text"] or "You are helpful."},
+                        {"role": "user", "content": it["user_text"]},
+                    ],
+                    "prompt_cache_key": prefix_cache_key(it["system_text"]),
+                    "max_completion_tokens": _max_tokens(job, it),
+                    **_openai_json_kwargs(job["kind"] == "review"),
+                },
+            }, ensure_ascii=False) + "\n")
+    client = provider_client("openai")
+    with open(path, "rb") as f:
+        uploaded = client.files.create(file=f, purpose="batch")
+    batch = client.batches.create(
+        input_file_id=uploaded.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+        metadata={"job_id": job["id"]},
+    )
+    return batch.id
+
+
+def _gemini_generation_config(job, it) -> dict:
+    cfg = {"temperature": it["temperature"], "maxOutputTokens": _max_tokens(job, it)}
+    if job["kind"] == "review":
+        cfg["responseMimeType"] = "application/json"
+    return cfg
+
+
+def _gemini_submit(job, items) -> str:
+    path = _input_path(job["id"])
+    with open(path, "w", encoding="utf-8") as f:
+        for it in items:
+            # jak w synchronicznym chat_llm: stały prefiks jako systemInstruction, tekst w contents
+            request = {
+                "contents": [{"role": "user", "parts": [{"text": it["user_text"]}]}],
+                "generationConfig": _gemini_generation_config(job, it),
+            }
+            if it["system_text"]:
+                request["systemInstruction"] = {"parts": [{"text": it["system_text"]}]}
+            f.write(json.dumps({"key": it["custom_id"], "request": request}, ensure_ascii=False) + "\n")
+    client = provider_client("gemini")
+    uploaded = client.files.upload(file=path, config={"display_name": job["id"], "mime_type": "jsonl"})
+    batch = client.batches.create(model=items[0]["model"], src=uploaded.name, config={"display_name": job["id"]})
+    return batch.name
+
+
+def _openai_collect(job) -> Tuple[str, dict]:
+    client = provider_client("openai")
+    batch = client.batches.retrieve(job["provider_job_id"])
+    status = _OPENAI_STATES.get(batch.status, "running")
+    results = {}
+    if status == "completed":
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            for line in client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                row = json.loads(line)
+                response = row.get("response") or {}
+                body = response.get("body") or {}
+                if row.get("error") or response.get("status_code", 200) != 200:
+                    err = row.get("error") or body.get("error") or {"status_code": response.get("status_code")}
+                    results[row["custom_id"]] = (None, json.dumps(err, ensure_ascii=False)[:500], False)
+                else:
+                    choice = body["choices"][0]
+                    results[row["custom_id"]] = ((choice["message"]["content"] or "").strip(), None,
+                                                 choice.get("finish_reason") == "length")
+    return status, results
+
+
+def _gemini_collect(job) -> Tuple[str, dict]:
+    client = provider_client("gemini")
+    batch = client.batches.get(name=job["provider_job_id"])
+    state = getattr(batch.state, "name", str(batch.state))
+    status = _GEMINI_STATES.get(state, "running")
+    results = {}
+    if status == "completed" and batch.dest is not None and batch.dest.file_name:
+        raw = client.files.download(file=batch.dest.file_name)
+        for line in raw.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if row.get("error"):
+                results[row["key"]] = (None, json.dumps(row["error"], ensure_ascii=False)[:500], False)
+                continue
+            candidate = ((row.get("response") or {}).get("candidates") or [{}])[0]
+            parts = candidate.get("content", {}).get("parts") or []
+            results[row["key"]] = ("".join(p.get("text", "") for p in parts).strip(), None,
+                                   "MAX_TOKENS" in str(candidate.get("finishReason", "")))
+    return status, results
+
+
+def _local_collect(job, items) -> Tuple[str, dict]:
+    """Stand-in offline: wykonuje elementy synchronicznie przez chat_llm."""
+    results = {}
+    for it in items:
+        try:
+            text, rec = chat_llm_detailed(
+                job["provider"],
+                messages=[{"role": "system", "content": it["system_text"]}, {"role": "user", "content": it["user_text"]}],
+                temperature=it["temperature"],
+                model_hint=it["model"],
+                lang=it["lang"],
+                purpose=f"batch_{job['kind']}",
+                json_mode=job["kind"] == "review",
+            )
+            results[it["custom_id"]] = (text, None, bool(rec["truncated"]))
+        except Exception as e:
+            results[it["custom_id"]] = (None, f"{type(e).__name__}: {e}"[:500], False)
+    return "completed", results
+
+
+def poll_job(job_id: str) -> str:
+    """
+    Sprawdza status u providera; po zakończeniu zapisuje wyniki i uruchamia kolejny etap. Zwraca status.
+    Pobieranie wyników (backend local: same wywołania LLM) i archiwizacja idą poza _lock — długie zadanie
+    nie blokuje innych pollów ani listy zadań.
+    """
+    with _lock:
+        conn = _connect()
+        try:
+            job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+            if job is None or job["status"] not in ACTIVE_STATUSES:
+                return job["status"] if job else "missing"
+            if job_id in _polling:
+                return job["status"]
+            _polling.add(job_id)
+            pending = conn.execute("SELECT * FROM items WHERE job_id = ? AND result IS NULL AND error IS NULL",
+                                   (job_id,)).fetchall()
+        finally:
+            conn.close()
+
+    conn = _connect()
+    try:
+        if job["status"] == "archiving":
+            # poprzednia archiwizacja przerwana błędem — dokończenie bez ponownego pobierania
+            return _complete(conn, job_id)
+        try:
+            if job["backend"] == "openai":
+                status, results = _openai_collect(job)
+            elif job["backend"] == "gemini":
+                status, results = _gemini_collect(job)
+            else:
+                status, results = _local_collect(job, pending)
+        except Exception as e:
+            # błąd sieci przy sprawdzaniu statusu — spróbujemy przy następnym poll
+            _set_job(conn, job_id, error=f"poll: {type(e).__name__}: {e}"[:500])
+            return job["status"]
+
+        # results: custom_id → (tekst, błąd, ucięte na limicie max_tokens)
+        for custom_id, (text, err, truncated) in results.items():
+            conn.execute("UPDATE items SET result = ?, error = ?, truncated = ? WHERE job_id = ? AND custom_id = ?",
+                         (text, err, int(truncated), job_id, custom_id))
+        n_done, n_errors = conn.execute(
+            "SELECT COUNT(result), COUNT(error) FROM items WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        if status != "completed":
+            _set_job(conn, job_id, status=status, n_done=n_done, n_errors=n_errors)
+            return status
+        _set_job(conn, job_id, n_done=n_done, n_errors=n_errors)
+        return _complete(conn, job_id)
+    finally:
+        conn.close()
+        with _lock:
+            _polling.discard(job_id)
+
+
+def _complete(conn, job_id: str) -> str:
+    """Wyniki pobrane → archiwum / review job; "completed" dopiero po udanym _finish."""
+    _set_job(conn, job_id, status="archiving")
+    try:
+        _finish(conn, job_id)
+    except Exception as e:
+        _set_job(conn, job_id, error=f"archiwizacja: {type(e).__name__}: {e}"[:500])
+        return "archiving"
+    _set_job(conn, job_id, status="completed", error=None)
+    return "completed"
+
+
+def _qa(lang: str, source: str, translation: str) -> dict:
+    return validate(source, translation, filter_glossary_for_source(load_glossary_df(lang), source), lang)
+
+
+def _terms(lang: str, source: str) -> list:
+    return matched_terms(source, load_glossary_df(lang)["term_pl"])
+
+
+def _finish(conn, job_id: str) -> None:
+    job = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    items = conn.execute("SELECT * FROM items WHERE job_id = ? AND result IS NOT NULL", (job_id,)).fetchall()
+
+    if job["kind"] == "translate":
+        # wyniki batch trafiają do tego samego cache co tłumaczenia synchroniczne (poza uciętymi — jak w chat_llm)
+        for it in items:
+            if it["truncated"]:
+                continue
+            key = llm_cache.cache_key(job["provider"], it["model"], it["temperature"], it["system_text"], it["user_text"])
+            llm_cache.put(key, it["result"], provider=job["provider"], model=it["model"], source="batch")
+        if job["with_review"]:
+            # ponowiony _finish nie tworzy drugiego review job
+            if not conn.execute("SELECT 1 FROM jobs WHERE parent_job_id = ?", (job_id,)).fetchone():
+                _create_review_job(conn, job)
+            return
+        for it in items:
+            if it["archived"]:
+                continue
+            save_translation(it["lang"], it["label"], f"{job['provider']} (batch)", it["source"], it["result"], "",
+                             title_pl=it["title_pl"], review_model="—", qa=_qa(it["lang"], it["source"], it["result"]),
+                             terms=_terms(it["lang"], it["source"]))
+            _mark_archived(conn, job_id, it["custom_id"])
+    else:
+        parent = conn.execute("SELECT * FROM jobs WHERE id = ?", (job["parent_job_id"],)).fetchone()
+        translate_provider = parent["provider"] if parent else "?"
+        for it in items:
+            if it["archived"]:
+                continue
+            parsed = parse_review(it["result"])
+            review_text = format_review(parsed) if parsed["verdict"] else it["result"]
+            save_translation(it["lang"], it["label"], f"{translate_provider} (batch)", it["source"], it["translation"],
+                             review_text, title_pl=it["title_pl"], review_model=f"{job['provider']} (batch)",
+                             review_parsed=parsed, qa=_qa(it["lang"], it["source"], it["translation"]),
+                             terms=_terms(it["lang"], it["source"]))
+            _mark_archived(conn, job_id, it["custom_id"])
+
+
+def _mark_archived(conn, job_id: str, custom_id: str) -> None:
+    # po każdym elemencie — przerwana archiwizacja nie zapisze go drugi raz
+    conn.execute("UPDATE items SET archived = 1 WHERE job_id = ? AND custom_id = ?", (job_id, custom_id))
+    conn.commit()
+
+def poll_active_jobs() -> List[Tuple[str, str]]:
+    with _lock:
+        conn = _connect()
+        try:
+            ids = [r["id"] for r in conn.execute(
+                f"SELECT id FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE_STATUSES))}) ORDER BY created",
+                ACTIVE_STATUSES,
+            )]
+        finally:
+            conn.close()
+    return [(job_id, poll_job(job_id)) for job_id in ids]
+
+
+def list_jobs(limit: int = 200) -> List[dict]:
+    with _lock:
+        conn = _connect()
+        try:
+            rows = conn.execute("SELECT * FROM jobs ORDER BY created DESC LIMIT ?", (limit,)).fetchall()
+        finally:
+            conn.close()
+    out = []
+    for r in rows:
+        d = dict(r)
+        d["created"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(d["created"]))
+        d["updated"] = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(d["updated"]))
+        out.append(d)
+    return out
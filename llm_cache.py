@@ -0,0 +1,69 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+CACHE_PATH = os.environ.get("LLM_CACHE_PATH") or os.path.join("data", "cache", "llm_cache.db")
+
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+
+
+def cache_enabled() -> bool:
+    return os.environ.get("LLM_CACHE_ENABLED", "").strip().lower() in ["1", "true", "yes"]
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH) or ".", exist_ok=True)
+        conn = sqlite3.connect(CACHE_PATH, check_same_thread=False, timeout=30)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS llm_cache ("
+            " key TEXT PRIMARY KEY, provider TEXT, model TEXT, text TEXT NOT NULL,"
+            " source TEXT, created REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0)"
+        )
+        _conn = conn
+    return _conn
+
+
+def cache_key(provider: str, model: str, temperature: float, system_text: str, user_text: str) -> str:
+    payload = json.dumps(
+        [provider, model, round(float(temperature), 3), system_text, user_text],
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    with _lock:
+        conn = _connect()
+        row = conn.execute("SELECT text FROM llm_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        conn.execute("UPDATE llm_cache SET hits = hits + 1 WHERE key = ?", (key,))
+        conn.commit()
+        return row[0]
+
+
+def put(key: str, text: str, provider: str = "", model: str = "", source: str = "sync") -> None:
+    """source: sync | batch — skąd pochodzi odpowiedź."""
+    with _lock:
+        conn = _connect()
+        conn.execute(
+            "INSERT OR REPLACE INTO llm_cache (key, provider, model, text, source, created, hits) "
+            "VALUES (?, ?, ?, ?, ?, ?, COALESCE((SELECT hits FROM llm_cache WHERE key = ?), 0))",
+            (key, provider, model, text, source, time.time(), key),
+        )
+        conn.commit()
+
+
+def stats() -> dict:
+    with _lock:
+        conn = _connect()
+        row = conn.execute("SELECT COUNT(*), COALESCE(SUM(hits), 0) FROM llm_cache").fetchone()
+    return {"entries": row[0], "hits": row[1]}
@@ -0,0 +1,165 @@
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+
+METRICS_PATH = os.environ.get("LLM_METRICS_PATH") or os.path.join("data", "metrics", "llm_calls.jsonl")
+# rotacja: po przekroczeniu LLM_METRICS_MAX_MB plik → llm_calls.1.jsonl (…, LLM_METRICS_KEEP starszych plików)
+MAX_BYTES = int(float(os.environ.get("LLM_METRICS_MAX_MB") or 50) * 1024 * 1024)
+KEEP_ROTATED = int(os.environ.get("LLM_METRICS_KEEP") or 3)
+_TAIL_BLOCK = 64 * 1024
+
+# Orientacyjne ceny (USD za 1M tokenów: input, output). Nadpisz przez ENV LLM_PRICES_JSON,
+# np. {"gpt-4.1-mini": [0.4, 1.6]}. Tokeny z cache promptu (prefix caching) liczone są
+# jako input × CACHED_INPUT_RATIO (OpenAI i Gemini 2.5: 25% ceny input).
+PRICES_PER_MTOK: Dict[str, Tuple[float, float]] = {
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gemini-2.5-pro": (1.25, 10.00),
+    "gemini-2.5-flash": (0.30, 2.50),
+    "gemini-2.0-flash": (0.10, 0.40),
+    "qwen-plus": (0.40, 1.20),
+}
+
+CACHED_INPUT_RATIO = float(os.environ.get("LLM_CACHED_INPUT_RATIO") or 0.25)
+
+_write_lock = threading.Lock()
+
+
+def metrics_enabled() -> bool:
+    return os.environ.get("LLM_METRICS_DISABLED", "").strip().lower() not in ["1", "true", "yes"]
+
+
+def _prices() -> Dict[str, Tuple[float, float]]:
+    prices = dict(PRICES_PER_MTOK)
+    raw = os.environ.get("LLM_PRICES_JSON")
+    if raw:
+        try:
+            for model, pair in json.loads(raw).items():
+                prices[model] = (float(pair[0]), float(pair[1]))
+        except (ValueError, TypeError, IndexError):
+            pass
+    return prices
+
+
+def estimate_cost(
+    model: Optional[str],
+    prompt_tokens: Optional[int],
+    completion_tokens: Optional[int],
+    cached_tokens: Optional[int] = None,
+) -> Optional[float]:
+    """Koszt w USD; None gdy model nie ma ceny w tabeli albo brak danych o tokenach."""
+    if not model or prompt_tokens is None or completion_tokens is None:
+        return None
+    price = _prices().get(model)
+    if price is None:
+        return None
+    cached = min(cached_tokens or 0, prompt_tokens)
+    input_cost = (prompt_tokens - cached) * price[0] + cached * price[0] * CACHED_INPUT_RATIO
+    return round((input_cost + completion_tokens * price[1]) / 1_000_000, 6)
+
+
+def record_call(record: dict) -> None:
+    """Dopisuje jeden rekord (1 wywołanie LLM) do pliku JSONL."""
+    if not metrics_enabled():
+        return
+    record = dict(record)
+    record.setdefault("ts", datetime.now().isoformat(timespec="milliseconds"))
+    line = json.dumps(record, ensure_ascii=False)
+    with _write_lock:
+        os.makedirs(os.path.dirname(METRICS_PATH) or ".", exist_ok=True)
+        _rotate_if_needed()
+        with open(METRICS_PATH, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+
+
+def rotated_path(n: int) -> str:
+    base, ext = os.path.splitext(METRICS_PATH)
+    return f"{base}.{n}{ext}"
+
+
+def _rotate_if_needed() -> None:
+    try:
+        if os.path.getsize(METRICS_PATH) < MAX_BYTES:
+            return
+    except FileNotFoundError:
+        return
+    try:
+        if KEEP_ROTATED <= 0:
+            os.remove(METRICS_PATH)
+            return
+        for n in range(KEEP_ROTATED - 1, 0, -1):
+            if os.path.exists(rotated_path(n)):
+                os.replace(rotated_path(n), rotated_path(n + 1))
+        os.replace(METRICS_PATH, rotated_path(1))
+    except FileNotFoundError:
+        # inny proces (worker_pool) rotował w tym samym momencie
+        pass
+
+
+def _parse(lines) -> List[dict]:
+    rows = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            rows.append(json.loads(line))
+        except ValueError:
+            # urwana linia (np. restart w trakcie zapisu) — pomijamy
+            continue
+    return rows
+
+
+def _tail_lines(path: str, n: int) -> List[bytes]:
+    """Ostatnie n niepustych linii pliku — czytanie blokami od końca, bez przechodzenia całego pliku."""
+    newest_first: List[bytes] = []
+    with open(path, "rb") as f:
+        pos = f.seek(0, os.SEEK_END)
+        head = b""
+        while pos > 0 and len(newest_first) < n:
+            step = min(_TAIL_BLOCK, pos)
+            pos -= step
+            f.seek(pos)
+            parts = (f.read(step) + head).split(b"\n")
+            # pierwszy kawałek może być niepełną linią — dokleja się do następnego (wcześniejszego) bloku
+            head = parts.pop(0) if pos > 0 else b""
+            newest_first.extend(p for p in reversed(parts) if p.strip())
+    return newest_first[:n][::-1]
+
+
+def load_calls(limit: Optional[int] = None) -> List[dict]:
+    """
+    Czyta rekordy (najnowsze na końcu), łącznie z plikami po rotacji. limit = tylko N ostatnich —
+    czytany jest wtedy tylko koniec pliku (router i hedging odświeżają to na ścieżce zapytań).
+    """
+    paths = [p for p in [rotated_path(n) for n in range(KEEP_ROTATED, 0, -1)] + [METRICS_PATH] if os.path.exists(p)]
+    if limit is None:
+        rows = []
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                rows.extend(_parse(f))
+        return rows
+    rows: List[dict] = []
+    for path in reversed(paths):
+        need = limit - len(rows)
+        if need <= 0:
+            break
+        rows = _parse(line.decode("utf-8", "replace") for line in _tail_lines(path, need)) + rows
+    return rows[-limit:] if limit else []
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Percentyl z interpolacją liniową (q w zakresie 0-100)."""
+    vals = sorted(v for v in values if v is not None)
+    if not vals:
+        return None
+    if len(vals) == 1:
+        return vals[0]
+    pos = (len(vals) - 1) * q / 100.0
+    lo = int(pos)
+    hi = min(lo + 1, len(vals) - 1)
+    return vals[lo] + (vals[hi] - vals[lo]) * (pos - lo)
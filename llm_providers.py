@@ -1,9 +1,19 @@
+import hashlib
 import os
-from typing import Optional, List, Dict, Tuple
+import threading
+import time
+from contextvars import ContextVar
+from typing import Callable, Optional, List, Dict, Tuple
 
-from openai import OpenAI
-from google import genai
-from google.genai import errors as genai_errors
+import httpx
+
+import llm_cache
+from llm_metrics import estimate_cost, record_call
+from mock_llm_server import default_backend as _mock_backend
+from profiling import span
+from llm_resilience import call_with_retries, current_policy, hedge_delay_s, hedged
+from single_flight import SingleFlight
+from token_budget import clip_to_tokens, count_tokens, estimate_tokens, output_budget, prompt_budget, tokenizer_name
 
 
 def _join_messages_to_text(messages: List[Dict[str, str]]) -> Tuple[str, str]:
@@ -22,26 +32,138 @@ def _join_messages_to_text(messages: List[Dict[str, str]]) -> Tuple[str, str]:
     return system_text, user_text
 
 
-def _clip(text: str, max_chars: int) -> str:
-    if not text:
-        return text
-    if len(text) <= max_chars:
-        return text
-    return text[: max_chars - 200] + "\n\n[...truncated due to length...]\n"
+def _budgeted_prompt(
+    messages: List[Dict[str, str]], provider: Optional[str], model: Optional[str]
+) -> Tuple[str, str, dict]:
+    # limity w tokenach modelu (token_budget), nie w znakach — grecki tekst ma ~2x więcej tokenów na znak
+    system_text, user_text = _join_messages_to_text(messages)
+    budget = prompt_budget(provider, model)
+    system_text, system_clipped = clip_to_tokens(system_text, budget.system_tokens, provider, model)
+    user_text, user_clipped = clip_to_tokens(user_text, budget.user_tokens, provider, model)
+    used = count_tokens(system_text, provider, model) + count_tokens(user_text, provider, model)
+    info = {
+        "tokenizer": tokenizer_name(provider, model),
+        "prompt_tokens_est": used,
+        "prompt_budget_tokens": budget.system_tokens + budget.user_tokens,
+        "budget_used": round(used / (budget.system_tokens + budget.user_tokens), 3),
+        "clipped": [part for part, hit in (("system", system_clipped), ("user", user_clipped)) if hit],
+    }
+    return system_text, user_text, info
+
+
+def prepare_prompt(
+    messages: List[Dict[str, str]], provider: Optional[str] = None, model: Optional[str] = None
+) -> Tuple[str, str]:
+    """(system_text, user_text) dokładnie tak, jak trafiają do providera (także w batch)."""
+    system_text, user_text, _ = _budgeted_prompt(messages, provider, model)
+    return system_text, user_text
+
+
+def prefix_cache_key(system_text: str) -> str:
+    """Krótki identyfikator prefiksu (prompt_cache_key OpenAI, nazwa cache Gemini)."""
+    return "enzo-" + hashlib.sha256((system_text or "").encode("utf-8")).hexdigest()[:16]
+
+
+def default_model(provider: str, model_hint: Optional[str] = None) -> str:
+    """Model, od którego zaczyna chat_llm (dla Gemini: pierwszy w łańcuchu fallback)."""
+    provider = provider.lower().strip()
+    if provider == "openai":
+        return model_hint or os.environ.get("OPENAI_MODEL") or "gpt-4.1-mini"
+    if provider == "qwen":
+        return model_hint or os.environ.get("QWEN_MODEL") or "qwen-plus"
+    if provider == "gemini":
+        return _gemini_fallback_chain(model_hint)[0]
+    return model_hint or provider
+
+
+# -------------------------
+# Timing (connect / TTFB) via httpx hooks
+# -------------------------
+
+class _CallTiming:
+    def __init__(self):
+        self.attempts = 0
+        self.request_started: Optional[float] = None
+        self.connect_started: Optional[float] = None
+        self.connect_ms: Optional[float] = None
+        self.ttfb_ms: Optional[float] = None
+
+
+_current_timing: ContextVar[Optional[_CallTiming]] = ContextVar("llm_call_timing", default=None)
+
+
+def _trace(event_name: str, info: dict) -> None:
+    timing = _current_timing.get()
+    if timing is None:
+        return
+    now = time.perf_counter()
+    if event_name == "connection.connect_tcp.started":
+        timing.connect_started = now
+    elif event_name in ("connection.connect_tcp.complete", "connection.start_tls.complete"):
+        if timing.connect_started is not None:
+            timing.connect_ms = (now - timing.connect_started) * 1000
+    elif event_name.endswith("receive_response_headers.complete") and timing.request_started is not None:
+        timing.ttfb_ms = (now - timing.request_started) * 1000
+
+
+def _on_request(request: httpx.Request) -> None:
+    timing = _current_timing.get()
+    if timing is None:
+        return
+    timing.attempts += 1
+    timing.request_started = time.perf_counter()
+    timing.connect_started = None
+    request.extensions["trace"] = _trace
+
+
+_EVENT_HOOKS = {"request": [_on_request]}
 
 
 # -------------------------
 # Clients
 # -------------------------
 
-def _openai_client() -> OpenAI:
+# Klienci są współdzieleni w procesie (pula połączeń HTTP), klucz = (provider, api_key, base_url)
+_clients: Dict[Tuple[str, str, str], object] = {}
+_clients_lock = threading.Lock()
+
+
+# SDK ładowane przy pierwszym użyciu providera (import openai / google-genai to po ~2.5 s);
+# kolejne wywołania biorą moduł z sys.modules
+def _openai_sdk():
+    from openai import OpenAI
+
+    return OpenAI
+
+
+def _genai_sdk():
+    from google import genai
+    from google.genai import errors, types
+
+    return genai, errors, types
+
+
+def _cached_client(key: Tuple[str, str, str], factory):
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = factory()
+            _clients[key] = client
+        return client
+
+
+def _openai_client():
     api_key = os.environ.get("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("Brak OPENAI_API_KEY w secrets/ENV.")
-    return OpenAI(api_key=api_key)
+    return _cached_client(
+        ("openai", api_key, ""),
+        # retry robi llm_resilience (backoff + Retry-After + breaker), nie SDK
+        lambda: _openai_sdk()(api_key=api_key, max_retries=0, http_client=httpx.Client(event_hooks=_EVENT_HOOKS)),
+    )
 
 
-def _qwen_client() -> OpenAI:
+def _qwen_client():
     """
     Qwen (Alibaba Model Studio / DashScope) via OpenAI-compatible protocol:
     endpoint differs by region (intl vs Beijing). :contentReference[oaicite:1]{index=1}
@@ -52,40 +174,308 @@ def _qwen_client() -> OpenAI:
 
     # IMPORTANT: Alibaba docs show endpoints including /chat/completions. :contentReference[oaicite:2]{index=2}
     base_url = os.environ.get("QWEN_BASE_URL") or "https://dashscope-intl.aliyuncs.com/compatible-mode/v1"
-    return OpenAI(api_key=api_key, base_url=base_url)
+    return _cached_client(
+        ("qwen", api_key, base_url),
+        lambda: _openai_sdk()(
+            api_key=api_key, base_url=base_url, max_retries=0, http_client=httpx.Client(event_hooks=_EVENT_HOOKS)
+        ),
+    )
+
+
+def _mock_client(base_url: str):
+    return _cached_client(
+        ("mock", "mock", base_url),
+        lambda: _openai_sdk()(api_key="mock", base_url=base_url, max_retries=0, http_client=httpx.Client(event_hooks=_EVENT_HOOKS)),
+    )
 
 
-def _gemini_client() -> genai.Client:
+def _gemini_client():
     api_key = os.environ.get("GEMINI_API_KEY")
     if not api_key:
         raise RuntimeError("Brak GEMINI_API_KEY w secrets/ENV.")
-    return genai.Client(api_key=api_key)
+    genai, _, genai_types = _genai_sdk()
+    return _cached_client(
+        ("gemini", api_key, ""),
+        lambda: genai.Client(
+            api_key=api_key,
+            http_options=genai_types.HttpOptions(client_args={"event_hooks": _EVENT_HOOKS}),
+        ),
+    )
+
+
+def provider_client(provider: str):
+    """Współdzielony klient SDK providera (np. dla llm_batch)."""
+    clients = {"openai": _openai_client, "qwen": _qwen_client, "gemini": _gemini_client}
+    if provider not in clients:
+        raise ValueError(f"Brak klienta SDK dla providera: {provider}")
+    return clients[provider]()
+
+
+def _openai_json_kwargs(json_mode: bool) -> dict:
+    # JSON mode (OpenAI / Qwen / mock); prompt musi zawierać słowo "JSON"
+    return {"response_format": {"type": "json_object"}} if json_mode else {}
+
+
+def _openai_limit_kwargs(provider: str, max_tokens: Optional[int]) -> dict:
+    if not max_tokens:
+        return {}
+    # OpenAI: max_completion_tokens (max_tokens odrzucają modele rozumujące); Qwen/mock: max_tokens
+    return {"max_completion_tokens": max_tokens} if provider == "openai" else {"max_tokens": max_tokens}
+
+
+def _openai_usage(resp, rec: dict) -> None:
+    usage = getattr(resp, "usage", None)
+    if usage is None:
+        return
+    rec["prompt_tokens"] = usage.prompt_tokens
+    rec["completion_tokens"] = usage.completion_tokens
+    details = getattr(usage, "prompt_tokens_details", None)
+    rec["cached_tokens"] = (getattr(details, "cached_tokens", None) or 0) if details else 0
+    choices = getattr(resp, "choices", None) or []
+    rec["truncated"] = bool(choices) and getattr(choices[0], "finish_reason", None) == "length"
+
+
+def _gemini_usage(resp, rec: dict) -> None:
+    usage = getattr(resp, "usage_metadata", None)
+    if usage is None:
+        return
+    rec["prompt_tokens"] = usage.prompt_token_count
+    # tokeny "thinking" (2.5) są rozliczane jak output
+    rec["completion_tokens"] = (usage.candidates_token_count or 0) + (usage.thoughts_token_count or 0)
+    rec["cached_tokens"] = usage.cached_content_token_count or 0
+    candidates = getattr(resp, "candidates", None) or []
+    rec["truncated"] = bool(candidates) and "MAX_TOKENS" in str(getattr(candidates[0], "finish_reason", ""))
 
 
 # -------------------------
-# Main API
+# Gemini: fallback chain + model health (per proces)
 # -------------------------
 
-def chat_llm(
-    provider: str,
-    messages: list,
-    temperature: float = 0.2,
-    model_hint: Optional[str] = None,
-) -> str:
+# backoff dla modelu po ClientError; 404/403 (brak modelu / region) trwają dłużej niż quota (429)
+GEMINI_HEALTH_BACKOFF_S = float(os.environ.get("GEMINI_HEALTH_BACKOFF_S") or 60)
+GEMINI_HEALTH_BACKOFF_MAX_S = float(os.environ.get("GEMINI_HEALTH_BACKOFF_MAX_S") or 3600)
+_LONG_BACKOFF_CODES = {403, 404}
+# błędy modelu (brak / brak dostępu / limit), a nie zapytania — tylko one psują zdrowie modelu i idą na fallback
+_MODEL_ERROR_CODES = {403, 404, 429}
+_MODEL_ERROR_STATUSES = {"PERMISSION_DENIED", "NOT_FOUND", "RESOURCE_EXHAUSTED", "UNAVAILABLE"}
+
+_gemini_health: Dict[str, dict] = {}
+_gemini_health_lock = threading.Lock()
+
+
+def _gemini_fallback_chain(model_hint: Optional[str] = None) -> List[str]:
+    # If model_hint given: try it first; else use fallback chain
+    fallback_models = []
+    if model_hint:
+        fallback_models.append(model_hint)
+
+    # Defaults from env, then fallback models known in docs :contentReference[oaicite:5]{index=5}
+    env_model = os.environ.get("GEMINI_MODEL_TRANSLATE")
+    if env_model:
+        fallback_models.append(env_model)
+
+    fallback_models += [
+        "gemini-2.5-flash",
+        "gemini-2.0-flash",
+    ]
+    # bez duplikatów, kolejność zachowana
+    return list(dict.fromkeys(fallback_models))
+
+
+def _is_gemini_model_error(err: Exception) -> bool:
+    """403/404/429, quota, unavailable — inny model może się udać. 400 (zły prompt, za duże wejście) — nie."""
+    status = str(getattr(err, "status", "") or "").upper()
+    return (
+        getattr(err, "code", None) in _MODEL_ERROR_CODES
+        or status in _MODEL_ERROR_STATUSES
+        or "quota" in str(err).lower()
+    )
+
+
+def _mark_gemini_failure(model: str, err: Exception) -> None:
+    code = getattr(err, "code", None)
+    base = GEMINI_HEALTH_BACKOFF_S * (10 if code in _LONG_BACKOFF_CODES else 1)
+    with _gemini_health_lock:
+        h = _gemini_health.setdefault(model, {"failures": 0, "last_ok": None})
+        h["failures"] += 1
+        backoff = min(GEMINI_HEALTH_BACKOFF_MAX_S, base * 2 ** (h["failures"] - 1))
+        h["unhealthy_until"] = time.time() + backoff
+        h["last_error"] = f"{code} {getattr(err, 'status', '') or ''}".strip() or type(err).__name__
+
+
+def _mark_gemini_ok(model: str) -> None:
+    with _gemini_health_lock:
+        _gemini_health[model] = {"failures": 0, "unhealthy_until": None, "last_error": None, "last_ok": time.time()}
+
+
+def _gemini_route(models: List[str]) -> Tuple[List[str], List[str]]:
     """
-    provider: openai | gemini | qwen
+    Zwraca (kolejność prób, pominięte modele). Modele w backoffie są pomijane;
+    jeśli wszystkie są w backoffie, próbujemy je wszystkie od najszybciej wygasającego.
     """
+    now = time.time()
+    with _gemini_health_lock:
+        until = {m: (_gemini_health.get(m) or {}).get("unhealthy_until") or 0 for m in models}
+    healthy = [m for m in models if until[m] <= now]
+    if healthy:
+        return healthy, [m for m in models if until[m] > now]
+    return sorted(models, key=lambda m: until[m]), []
 
-    provider = provider.lower().strip()
-    system_text, user_text = _join_messages_to_text(messages)
 
-    system_text = _clip(system_text, 6000)
-    user_text = _clip(user_text, 24000)
+def gemini_routing_table(model_hint: Optional[str] = None) -> List[dict]:
+    """Aktualny stan łańcucha fallback Gemini (do podglądu w UI)."""
+    models = _gemini_fallback_chain(model_hint)
+    with _gemini_health_lock:
+        known = {m: dict(h) for m, h in _gemini_health.items()}
+    for m in known:
+        if m not in models:
+            models.append(m)
+
+    now = time.time()
+    order, _ = _gemini_route(models)
+    rows = []
+    for m in models:
+        h = known.get(m, {})
+        until = h.get("unhealthy_until") or 0
+        rows.append({
+            "model": m,
+            "status": "backoff" if until > now else "healthy",
+            "route_position": order.index(m) + 1 if m in order else None,
+            "failures": h.get("failures", 0),
+            "retry_in_s": round(until - now) if until > now else 0,
+            "last_error": h.get("last_error"),
+            "last_ok": time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(h["last_ok"])) if h.get("last_ok") else None,
+        })
+    return rows
+
+
+# -------------------------
+# Gemini: context caching (stały prefiks = system_instruction)
+# -------------------------
+
+# jawny cache (client.caches) tylko dla dużych prefiksów; mniejsze korzystają z implicit caching 2.5
+GEMINI_CONTEXT_CACHE_MIN_TOKENS = int(os.environ.get("GEMINI_CONTEXT_CACHE_MIN_TOKENS") or 4096)
+GEMINI_CONTEXT_CACHE_TTL_S = int(os.environ.get("GEMINI_CONTEXT_CACHE_TTL_S") or 3600)
+
+_gemini_caches: Dict[Tuple[str, str], Tuple[str, float]] = {}  # (model, prefix key) -> (cache name, wygasa)
+_gemini_cache_failed: Dict[Tuple[str, str], float] = {}  # nie próbujemy ponownie przez TTL (np. model bez cache)
+_gemini_caches_lock = threading.Lock()
+
+
+def _gemini_context_cache_enabled() -> bool:
+    return os.environ.get("GEMINI_CONTEXT_CACHE", "1").strip().lower() not in ["0", "false", "no"]
+
+
+def _gemini_cached_content(client, model: str, system_text: str) -> Optional[str]:
+    """Nazwa cached content dla prefiksu (tworzona przy pierwszym użyciu) albo None."""
+    if not _gemini_context_cache_enabled() or estimate_tokens(system_text) < GEMINI_CONTEXT_CACHE_MIN_TOKENS:
+        return None
+    key = (model, prefix_cache_key(system_text))
+    now = time.time()
+    with _gemini_caches_lock:
+        entry = _gemini_caches.get(key)
+        # margines 60 s, żeby cache nie wygasł w trakcie wywołania
+        if entry and entry[1] - 60 > now:
+            return entry[0]
+        if _gemini_cache_failed.get(key, 0) > now:
+            return None
+        _, _, genai_types = _genai_sdk()
+        try:
+            cache = client.caches.create(
+                model=model,
+                config=genai_types.CreateCachedContentConfig(
+                    system_instruction=system_text,
+                    display_name=key[1],
+                    ttl=f"{GEMINI_CONTEXT_CACHE_TTL_S}s",
+                ),
+            )
+        except Exception:
+            # za mały prefiks dla modelu / brak uprawnień — zostaje implicit caching
+            _gemini_cache_failed[key] = now + GEMINI_CONTEXT_CACHE_TTL_S
+            return None
+        _gemini_caches[key] = (cache.name, now + GEMINI_CONTEXT_CACHE_TTL_S)
+        return cache.name
+
+
+def _drop_gemini_cache(model: str, system_text: str) -> None:
+    with _gemini_caches_lock:
+        _gemini_caches.pop((model, prefix_cache_key(system_text)), None)
+
+
+def _gemini_generate(
+    client, model: str, system_text: str, user_text: str, json_mode: bool, rec: dict, max_tokens: Optional[int] = None
+):
+    _, genai_errors, genai_types = _genai_sdk()
+    json_kwargs = {"response_mime_type": "application/json"} if json_mode else {}
+    if max_tokens:
+        json_kwargs["max_output_tokens"] = max_tokens
+    cache_name = _gemini_cached_content(client, model, system_text) if system_text else None
+    if cache_name:
+        try:
+            resp = client.models.generate_content(
+                model=model,
+                contents=user_text,
+                config=genai_types.GenerateContentConfig(cached_content=cache_name, **json_kwargs),
+            )
+            rec["context_cache"] = True
+            return resp
+        except genai_errors.ClientError:
+            # cache usunięty / wygasły po stronie Google — jedno podejście bez niego
+            _drop_gemini_cache(model, system_text)
+    return client.models.generate_content(
+        model=model,
+        contents=user_text,
+        config=genai_types.GenerateContentConfig(system_instruction=system_text or None, **json_kwargs),
+    )
+
+
+def gemini_cache_table() -> List[dict]:
+    now = time.time()
+    with _gemini_caches_lock:
+        return [
+            {"model": model, "prefix": key, "cache": name, "expires_in_s": round(until - now)}
+            for (model, key), (name, until) in _gemini_caches.items()
+        ]
+
+
+# -------------------------
+# Main API
+# -------------------------
+
+# opcjonalny limiter wywołań (np. wspólny token bucket procesów worker_pool); fn(provider) blokuje
+_rate_limiter: Optional[Callable[[str], float]] = None
+
+
+def set_rate_limiter(fn: Optional[Callable[[str], float]]) -> None:
+    global _rate_limiter
+    _rate_limiter = fn
+
+
+def _acquire_rate(provider: str, rec: dict) -> None:
+    # przed każdym żądaniem HTTP (także retry i kolejny model Gemini) — limiter liczy prawdziwe wywołania
+    if _rate_limiter is not None:
+        rec["rate_limit_wait_ms"] = round(rec.get("rate_limit_wait_ms", 0) + _rate_limiter(provider) * 1000, 1)
+
+
+def _call_provider(
+    provider: str,
+    system_text: str,
+    user_text: str,
+    temperature: float,
+    model_hint: Optional[str],
+    rec: dict,
+    json_mode: bool = False,
+    max_tokens: Optional[int] = None,
+) -> str:
+    if provider != "gemini":
+        _acquire_rate(provider, rec)
 
     # ---------------- OpenAI ----------------
     if provider == "openai":
-        model = model_hint or os.environ.get("OPENAI_MODEL") or "gpt-4.1-mini"
+        model = default_model("openai", model_hint)
+        rec["requested_model"] = model
         client = _openai_client()
+        # automatyczny prefix caching; prompt_cache_key kieruje ten sam prefiks na te same serwery
         resp = client.chat.completions.create(
             model=model,
             temperature=temperature,
@@ -93,12 +483,18 @@ def chat_llm(
                 {"role": "system", "content": system_text or "You are helpful."},
                 {"role": "user", "content": user_text},
             ],
+            prompt_cache_key=prefix_cache_key(system_text),
+            **_openai_json_kwargs(json_mode),
+            **_openai_limit_kwargs(provider, max_tokens),
         )
+        rec["resolved_model"] = getattr(resp, "model", None) or model
+        _openai_usage(resp, rec)
         return resp.choices[0].message.content.strip()
 
     # ---------------- Qwen (OpenAI compatible) ----------------
     if provider == "qwen":
-        model = model_hint or os.environ.get("QWEN_MODEL") or "qwen-plus"
+        model = default_model("qwen", model_hint)
+        rec["requested_model"] = model
         client = _qwen_client()
 
         # Alibaba docs use /chat/completions endpoint; OpenAI SDK composes it internally
@@ -110,57 +506,319 @@ def chat_llm(
                 {"role": "system", "content": system_text or "You are helpful."},
                 {"role": "user", "content": user_text},
             ],
+            **_openai_json_kwargs(json_mode),
+            **_openai_limit_kwargs(provider, max_tokens),
         )
+        rec["resolved_model"] = getattr(resp, "model", None) or model
+        _openai_usage(resp, rec)
         return resp.choices[0].message.content.strip()
 
+    # ---------------- Mock (lokalny, bez kosztów) ----------------
+    if provider == "mock":
+        model = model_hint or "mock"
+        rec["requested_model"] = model
+        chat_messages = [
+            {"role": "system", "content": system_text or "You are helpful."},
+            {"role": "user", "content": user_text},
+        ]
+        base_url = os.environ.get("MOCK_BASE_URL")
+        if base_url:
+            # przez HTTP (mock_llm_server.py) — ta sama ścieżka co OpenAI/Qwen
+            resp = _mock_client(base_url).chat.completions.create(
+                model=model, temperature=temperature, messages=chat_messages,
+                **_openai_json_kwargs(json_mode), **_openai_limit_kwargs(provider, max_tokens),
+            )
+            rec["resolved_model"] = getattr(resp, "model", None) or model
+            _openai_usage(resp, rec)
+            return resp.choices[0].message.content.strip()
+
+        payload = _mock_backend().complete({
+            "model": model, "messages": chat_messages,
+            **_openai_json_kwargs(json_mode), **_openai_limit_kwargs(provider, max_tokens),
+        })
+        rec["resolved_model"] = payload["model"]
+        rec["truncated"] = payload["choices"][0]["finish_reason"] == "length"
+        rec["prompt_tokens"] = payload["usage"]["prompt_tokens"]
+        rec["completion_tokens"] = payload["usage"]["completion_tokens"]
+        rec["cached_tokens"] = payload["usage"]["prompt_tokens_details"]["cached_tokens"]
+        return payload["choices"][0]["message"]["content"].strip()
+
     # ---------------- Gemini (google-genai) ----------------
     if provider == "gemini":
         client = _gemini_client()
+        _, genai_errors, _ = _genai_sdk()
 
-        # Merge to one prompt string (supported usage) :contentReference[oaicite:4]{index=4}
-        prompt = (system_text + "\n\n" + user_text).strip() if system_text else user_text
+        fallback_models = _gemini_fallback_chain(model_hint)
+        rec["requested_model"] = fallback_models[0]
 
-        # If model_hint given: try it first; else use fallback chain
-        fallback_models = []
-        if model_hint:
-            fallback_models.append(model_hint)
-
-        # Defaults from env, then fallback models known in docs :contentReference[oaicite:5]{index=5}
-        env_model = os.environ.get("GEMINI_MODEL_TRANSLATE")
-        if env_model:
-            fallback_models.append(env_model)
-
-        fallback_models += [
-            "gemini-2.5-flash",
-            "gemini-2.0-flash",
-        ]
+        # modele z aktywnym backoffem pomijamy (bez zbędnych round-tripów)
+        ordered, skipped = _gemini_route(fallback_models)
+        rec["skipped_models"] = skipped
 
         last_err = None
-        for model in fallback_models:
+        for model in ordered:
+            _acquire_rate(provider, rec)
             try:
-                resp = client.models.generate_content(
-                    model=model,
-                    contents=prompt,
-                )
+                resp = _gemini_generate(client, model, system_text, user_text, json_mode, rec, max_tokens)
+                _mark_gemini_ok(model)
+                rec["resolved_model"] = model
+                _gemini_usage(resp, rec)
                 text = (resp.text or "").strip()
                 if text:
                     return text
                 return ""  # rare case
             except genai_errors.ClientError as e:
-                # Usually: model not found / not allowed / quota / region restrictions
+                # model not found / not allowed / quota → backoff modelu i następny z listy;
+                # inne 4xx dotyczą zapytania — ten sam błąd dałby każdy model, zdrowie zostaje bez zmian
+                if not _is_gemini_model_error(e):
+                    raise
+                _mark_gemini_failure(model, e)
                 last_err = e
+                rec["fallback_hops"] += 1
                 continue
 
         raise last_err if last_err else RuntimeError("Gemini call failed for unknown reasons.")
 
-    raise ValueError("Nieznany provider LLM. Dozwolone: openai|gemini|qwen")
+    raise ValueError("Nieznany provider LLM. Dozwolone: openai|gemini|qwen|mock")
+
+
+# -------------------------
+# Single-flight (identyczne zapytania w toku, per proces)
+# -------------------------
+
+_flights = SingleFlight()
+
+
+def single_flight_enabled() -> bool:
+    return os.environ.get("LLM_SINGLE_FLIGHT", "1").strip().lower() not in ["0", "false", "no"]
+
+
+def single_flight_stats() -> dict:
+    """Liczniki tego procesu: leaders = wykonane wywołania, coalesced = dołączone do trwających."""
+    return _flights.stats()
+
+
+def chat_llm_detailed(
+    provider: str,
+    messages: list,
+    temperature: float = 0.2,
+    model_hint: Optional[str] = None,
+    lang: Optional[str] = None,
+    purpose: str = "translate",
+    allow_hedge: bool = True,
+    json_mode: bool = False,
+    max_tokens: Optional[int] = None,
+    route: Optional[dict] = None,
+) -> Tuple[str, dict]:
+    """
+    Jak chat_llm, ale zwraca też rekord metryk wywołania (ten sam, który trafia do llm_metrics).
+    Błędy przejściowe (429/5xx/timeout) są ponawiane z backoffem (llm_resilience);
+    przy LLM_HEDGE_PROVIDER wolne wywołanie (> p95) jest dublowane do drugiego providera.
+    Prompt jest przycinany do budżetu tokenów (token_budget); max_tokens=None → wyliczany z długości
+    tekstu i języka docelowego (review: stały limit na JSON).
+    provider="auto": wybór i failover przez llm_router (route = decyzja routera, trafia do metryk).
+    Identyczne zapytanie, które jest właśnie w toku, nie idzie drugi raz do providera (single_flight,
+    LLM_SINGLE_FLIGHT=0 wyłącza) — dostaje ten sam wynik, rekord metryk ma coalesced=True.
+    """
+
+    provider = provider.lower().strip()
+    if provider == "auto":
+        from llm_router import chat_routed
+
+        return chat_routed(messages, temperature=temperature, lang=lang, purpose=purpose,
+                           json_mode=json_mode, max_tokens=max_tokens)
+    model = default_model(provider, model_hint)
+    system_text, user_text, budget_info = _budgeted_prompt(messages, provider, model)
+    if max_tokens is None:
+        max_tokens = output_budget(provider, model, purpose, lang, user_text)
+
+    def call() -> Tuple[str, dict]:
+        with span(f"llm_{purpose}:{provider}"):
+            return _chat_call(provider, model, messages, system_text, user_text, budget_info, temperature,
+                              model_hint, lang, purpose, allow_hedge, json_mode, max_tokens, route)
+
+    if not single_flight_enabled():
+        return call()
+    # identyczne zapytanie już w toku (inna sesja / wiersz batcha) → czekamy na jego wynik zamiast drugiego wywołania
+    flight_key = llm_cache.cache_key(provider, model, temperature, system_text, user_text) + f":{json_mode}:{max_tokens}"
+    started = time.perf_counter()
+    (text, leader_rec), shared = _flights.do(flight_key, call)
+    if not shared:
+        return text, leader_rec
+    rec = {
+        **leader_rec,
+        "purpose": purpose, "lang": lang, "ok": True, "error": None, "coalesced": True,
+        "total_ms": round((time.perf_counter() - started) * 1000, 1), "connect_ms": None, "ttfb_ms": None,
+        "prompt_tokens": None, "completion_tokens": None, "cached_tokens": None, "cost_usd": 0.0,
+        "retries": 0, "retry_sleep_ms": 0, "http_attempts": 0,
+    }
+    record_call(rec)
+    return text, rec
+
+
+def _chat_call(
+    provider: str,
+    model: str,
+    messages: list,
+    system_text: str,
+    user_text: str,
+    budget_info: dict,
+    temperature: float,
+    model_hint: Optional[str],
+    lang: Optional[str],
+    purpose: str,
+    allow_hedge: bool,
+    json_mode: bool,
+    max_tokens: int,
+    route: Optional[dict],
+) -> Tuple[str, dict]:
+    rec = {
+        "provider": provider,
+        "purpose": purpose,
+        "lang": lang,
+        "requested_model": model_hint,
+        "resolved_model": None,
+        "ok": False,
+        "error": None,
+        "total_ms": None,
+        "connect_ms": None,
+        "ttfb_ms": None,
+        "prompt_tokens": None,
+        "completion_tokens": None,
+        "cached_tokens": None,
+        "cost_usd": None,
+        "retries": 0,
+        "retry_sleep_ms": 0,
+        "http_attempts": 0,
+        "fallback_hops": 0,
+        "skipped_models": [],
+        "cache_hit": False,
+        "context_cache": False,
+        "coalesced": False,
+        "max_tokens": max_tokens,
+        "truncated": False,
+        **budget_info,
+    }
+    if route is not None:
+        rec["route"] = route
+
+    cache_key = None
+    if llm_cache.cache_enabled():
+        cache_key = llm_cache.cache_key(provider, model, temperature, system_text, user_text)
+        cached = llm_cache.get(cache_key)
+        if cached is not None:
+            rec.update({"ok": True, "cache_hit": True, "total_ms": 0.0, "cost_usd": 0.0})
+            record_call(rec)
+            return cached, rec
+
+    def primary() -> str:
+        return call_with_retries(
+            provider,
+            lambda: _call_provider(provider, system_text, user_text, temperature, model_hint, rec, json_mode, max_tokens),
+            rec,
+        )
+
+    policy = current_policy()
+    hedge_provider = policy.hedge_provider if allow_hedge and policy.hedge_provider not in ("", provider) else None
+    hedge_delay = hedge_delay_s(provider, policy) if hedge_provider else None
+
+    timing = _CallTiming()
+    token = _current_timing.set(timing)
+    started = time.perf_counter()
+    try:
+        if hedge_delay is None:
+            text = primary()
+        else:
+            def secondary() -> str:
+                hedge_text, _ = chat_llm_detailed(
+                    hedge_provider, messages, temperature=temperature, lang=lang, purpose=purpose,
+                    allow_hedge=False, json_mode=json_mode,
+                )
+                return hedge_text
+
+            text, winner = hedged(primary, secondary, hedge_delay)
+            rec["hedge_winner"] = winner
+            if winner == "hedge":
+                # odpowiedź dał drugi provider (ma własny rekord); ten rekord nie trafia do statystyk latency
+                rec["error"] = f"abandoned: {hedge_provider} answered first (hedge after {hedge_delay:.1f}s)"
+                return text, rec
+        rec["ok"] = True
+        # ucięta odpowiedź (limit max_tokens) nie trafia do cache
+        if cache_key is not None and text and not rec["truncated"]:
+            llm_cache.put(cache_key, text, provider=provider, model=rec["resolved_model"] or "")
+        return text, rec
+    except Exception as e:
+        rec["error"] = f"{type(e).__name__}: {e}"[:500]
+        raise
+    finally:
+        _current_timing.reset(token)
+        rec["total_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        if timing.ttfb_ms is not None:
+            rec["ttfb_ms"] = round(timing.ttfb_ms, 1)
+            # brak zdarzeń connect = połączenie wzięte z puli
+            rec["connect_ms"] = round(timing.connect_ms or 0.0, 1)
+        rec["http_attempts"] = timing.attempts
+        rec["cost_usd"] = estimate_cost(rec["resolved_model"], rec["prompt_tokens"], rec["completion_tokens"], rec["cached_tokens"])
+        record_call(rec)
+
+
+def chat_llm(
+    provider: str,
+    messages: list,
+    temperature: float = 0.2,
+    model_hint: Optional[str] = None,
+    lang: Optional[str] = None,
+    purpose: str = "translate",
+    json_mode: bool = False,
+    max_tokens: Optional[int] = None,
+) -> str:
+    """
+    provider: openai | gemini | qwen | mock | auto (llm_router)
+    lang / purpose trafiają do metryk (llm_metrics); lang wpływa też na domyślne max_tokens.
+    LLM_CACHE_ENABLED=1: identyczne zapytania (provider, model, temperature, prompt) zwracane z llm_cache.
+    """
+    text, _ = chat_llm_detailed(
+        provider,
+        messages=messages,
+        temperature=temperature,
+        model_hint=model_hint,
+        lang=lang,
+        purpose=purpose,
+        json_mode=json_mode,
+        max_tokens=max_tokens,
+    )
+    return text
+
+
+def review_provider() -> str:
+    # LLM_REVIEW_PROVIDER=mock pozwala uruchomić cały pipeline offline (benchmarki, CI)
+    return (os.environ.get("LLM_REVIEW_PROVIDER") or "gemini").lower().strip()
 
 
-def review_llm(messages: list, temperature: float = 0.1, model_hint: Optional[str] = None) -> str:
+def default_review_model() -> str:
+    return os.environ.get("GEMINI_MODEL_REVIEW") or "gemini-2.5-pro"
+
+
+def review_llm(
+    messages: list,
+    temperature: float = 0.1,
+    model_hint: Optional[str] = None,
+    lang: Optional[str] = None,
+    json_mode: bool = False,
+) -> str:
     """
     Review ALWAYS by Gemini, but with fallback models if primary not available.
     Recommended stable choice is often gemini-2.5-flash (availability varies). :contentReference[oaicite:6]{index=6}
     """
+    provider = review_provider()
     # try explicit review model first, then fallback chain inside chat_llm
-    review_model = model_hint or os.environ.get("GEMINI_MODEL_REVIEW") or "gemini-2.5-pro"
-    return chat_llm("gemini", messages=messages, temperature=temperature, model_hint=review_model)
+    review_model = model_hint or (default_review_model() if provider == "gemini" else None)
+    return chat_llm(
+        provider,
+        messages=messages,
+        temperature=temperature,
+        model_hint=review_model,
+        lang=lang,
+        purpose="review",
+        json_mode=json_mode,
+    )
@@ -0,0 +1,262 @@
+import contextvars
+import os
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import httpx
+
+from llm_metrics import load_calls, percentile
+
+
+# -------------------------
+# Polityka (ENV)
+# -------------------------
+
+@dataclass
+class ResiliencePolicy:
+    max_retries: int = 3
+    backoff_base_s: float = 1.0
+    backoff_max_s: float = 30.0
+    retry_after_max_s: float = 60.0
+    breaker_failures: int = 5
+    breaker_cooldown_s: float = 60.0
+    hedge_provider: str = ""
+    hedge_min_samples: int = 20
+    hedge_percentile: float = 95.0
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+def current_policy() -> ResiliencePolicy:
+    """Czytane przy każdym wywołaniu, żeby zmiana ENV/secrets działała bez restartu."""
+    return ResiliencePolicy(
+        max_retries=int(_env_float("LLM_RETRY_MAX", 3)),
+        backoff_base_s=_env_float("LLM_RETRY_BASE_S", 1.0),
+        backoff_max_s=_env_float("LLM_RETRY_MAX_S", 30.0),
+        retry_after_max_s=_env_float("LLM_RETRY_AFTER_MAX_S", 60.0),
+        breaker_failures=int(_env_float("LLM_BREAKER_FAILURES", 5)),
+        breaker_cooldown_s=_env_float("LLM_BREAKER_COOLDOWN_S", 60.0),
+        hedge_provider=(os.environ.get("LLM_HEDGE_PROVIDER") or "").lower().strip(),
+        hedge_min_samples=int(_env_float("LLM_HEDGE_MIN_SAMPLES", 20)),
+        hedge_percentile=_env_float("LLM_HEDGE_PERCENTILE", 95.0),
+    )
+
+
+# -------------------------
+# Klasyfikacja błędów
+# -------------------------
+
+_TRANSIENT_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+_TRANSIENT_NAMES = {"APIConnectionError", "APITimeoutError", "ServerError"}
+
+
+def _status_code(err: Exception) -> Optional[int]:
+    # openai: status_code; google-genai: code (int). openai.code bywa stringiem ("rate_limit_exceeded").
+    status = getattr(err, "status_code", None)
+    if isinstance(status, int):
+        return status
+    code = getattr(err, "code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_transient(err: Exception) -> bool:
+    if getattr(err, "code", None) == "insufficient_quota":
+        # 429 z brakiem środków nie minie po retry
+        return False
+    if isinstance(err, httpx.TransportError) or type(err).__name__ in _TRANSIENT_NAMES:
+        return True
+    status = _status_code(err)
+    return status is not None and (status in _TRANSIENT_STATUS or status >= 500)
+
+
+def retry_after_s(err: Exception) -> Optional[float]:
+    """Retry-After / retry-after-ms z odpowiedzi HTTP (jeśli SDK ją udostępnia)."""
+    response = getattr(err, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+    try:
+        ms = headers.get("retry-after-ms")
+        if ms:
+            return float(ms) / 1000
+        value = headers.get("retry-after")
+        if not value:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, policy: ResiliencePolicy, err: Optional[Exception] = None) -> float:
+    """Exponential backoff z pełnym jitterem; Retry-After ma pierwszeństwo."""
+    hinted = retry_after_s(err) if err is not None else None
+    if hinted is not None:
+        return min(hinted, policy.retry_after_max_s)
+    cap = min(policy.backoff_max_s, policy.backoff_base_s * 2 ** attempt)
+    return random.uniform(0, cap)
+
+
+# -------------------------
+# Circuit breaker (per provider, per proces)
+# -------------------------
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    def __init__(self, name: str):
+        self.name = name
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_call(self, policy: ResiliencePolicy) -> None:
+        with self._lock:
+            if self.state == "open":
+                if time.time() - self.opened_at < policy.breaker_cooldown_s:
+                    left = policy.breaker_cooldown_s - (time.time() - self.opened_at)
+                    raise CircuitOpenError(f"Provider {self.name} chwilowo wyłączony (circuit open, {left:.0f}s).")
+                self.state = "half_open"
+            if self.state == "half_open":
+                # po cooldownie dokładnie jedno wywołanie próbne; reszta czeka na jego wynik (fail fast)
+                if self.probe_in_flight:
+                    raise CircuitOpenError(f"Provider {self.name}: trwa wywołanie próbne (circuit half-open).")
+                self.probe_in_flight = True
+
+    def on_success(self) -> None:
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+            self.probe_in_flight = False
+
+    def release(self) -> None:
+        """Wywołanie zakończone błędem nieprzejściowym (np. 400) — nic nie mówi o providerze, próba wolna."""
+        with self._lock:
+            self.probe_in_flight = False
+
+    def on_failure(self, policy: ResiliencePolicy) -> None:
+        with self._lock:
+            self.probe_in_flight = False
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= policy.breaker_failures:
+                self.state = "open"
+                self.opened_at = time.time()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {"provider": self.name, "state": self.state, "failures": self.failures,
+                    "opened_at": time.strftime("%H:%M:%S", time.localtime(self.opened_at)) if self.opened_at else None}
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def breaker_for(provider: str) -> CircuitBreaker:
+    with _breakers_lock:
+        if provider not in _breakers:
+            _breakers[provider] = CircuitBreaker(provider)
+        return _breakers[provider]
+
+
+def breaker_table() -> list:
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return [b.snapshot() for b in breakers]
+
+
+def call_with_retries(provider: str, fn: Callable[[], str], rec: Optional[dict] = None, sleep=time.sleep) -> str:
+    """
+    Wywołuje fn z retry na błędach przejściowych (429/5xx/timeout) i circuit breakerem providera.
+    Błędy nieprzejściowe (np. 400, brak klucza) lecą od razu, bez retry i bez liczenia do breakera.
+    """
+    policy = current_policy()
+    breaker = breaker_for(provider)
+    attempt = 0
+    while True:
+        breaker.before_call(policy)
+        try:
+            result = fn()
+        except BaseException as e:
+            if not isinstance(e, Exception) or not is_transient(e):
+                breaker.release()
+                raise
+            breaker.on_failure(policy)
+            if attempt >= policy.max_retries or breaker.state == "open":
+                raise
+            delay = backoff_delay(attempt, policy, e)
+            attempt += 1
+            if rec is not None:
+                rec["retries"] = attempt
+                rec["retry_sleep_ms"] = round(rec.get("retry_sleep_ms", 0) + delay * 1000, 1)
+            sleep(delay)
+            continue
+        breaker.on_success()
+        return result
+
+
+# -------------------------
+# Hedged requests
+# -------------------------
+
+_hedge_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="llm-hedge")
+_p95_cache: Dict[str, Tuple[float, Optional[float]]] = {}
+_p95_lock = threading.Lock()
+_P95_TTL_S = 60.0
+
+
+def hedge_delay_s(provider: str, policy: ResiliencePolicy) -> Optional[float]:
+    """pXX latency udanych wywołań providera (z llm_metrics); None gdy za mało danych."""
+    now = time.time()
+    with _p95_lock:
+        cached = _p95_cache.get(provider)
+        if cached and now - cached[0] < _P95_TTL_S:
+            return cached[1]
+    latencies = [r.get("total_ms") for r in load_calls(limit=2000) if r.get("provider") == provider and r.get("ok")]
+    value = None
+    if latencies and len(latencies) >= policy.hedge_min_samples:
+        value = percentile(latencies, policy.hedge_percentile) / 1000
+    with _p95_lock:
+        _p95_cache[provider] = (now, value)
+    return value
+
+
+def hedged(primary: Callable[[], str], secondary: Callable[[], str], delay_s: float) -> Tuple[str, str]:
+    """
+    Startuje primary; jeśli nie skończy w delay_s, równolegle startuje secondary.
+    Zwraca (tekst, "primary"|"hedge") pierwszego udanego; błąd tylko gdy oba padną.
+    """
+    futures = {_hedge_pool.submit(contextvars.copy_context().run, primary): "primary"}
+    done, _ = wait(futures, timeout=delay_s)
+    if not done:
+        futures[_hedge_pool.submit(contextvars.copy_context().run, secondary)] = "hedge"
+
+    pending = set(futures)
+    last_err = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for fut in done:
+            try:
+                return fut.result(), futures[fut]
+            except Exception as e:
+                last_err = e
+                if futures[fut] == "primary" and len(futures) == 1:
+                    # primary padł przed startem hedge — nie ma na co czekać
+                    raise
+    raise last_err
@@ -0,0 +1,328 @@
+"""
+Routing providerów tłumaczenia (provider "auto"): wybór providera per zapytanie na podstawie zmierzonych
+statystyk per język — latency (p50/p95), odsetek błędów i koszt z llm_metrics, jakość z review
+(verdict/confidence z tłumaczeń i benchmarków) — oraz failover do kolejnego providera, gdy wybrany zawiedzie.
+
+Jakość: data/metrics/router.db (tabela quality), przy pierwszym użyciu zasilana historią z archive.db.
+Statystyki języka z za małą liczbą pomiarów uzupełniane są statystykami providera ze wszystkich języków.
+
+Polityka (ENV):
+  LLM_ROUTER_PROVIDERS       kandydaci w kolejności preferencji (openai,gemini,qwen)
+  LLM_ROUTER_OBJECTIVE       fastest | cheapest | quality (fastest)
+  LLM_ROUTER_MIN_CONFIDENCE  minimalna średnia confidence z review (85)
+  LLM_ROUTER_MAX_ERROR_RATE  maks. odsetek błędów w oknie (0.2)
+  LLM_ROUTER_MIN_SAMPLES     od ilu pomiarów statystyka się liczy (5)
+  LLM_ROUTER_WINDOW          ile ostatnich wywołań / review per provider i język (200)
+  LLM_ROUTER_EXPLORE         odsetek zapytań kierowanych do kandydata bez pomiarów (0.05)
+
+Np. "najszybszy z confidence ≥ 85": LLM_ROUTER_OBJECTIVE=fastest, LLM_ROUTER_MIN_CONFIDENCE=85.
+"""
+import os
+import random
+import sqlite3
+import statistics
+import threading
+import time
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Tuple
+
+from llm_metrics import load_calls, percentile
+from llm_resilience import breaker_for, current_policy
+
+AUTO = "auto"
+DB_PATH = os.path.join("data", "metrics", "router.db")
+OBJECTIVES = ("fastest", "cheapest", "quality")
+
+_STATS_TTL_S = 30.0
+_stats_cache: Dict[tuple, Tuple[float, Dict[str, dict]]] = {}
+_calls_cache: Tuple[float, List[dict]] = (0.0, [])
+_stats_lock = threading.Lock()
+_db_lock = threading.Lock()
+_rng = random.Random()
+
+
+@dataclass
+class RouterPolicy:
+    providers: Tuple[str, ...] = ("openai", "gemini", "qwen")
+    objective: str = "fastest"
+    min_confidence: float = 85.0
+    max_error_rate: float = 0.2
+    min_samples: int = 5
+    window: int = 200
+    explore: float = 0.05
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+def current_router_policy() -> RouterPolicy:
+    providers = tuple(
+        p.strip().lower() for p in (os.environ.get("LLM_ROUTER_PROVIDERS") or "openai,gemini,qwen").split(",")
+        if p.strip() and p.strip().lower() != AUTO
+    )
+    objective = (os.environ.get("LLM_ROUTER_OBJECTIVE") or "fastest").lower().strip()
+    return RouterPolicy(
+        providers=providers or RouterPolicy.providers,
+        objective=objective if objective in OBJECTIVES else "fastest",
+        min_confidence=_env_float("LLM_ROUTER_MIN_CONFIDENCE", 85),
+        max_error_rate=_env_float("LLM_ROUTER_MAX_ERROR_RATE", 0.2),
+        min_samples=int(_env_float("LLM_ROUTER_MIN_SAMPLES", 5)),
+        window=int(_env_float("LLM_ROUTER_WINDOW", 200)),
+        explore=max(0.0, min(1.0, _env_float("LLM_ROUTER_EXPLORE", 0.05))),
+    )
+
+
+# -------------------------
+# Jakość (review) — router.db
+# -------------------------
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS quality ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT, ts REAL NOT NULL, lang TEXT, provider TEXT NOT NULL,"
+        " verdict TEXT, confidence INTEGER, source TEXT)"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_quality_provider ON quality(provider, lang, id)")
+    if conn.execute("PRAGMA user_version").fetchone()[0] == 0:
+        _seed_from_archive(conn)
+        conn.execute("PRAGMA user_version = 1")
+    conn.commit()
+    return conn
+
+
+def _seed_from_archive(conn: sqlite3.Connection) -> None:
+    # historia review z archiwum tłumaczeń — router ma dane od pierwszego uruchomienia
+    from translations_archive import ARCHIVE_DB
+
+    if not os.path.exists(ARCHIVE_DB):
+        return
+    src = sqlite3.connect(ARCHIVE_DB, timeout=30)
+    try:
+        rows = src.execute(
+            "SELECT datetime, lang, provider, verdict, confidence FROM translations"
+            " WHERE verdict IS NOT NULL ORDER BY datetime"
+        ).fetchall()
+    except sqlite3.OperationalError:
+        rows = []
+    finally:
+        src.close()
+    conn.executemany(
+        "INSERT INTO quality (ts, lang, provider, verdict, confidence, source) VALUES (?, ?, ?, ?, ?, 'archive')",
+        [(_archive_ts(dt), lang, (provider or "").replace(" (batch)", "").strip().lower(), verdict, confidence)
+         for dt, lang, provider, verdict, confidence in rows if provider],
+    )
+
+
+def _archive_ts(value: str) -> float:
+    try:
+        return time.mktime(time.strptime(value[:19], "%Y-%m-%d %H:%M:%S"))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def record_quality(lang: Optional[str], provider: str, verdict: Optional[str], confidence: Optional[int],
+                   source: str = "translate") -> None:
+    """Wynik review tłumaczenia danego providera (pipeline, benchmark) — wejście do routingu."""
+    if not provider or provider == AUTO or (verdict is None and confidence is None):
+        return
+    with _db_lock:
+        conn = _connect()
+        try:
+            conn.execute(
+                "INSERT INTO quality (ts, lang, provider, verdict, confidence, source) VALUES (?, ?, ?, ?, ?, ?)",
+                (time.time(), lang, provider, verdict, confidence, source),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def _quality(conn: sqlite3.Connection, provider: str, lang: Optional[str], window: int) -> dict:
+    where, args = ("provider = ? AND lang = ?", (provider, lang)) if lang else ("provider = ?", (provider,))
+    rows = conn.execute(
+        f"SELECT verdict, confidence FROM quality WHERE {where} ORDER BY id DESC LIMIT ?", (*args, window)
+    ).fetchall()
+    confidences = [c for _, c in rows if c is not None]
+    verdicts = [v for v, _ in rows if v]
+    return {
+        "reviews": len(rows),
+        "confidence_avg": round(statistics.mean(confidences), 1) if confidences else None,
+        "ok_rate": round(sum(v == "OK" for v in verdicts) / len(verdicts), 3) if verdicts else None,
+    }
+
+
+# -------------------------
+# Statystyki per provider (okno ostatnich wywołań)
+# -------------------------
+
+def _call_stats(calls: List[dict]) -> dict:
+    # odpowiedzi z llm_cache, dołączone do cudzego wywołania (single-flight) i porzucone przez hedge
+    # nie mówią nic o providerze
+    calls = [c for c in calls if not c.get("cache_hit") and not c.get("coalesced")
+             and not str(c.get("error") or "").startswith("abandoned")]
+    ok = [c for c in calls if c.get("ok")]
+    latencies = [c.get("total_ms") for c in ok]
+    p50, p95 = percentile(latencies, 50), percentile(latencies, 95)
+    costs = [c["cost_usd"] for c in ok if c.get("cost_usd") is not None]
+    return {
+        "calls": len(calls),
+        "error_rate": round(1 - len(ok) / len(calls), 3) if calls else None,
+        "p50_ms": round(p50, 1) if p50 is not None else None,
+        "p95_ms": round(p95, 1) if p95 is not None else None,
+        "cost_per_call_usd": round(statistics.mean(costs), 6) if costs else None,
+    }
+
+
+def _recent_translate_calls() -> List[dict]:
+    # jeden odczyt JSONL na _STATS_TTL_S dla wszystkich języków
+    global _calls_cache
+    now = time.time()
+    with _stats_lock:
+        if now - _calls_cache[0] < _STATS_TTL_S:
+            return _calls_cache[1]
+    calls = [c for c in load_calls(limit=50_000) if c.get("purpose") == "translate"]
+    with _stats_lock:
+        _calls_cache = (now, calls)
+    return calls
+
+
+def provider_stats(lang: Optional[str] = None, policy: Optional[RouterPolicy] = None) -> Dict[str, dict]:
+    """Statystyki kandydatów dla języka (lang=None: wszystkie języki); cache na _STATS_TTL_S."""
+    policy = policy or current_router_policy()
+    key = (lang, policy.providers, policy.window)
+    now = time.time()
+    with _stats_lock:
+        cached = _stats_cache.get(key)
+        if cached and now - cached[0] < _STATS_TTL_S:
+            return cached[1]
+
+    by_provider: Dict[str, List[dict]] = {p: [] for p in policy.providers}
+    for c in _recent_translate_calls():
+        provider = c.get("provider")
+        if provider in by_provider and (lang is None or c.get("lang") == lang):
+            by_provider[provider].append(c)
+
+    with _db_lock:
+        conn = _connect()
+        try:
+            stats = {
+                p: {**_call_stats(calls[-policy.window:]), **_quality(conn, p, lang, policy.window)}
+                for p, calls in by_provider.items()
+            }
+        finally:
+            conn.close()
+
+    with _stats_lock:
+        _stats_cache[key] = (now, stats)
+    return stats
+
+
+def _merged_stats(lang: Optional[str], policy: RouterPolicy) -> Dict[str, dict]:
+    """Statystyki języka; za mało pomiarów w języku → wartości providera ze wszystkich języków."""
+    local = provider_stats(lang, policy)
+    if lang is None:
+        return local
+    overall = provider_stats(None, policy)
+    merged = {}
+    for p in policy.providers:
+        s = dict(local[p])
+        if s["calls"] < policy.min_samples:
+            for key in ("calls", "error_rate", "p50_ms", "p95_ms", "cost_per_call_usd"):
+                s[key] = overall[p][key]
+        if s["reviews"] < policy.min_samples:
+            for key in ("reviews", "confidence_avg", "ok_rate"):
+                s[key] = overall[p][key]
+        merged[p] = s
+    return merged
+
+
+# -------------------------
+# Ranking + wywołanie z failoverem
+# -------------------------
+
+def _objective_value(s: dict, objective: str) -> Optional[float]:
+    if objective == "cheapest":
+        return s["cost_per_call_usd"]
+    if objective == "quality":
+        return -s["confidence_avg"] if s["confidence_avg"] is not None else None
+    return s["p50_ms"]
+
+
+def rank_providers(lang: Optional[str], policy: Optional[RouterPolicy] = None) -> List[dict]:
+    """
+    Kandydaci w kolejności prób: spełniający politykę wg celu, potem bez pomiarów (kolejność preferencji),
+    na końcu wykluczeni (circuit open / błędy / niska jakość) — tylko jako ostatnia deska ratunku.
+    """
+    policy = policy or current_router_policy()
+    resilience = current_policy()
+    rows = []
+    for order, (p, s) in enumerate(_merged_stats(lang, policy).items()):
+        reason = ""
+        breaker = breaker_for(p)
+        if breaker.state == "open" and time.time() - breaker.opened_at < resilience.breaker_cooldown_s:
+            reason = "circuit open"
+        elif s["calls"] >= policy.min_samples and (s["error_rate"] or 0) > policy.max_error_rate:
+            reason = f"błędy {s['error_rate']:.0%}"
+        elif s["reviews"] >= policy.min_samples and s["confidence_avg"] is not None \
+                and s["confidence_avg"] < policy.min_confidence:
+            reason = f"confidence {s['confidence_avg']:.0f} < {policy.min_confidence:.0f}"
+        value = _objective_value(s, policy.objective)
+        measured = value is not None and (s["calls"] if policy.objective != "quality" else s["reviews"]) >= policy.min_samples
+        rows.append({"provider": p, **s, "eligible": not reason, "excluded": reason, "measured": measured,
+                     "_key": (bool(reason), not measured, value if measured else 0.0, order)})
+
+    rows.sort(key=lambda r: r["_key"])
+    unmeasured = [r for r in rows if r["eligible"] and not r["measured"]]
+    if unmeasured and _rng.random() < policy.explore:
+        # eksploracja: kandydat bez pomiarów idzie pierwszy, żeby statystyki w ogóle powstały
+        pick = _rng.choice(unmeasured)
+        rows.remove(pick)
+        rows.insert(0, pick)
+    for r in rows:
+        r.pop("_key")
+    return rows
+
+
+def chat_routed(
+    messages: list,
+    temperature: float = 0.2,
+    lang: Optional[str] = None,
+    purpose: str = "translate",
+    json_mode: bool = False,
+    max_tokens: Optional[int] = None,
+) -> Tuple[str, dict]:
+    """
+    chat_llm_detailed z wyborem providera przez rank_providers. Błąd wywołania (po retry z llm_resilience,
+    otwarty breaker, brak klucza) → kolejny kandydat. Zwracany rekord jest rekordem udanego providera.
+    """
+    from llm_providers import chat_llm_detailed
+
+    policy = current_router_policy()
+    ranking = rank_providers(lang, policy)
+    failed = []
+    for rank, row in enumerate(ranking):
+        route = {"objective": policy.objective, "rank": rank, "failed_over": [p for p, _ in failed]}
+        try:
+            return chat_llm_detailed(
+                row["provider"], messages, temperature=temperature, lang=lang, purpose=purpose,
+                json_mode=json_mode, max_tokens=max_tokens, route=route,
+            )
+        except Exception as e:
+            failed.append((row["provider"], f"{type(e).__name__}: {e}"[:200]))
+    raise RuntimeError("Routing auto: wszyscy providerzy zawiedli — " + "; ".join(f"{p}: {err}" for p, err in failed))
+
+
+def router_table(lang: Optional[str]) -> List[dict]:
+    """Ranking z uzasadnieniem — do podglądu w UI."""
+    return [
+        {"provider": r["provider"], "wykluczony": r["excluded"] or "—", "p50_ms": r["p50_ms"], "p95_ms": r["p95_ms"],
+         "error_rate": r["error_rate"], "calls": r["calls"], "confidence_avg": r["confidence_avg"],
+         "ok_rate": r["ok_rate"], "reviews": r["reviews"], "cost_per_call_usd": r["cost_per_call_usd"]}
+        for r in rank_providers(lang, replace(current_router_policy(), explore=0.0))
+    ]
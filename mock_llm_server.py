@@ -0,0 +1,274 @@
+"""
+Lokalny serwer HTTP zgodny z OpenAI Chat Completions (POST /v1/chat/completions).
+Do testów obciążeniowych i benchmarków bez zużywania quota / bez sieci.
+
+Uruchomienie:
+    python mock_llm_server.py --port 8100 --latency lognormal:400:0.5 --error-rate 0.05 --rate-limit-rate 0.05
+
+Użycie z aplikacji:
+    provider "mock" bez MOCK_BASE_URL działa w procesie (MOCK_LATENCY, MOCK_ERROR_RATE, MOCK_RATE_LIMIT_RATE)
+    MOCK_BASE_URL=http://127.0.0.1:8100/v1           # provider "mock" idzie przez HTTP
+    QWEN_BASE_URL=http://127.0.0.1:8100/v1 QWEN_API_KEY=x   # albo przez istniejącą ścieżkę Qwen
+"""
+import argparse
+import hashlib
+import json
+import math
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from typing import List, Optional
+
+
+@dataclass
+class MockConfig:
+    latency: str = "fixed:50"
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after_s: float = 1.0
+    seed: Optional[int] = None
+
+
+def sample_latency_ms(spec: str, rng: random.Random) -> float:
+    """
+    fixed:MS | uniform:MIN:MAX | normal:MEAN:SD | lognormal:MEDIAN:SIGMA
+    """
+    parts = (spec or "fixed:0").split(":")
+    kind, args = parts[0], [float(x) for x in parts[1:]]
+    if kind == "fixed":
+        return args[0] if args else 0.0
+    if kind == "uniform":
+        return rng.uniform(args[0], args[1])
+    if kind == "normal":
+        return max(0.0, rng.gauss(args[0], args[1]))
+    if kind == "lognormal":
+        return rng.lognormvariate(math.log(args[0]), args[1])
+    raise ValueError(f"Nieznany rozkład latency: {spec}")
+
+
+MOCK_PREFIX_CACHE_MIN_TOKENS = 1024
+
+
+def _estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+def mock_translate(messages: List[dict], json_mode: bool = False) -> str:
+    """
+    Deterministyczne "tłumaczenie": echo ostatniej wiadomości użytkownika.
+    Dla promptu tłumaczenia zwraca sam blok NAME/BODY z prefiksem [lang], dla review — poprawny verdict
+    (JSON, gdy zapytanie ma response_format json_object).
+    """
+    user = ""
+    for m in messages:
+        if (m.get("role") or "") != "system":
+            user = m.get("content") or ""
+    # język i instrukcje review mogą być w prefiksie (system) — szukamy w całej rozmowie
+    full = "\n".join(m.get("content") or "" for m in messages)
+    target = re.search(r"Target language:\s*(.+)", full)
+    tag = f"[{target.group(1).strip()}] " if target else "[mock] "
+
+    if "TRANSLATION" in user and "VERDICT" in full.upper():
+        digest = hashlib.sha1(user.encode("utf-8")).hexdigest()[:8]
+        if json_mode:
+            return json.dumps({"verdict": "OK", "issues": [], "fixes": [], "confidence": 90, "mock": digest})
+        return f"VERDICT: OK\nISSUES:\n- none (mock {digest})\nSUGGESTED FIXES:\n- none\nCONFIDENCE: 90"
+
+    src = user
+    idx = src.find("NAME:")
+    if idx >= 0:
+        src = src[idx:]
+    elif src.startswith("Translate:"):
+        # kolejny kawałek długiego tekstu (bez NAME/BODY)
+        src = src[len("Translate:"):]
+    return "\n".join((tag + line) if line.strip() and not line.startswith(("NAME:", "BODY:")) else line
+                     for line in src.strip().split("\n"))
+
+
+class MockHTTPError(Exception):
+    """Błąd backendu w procesie; wygląda jak błąd SDK (status_code + response.headers) dla llm_resilience."""
+
+    def __init__(self, status_code: int, message: str, headers: Optional[dict] = None):
+        super().__init__(f"{status_code}: {message}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(headers={k.lower(): v for k, v in (headers or {}).items()})
+
+
+class MockBackend:
+    """Logika odpowiedzi wspólna dla serwera HTTP i providera "mock" w procesie."""
+
+    def __init__(self, config: Optional[MockConfig] = None):
+        self.config = config or MockConfig()
+        self.rng = random.Random(self.config.seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        # jak automatyczny prefix caching OpenAI: powtórzony prefiks (system) >= 1024 tokenów jest "cached"
+        self.seen_prefixes = set()
+
+    def handle_chat(self, body: dict):
+        with self.lock:
+            self.requests += 1
+            request_no = self.requests
+            latency_ms = sample_latency_ms(self.config.latency, self.rng)
+            roll = self.rng.random()
+        time.sleep(latency_ms / 1000)
+
+        if roll < self.config.rate_limit_rate:
+            return 429, {"error": {"message": "mock rate limit", "type": "rate_limit_error", "code": "rate_limit_exceeded"}}, \
+                {"Retry-After": str(self.config.retry_after_s)}
+        if roll < self.config.rate_limit_rate + self.config.error_rate:
+            return 503, {"error": {"message": "mock upstream error", "type": "server_error"}}, {}
+
+        messages = body.get("messages") or []
+        json_mode = (body.get("response_format") or {}).get("type") == "json_object"
+        text = mock_translate(messages, json_mode=json_mode)
+        prompt_tokens = sum(_estimate_tokens(m.get("content") or "") for m in messages)
+        completion_tokens = _estimate_tokens(text)
+        finish_reason = "stop"
+        limit = body.get("max_completion_tokens") or body.get("max_tokens")
+        if limit and completion_tokens > limit:
+            # jak prawdziwe API: odpowiedź ucięta na limicie, finish_reason=length
+            text, completion_tokens, finish_reason = text[: limit * 4], limit, "length"
+        cached_tokens = 0
+        if messages and messages[0].get("role") == "system":
+            prefix = messages[0].get("content") or ""
+            prefix_tokens = _estimate_tokens(prefix)
+            if prefix_tokens >= MOCK_PREFIX_CACHE_MIN_TOKENS:
+                digest = hashlib.sha1(prefix.encode("utf-8")).hexdigest()
+                with self.lock:
+                    if digest in self.seen_prefixes:
+                        cached_tokens = prefix_tokens // 128 * 128
+                    self.seen_prefixes.add(digest)
+        return 200, {
+            "id": f"mock-{request_no}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model") or "mock",
+            "choices": [{"index": 0, "finish_reason": finish_reason, "message": {"role": "assistant", "content": text}}],
+            "usage": {
+                "prompt_tokens": prompt_tokens,
+                "completion_tokens": completion_tokens,
+                "total_tokens": prompt_tokens + completion_tokens,
+                "prompt_tokens_details": {"cached_tokens": cached_tokens},
+            },
+        }, {}
+
+    def complete(self, body: dict) -> dict:
+        """Wersja w procesie: zwraca payload odpowiedzi albo rzuca MockHTTPError."""
+        status, payload, headers = self.handle_chat(body)
+        if status != 200:
+            raise MockHTTPError(status, payload["error"]["message"], headers)
+        return payload
+
+
+def config_from_env() -> MockConfig:
+    seed = os.environ.get("MOCK_SEED")
+    return MockConfig(
+        latency=os.environ.get("MOCK_LATENCY") or "fixed:0",
+        error_rate=float(os.environ.get("MOCK_ERROR_RATE") or 0),
+        rate_limit_rate=float(os.environ.get("MOCK_RATE_LIMIT_RATE") or 0),
+        retry_after_s=float(os.environ.get("MOCK_RETRY_AFTER_S") or 1.0),
+        seed=int(seed) if seed else None,
+    )
+
+
+_default_backend: Optional[MockBackend] = None
+_default_backend_lock = threading.Lock()
+
+
+def default_backend() -> MockBackend:
+    """Backend providera "mock" w procesie (konfiguracja z MOCK_* ENV przy pierwszym użyciu)."""
+    global _default_backend
+    with _default_backend_lock:
+        if _default_backend is None:
+            _default_backend = MockBackend(config_from_env())
+        return _default_backend
+
+
+class MockLLMServer:
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, config: Optional[MockConfig] = None):
+        self.backend = MockBackend(config)
+        backend = self.backend
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError:
+                    return self._send(400, {"error": {"message": "invalid json", "type": "invalid_request_error"}})
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    return self._send(404, {"error": {"message": f"unknown path {self.path}", "type": "not_found"}})
+                status, payload, headers = backend.handle_chat(body)
+                self._send(status, payload, headers)
+
+            def _send(self, status: int, payload: dict, headers: Optional[dict] = None):
+                out = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(out)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(out)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "MockLLMServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True, name="mock-llm")
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Lokalny stub OpenAI-compatible do testów i benchmarków.")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8100)
+    ap.add_argument("--latency", default="lognormal:400:0.5",
+                    help="fixed:MS | uniform:MIN:MAX | normal:MEAN:SD | lognormal:MEDIAN:SIGMA")
+    ap.add_argument("--error-rate", type=float, default=0.0, help="udział odpowiedzi 503")
+    ap.add_argument("--rate-limit-rate", type=float, default=0.0, help="udział odpowiedzi 429 (z Retry-After)")
+    ap.add_argument("--retry-after", type=float, default=1.0)
+    ap.add_argument("--seed", type=int, default=None)
+    args = ap.parse_args()
+
+    config = MockConfig(
+        latency=args.latency,
+        error_rate=args.error_rate,
+        rate_limit_rate=args.rate_limit_rate,
+        retry_after_s=args.retry_after,
+        seed=args.seed,
+    )
+    server = MockLLMServer(args.host, args.port, config)
+    print(f"Mock LLM server: {server.base_url}  (latency={config.latency}, 503={config.error_rate}, 429={config.rate_limit_rate})")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import streamlit as st
 import pandas as pd
-import os
 import re
 
+from common import LANGS, load_glossary, save_glossary
+
 st.set_page_config(page_title="Seed Glossaries", layout="wide")
 st.header("0) Seed glossaries — baza PL terminów dla wszystkich języków")
 
@@ -20,69 +21,6 @@ Ta strona służy do jednorazowego (lub okresowego) **uzupełniania wszystkich g
 """
 )
 
-DATA_DIR = "data"
-os.makedirs(DATA_DIR, exist_ok=True)
-
-LANGS = [
-    ("ro", "Rumuński (RO)"),
-    ("hu", "Węgierski (HU)"),
-    ("el", "Grecki (GR)"),
-    ("de", "Niemiecki (DE)"),
-    ("cs", "Czeski (CZ)"),
-    ("sk", "Słowacki (SK)"),
-    ("nl", "Niderlandzki (NL)"),
-    ("it", "Włoski (IT)"),
-    ("fr", "Francuski (FR)"),
-    ("hr", "Chorwacki (HR)"),
-    ("lt", "Litewski (LT)"),
-    ("fi", "Fiński (FI)"),
-    ("sv", "Szwedzki (SE)"),
-]
-
-REQUIRED_COLS = ["term_pl", "term_target", "locked", "notes"]
-
-def normalize_df(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
-    df.columns = [str(c).strip().lower() for c in df.columns]
-
-    # mapowanie nazw (gdyby plik był w innym formacie)
-    rename_map = {
-        "pl": "term_pl",
-        "source": "term_pl",
-        "term": "term_pl",
-        "target": "term_target",
-        "translation": "term_target",
-        "is_locked": "locked",
-    }
-    for k, v in rename_map.items():
-        if k in df.columns and v not in df.columns:
-            df = df.rename(columns={k: v})
-
-    for col in REQUIRED_COLS:
-        if col not in df.columns:
-            df[col] = "" if col != "locked" else False
-
-    df = df[REQUIRED_COLS]
-    df["term_pl"] = df["term_pl"].astype(str).str.strip()
-    df["term_target"] = df["term_target"].astype(str).str.strip()
-    df["notes"] = df["notes"].astype(str)
-    df["locked"] = df["locked"].apply(lambda x: str(x).strip().lower() in ["true", "1", "yes", "y", "t"])
-
-    df = df[df["term_pl"].str.len() > 0].copy()
-    df = df.drop_duplicates(subset=["term_pl"], keep="last").reset_index(drop=True)
-    return df
-
-def load_glossary(lang_code: str) -> pd.DataFrame:
-    path = os.path.join(DATA_DIR, f"glossary_{lang_code}.csv")
-    if os.path.exists(path):
-        return normalize_df(pd.read_csv(path))
-    return pd.DataFrame(columns=REQUIRED_COLS)
-
-def save_glossary(lang_code: str, df: pd.DataFrame):
-    path = os.path.join(DATA_DIR, f"glossary_{lang_code}.csv")
-    df = normalize_df(df)
-    df.to_csv(path, index=False)
-
 def parse_terms_csv(uploaded_file) -> list[str]:
     # Wspieramy najprostszy format: 1 kolumna, z nagłówkiem lub bez
     df = pd.read_csv(uploaded_file, header=None)
@@ -0,0 +1,124 @@
+import streamlit as st
+import pandas as pd
+import json
+import os
+
+from common import LANGS
+from llm_batch import BACKENDS, create_translate_job, list_jobs, poll_active_jobs
+from worker_pool import enqueue, launch, provider_rpm, queue_stats
+
+st.set_page_config(page_title="Batch Jobs", layout="wide")
+st.header("🌙 10) Batch — duże katalogi (OpenAI Batch / Gemini batch)")
+
+st.markdown(
+    """
+Dla dużych, niepilnych zleceń: tłumaczenia są wysyłane jako **jedno zadanie batch** u providera
+(realizacja do 24h, niższy koszt). Status zadań jest zapisywany w `data/batch/batch_jobs.db`
+— można zamknąć aplikację i wrócić później.
+
+Po zakończeniu: (opcjonalnie) automatyczne review batch przez Gemini → zapis do **archiwum** + **cache tłumaczeń**.
+Backend **local** wykonuje to samo lokalnie przez `chat_llm` (np. provider `mock`) — do testów offline.
+"""
+)
+
+
+def parse_samples(uploaded) -> list:
+    """JSONL (name/title + body) albo CSV z kolumnami name/title i body."""
+    if uploaded.name.lower().endswith(".jsonl"):
+        rows = [json.loads(line) for line in uploaded.getvalue().decode("utf-8").splitlines() if line.strip()]
+    else:
+        df = pd.read_csv(uploaded).fillna("")
+        df.columns = [str(c).strip().lower() for c in df.columns]
+        rows = df.to_dict(orient="records")
+    samples = []
+    for r in rows:
+        name = str(r.get("name") or r.get("title") or "").strip()
+        body = str(r.get("body") or "").strip()
+        if name or body:
+            samples.append({"name": name, "body": body})
+    return samples
+
+
+st.subheader("Nowe zadanie")
+
+uploaded = st.file_uploader("Teksty źródłowe (JSONL lub CSV: name/title, body)", type=["jsonl", "csv"])
+
+c1, c2, c3 = st.columns([2, 1, 1])
+with c1:
+    labels = [lbl for _, lbl in LANGS]
+    chosen_labels = st.multiselect("Rynki", labels, default=labels)
+with c2:
+    backend = st.selectbox("Backend", BACKENDS, index=0)
+    local_provider = st.selectbox("Provider (tylko local)", ["mock", "openai", "gemini", "qwen"], disabled=backend != "local")
+with c3:
+    with_review = st.checkbox("Review batch (Gemini)", value=True)
+    temperature = st.slider("Temperature", 0.0, 0.8, 0.2, 0.05)
+
+context = st.text_area("Kontekst / styl", value=st.session_state.get("style_hint", ""), height=80)
+
+if uploaded is not None:
+    try:
+        samples = parse_samples(uploaded)
+    except Exception as e:
+        st.error(f"Błąd parsowania pliku: {e}")
+        st.stop()
+
+    langs = [(code, lbl) for code, lbl in LANGS if lbl in chosen_labels]
+    st.write(f"Tekstów: **{len(samples)}** × rynków: **{len(langs)}** = **{len(samples) * len(langs)}** zapytań tłumaczenia.")
+
+    if st.button("Wyślij batch", type="primary", disabled=not samples or not langs):
+        job_id = create_translate_job(
+            samples,
+            langs,
+            backend=backend,
+            provider=local_provider if backend == "local" else None,
+            context=context,
+            temperature=temperature,
+            with_review=with_review,
+        )
+        st.success(f"Utworzono zadanie: {job_id}")
+
+    st.markdown("**albo** od razu, lokalnie — kolejka + procesy robocze (`worker_pool.py`):")
+    w1, w2, w3 = st.columns([1, 1, 2])
+    with w1:
+        pool_provider = st.selectbox("Provider (worker pool)", ["openai", "gemini", "qwen", "mock", "auto"])
+    with w2:
+        n_workers = st.number_input("Procesy", min_value=1, max_value=32, value=os.cpu_count() or 2)
+    with w3:
+        rpm = provider_rpm(pool_provider)
+        st.caption(
+            f"Wspólny limit dla wszystkich procesów: **{int(rpm)} zapytań/min** (WORKER_RPM_{pool_provider.upper()})"
+            if rpm > 0 else "Bez limitu zapytań dla tego providera."
+        )
+    if st.button("Kolejka + start workerów", disabled=not samples or not langs):
+        batch_id = enqueue(samples, langs, pool_provider, context=context, temperature=temperature)
+        # osobne procesy poza Streamlit — działają dalej po zamknięciu przeglądarki
+        started = launch(int(n_workers))
+        # już działające workery (np. z poprzedniego kliknięcia) się liczą — startuje tylko brakująca część puli
+        st.success(f"Dodano do kolejki: {batch_id} ({len(samples) * len(langs)} zadań), nowych procesów: {started}"
+                   f" (pula: {int(n_workers)}).")
+
+st.divider()
+st.subheader("Zadania")
+
+if st.button("🔄 Sprawdź statusy (poll)"):
+    with st.spinner("Sprawdzanie statusów u providerów…"):
+        polled = poll_active_jobs()
+    st.info(f"Sprawdzono zadań: {len(polled)}")
+
+jobs = list_jobs()
+if not jobs:
+    st.info("Brak zadań batch.")
+else:
+    cols = ["id", "kind", "backend", "provider", "status", "n_items", "n_done", "n_errors", "parent_job_id", "created", "updated", "error"]
+    st.dataframe(pd.DataFrame(jobs)[cols], use_container_width=True)
+
+st.subheader("Worker pool (kolejka lokalna)")
+pool = queue_stats()
+if not pool:
+    st.info("Kolejka jest pusta.")
+else:
+    pool_df = pd.DataFrame(pool)
+    for col in ["created", "finished"]:
+        pool_df[col] = pd.to_datetime(pool_df[col], unit="s").dt.strftime("%Y-%m-%d %H:%M:%S")
+    st.dataframe(pool_df, use_container_width=True)
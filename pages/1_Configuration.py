@@ -1,24 +1,15 @@
 import streamlit as st
+import os
+
+import pandas as pd
+
+from common import LANGS
+from llm_router import current_router_policy, router_table
+from review_policy import current_review_policy
 
 st.set_page_config(page_title="Configuration", layout="wide")
 st.header("1) Configuration")
 
-LANGS = [
-    ("ro", "Rumuński (RO)"),
-    ("hu", "Węgierski (HU)"),
-    ("el", "Grecki (GR)"),
-    ("de", "Niemiecki (DE)"),
-    ("cs", "Czeski (CZ)"),
-    ("sk", "Słowacki (SK)"),
-    ("nl", "Niderlandzki (NL)"),
-    ("it", "Włoski (IT)"),
-    ("fr", "Francuski (FR)"),
-    ("hr", "Chorwacki (HR)"),
-    ("lt", "Litewski (LT)"),
-    ("fi", "Fiński (FI)"),
-    ("sv", "Szwedzki (SE)"),
-]
-
 lang_labels = [label for _, label in LANGS]
 lang_codes = {label: code for code, label in LANGS}
 
@@ -28,16 +19,40 @@ st.session_state.target_market_label = chosen_lang
 
 st.subheader("Model językowy")
 
+translate_options = ["OpenAI", "Gemini", "Qwen", "Auto"]
+if os.environ.get("LLM_MOCK_ENABLED", "").lower() in ["1", "true", "yes"]:
+    # lokalny mock (mock_llm_server.py) — testy i benchmarki bez kosztów API
+    translate_options.append("Mock")
+
 llm_translate = st.selectbox(
     "Model do tłumaczenia (Translate)",
-    ["OpenAI", "Gemini", "Qwen"],
+    translate_options,
     index=0,
 )
 
 st.session_state.translate_provider = llm_translate.lower()
 
+if llm_translate == "Auto":
+    # llm_router: provider wybierany per zapytanie ze statystyk (metryki + review), failover przy błędach
+    policy = current_router_policy()
+    st.caption(
+        f"Auto: cel **{policy.objective}** spośród {', '.join(policy.providers)}, "
+        f"confidence ≥ {policy.min_confidence:.0f}, błędy ≤ {policy.max_error_rate:.0%} "
+        "(LLM_ROUTER_* w ENV). Przy błędzie wywołania — kolejny provider z rankingu."
+    )
+    st.dataframe(pd.DataFrame(router_table(st.session_state.target_language)), use_container_width=True)
+
 st.caption("Review językowe jest zawsze wykonywane przez **Gemini** (stały benchmark jakości).")
 
+review_policy = current_review_policy()
+if review_policy.mode == "adaptive":
+    st.caption(
+        f"Review adaptacyjne: pełne review dla tłumaczeń z uwagami pre-checku + próbka "
+        f"{review_policy.sample_rate:.0%} czystych; reszta: "
+        + ("pominięta" if review_policy.pass_tier == "skip" else f"**{review_policy.light_model}**")
+        + "."
+    )
+
 style_hint = st.text_area(
     "Kontekst / styl (opcjonalnie)",
     placeholder="np. sprzęt fryzjerski, ton profesjonalny, bez marketingowego lania wody",
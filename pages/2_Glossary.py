@@ -1,10 +1,15 @@
 import streamlit as st
 import pandas as pd
 import os
-from datetime import datetime
-import shutil
+
+import common
+import glossary_import
+import profiling
+import retranslation
+from backup_store import create_snapshot, prune
 
 st.set_page_config(page_title="Glossary", layout="wide")
+prof = profiling.page("2_Glossary")
 st.header("2) Glossary (PL → język docelowy)")
 
 # -------------------------
@@ -22,99 +27,32 @@ st.subheader(f"Edytujesz glossary dla: {target_label} (lang={target_lang})")
 # -------------------------
 # Ścieżki plików
 # -------------------------
-DATA_DIR = "data"
-os.makedirs(DATA_DIR, exist_ok=True)
-
-BACKUP_DIR = os.path.join(DATA_DIR, "backup")
-os.makedirs(BACKUP_DIR, exist_ok=True)
-
-glossary_path = os.path.join(DATA_DIR, f"glossary_{target_lang}.csv")
+glossary_path = common.glossary_path(target_lang)
 
 DEFAULT_ROWS = [
     {"term_pl": "fotel fryzjerski", "term_target": "", "locked": True, "notes": ""},
     {"term_pl": "myjnia fryzjerska", "term_target": "", "locked": True, "notes": ""},
 ]
 
-REQUIRED_COLS = ["term_pl", "term_target", "locked", "notes"]
-
 # -------------------------
 # Helpers
 # -------------------------
-def normalize_df(df: pd.DataFrame) -> pd.DataFrame:
-    """Ujednolica kolumny, typy, trim, usuwa puste i deduplikuje po term_pl."""
-    df = df.copy()
-
-    # ujednolicenie nazw kolumn
-    df.columns = [str(c).strip().lower() for c in df.columns]
-
-    # mapowanie alternatywnych nazw (importy z różnych źródeł)
-    rename_map = {
-        "pl": "term_pl",
-        "source": "term_pl",
-        "term_source": "term_pl",
-        "term": "term_pl",
-        "target": "term_target",
-        "translation": "term_target",
-        "is_locked": "locked",
-    }
-    for k, v in rename_map.items():
-        if k in df.columns and v not in df.columns:
-            df = df.rename(columns={k: v})
-
-    # uzupełnij brakujące kolumny
-    for col in REQUIRED_COLS:
-        if col not in df.columns:
-            df[col] = "" if col != "locked" else False
-
-    df = df[REQUIRED_COLS]
-
-    # typy i czyszczenie
-    df["term_pl"] = df["term_pl"].astype(str).str.strip()
-    df["term_target"] = df["term_target"].astype(str).str.strip()
-    df["notes"] = df["notes"].astype(str)
-    # locked bywa "TRUE"/"FALSE" albo 1/0; bool() na stringu nie zadziała jak chcesz,
-    # więc robimy mapowanie bezpieczne:
-    df["locked"] = df["locked"].apply(lambda x: str(x).strip().lower() in ["true", "1", "yes", "y", "t"])
-
-    # usuń puste term_pl
-    df = df[df["term_pl"].str.len() > 0].copy()
-
-    # deduplikacja po term_pl: zostaw ostatni (import ma priorytet)
-    df = df.drop_duplicates(subset=["term_pl"], keep="last").reset_index(drop=True)
-
-    return df
-
-
-def load_glossary(path: str) -> pd.DataFrame:
-    if os.path.exists(path):
-        df = pd.read_csv(path)
-        return normalize_df(df)
-    return pd.DataFrame(DEFAULT_ROWS)
-
+normalize_df = common.normalize_glossary_df
 
-def save_glossary(df: pd.DataFrame, path: str) -> None:
-    df = normalize_df(df)
-    df.to_csv(path, index=False)
 
-
-def merge_glossaries(existing: pd.DataFrame, imported: pd.DataFrame) -> pd.DataFrame:
-    """MERGE: łączy po term_pl, import ma priorytet (nadpisuje duplikaty)."""
-    ex = normalize_df(existing)
-    im = normalize_df(imported)
-    merged = pd.concat([ex, im], ignore_index=True)
-    merged = merged.drop_duplicates(subset=["term_pl"], keep="last").reset_index(drop=True)
-    return merged
+def load_glossary() -> pd.DataFrame:
+    if os.path.exists(glossary_path):
+        return common.load_glossary(target_lang)
+    return pd.DataFrame(DEFAULT_ROWS)
 
 
 def backup_glossary(path: str, lang: str):
-    """Backup obecnego glossary przed overwrite."""
+    """Snapshot obecnego glossary przed overwrite (backup_store — zapisywane są tylko zmienione kawałki)."""
     if not os.path.exists(path):
         return None
-    ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    backup_name = f"glossary_{lang}_{ts}.csv"
-    backup_path = os.path.join(BACKUP_DIR, backup_name)
-    shutil.copy2(path, backup_path)
-    return backup_path
+    manifest = create_snapshot(paths=[path], label=f"przed overwrite {lang}", scope=f"glossary_{lang}")
+    prune()
+    return manifest["id"]
 
 
 # -------------------------
@@ -122,7 +60,7 @@ def backup_glossary(path: str, lang: str):
 # -------------------------
 state_key = f"glossary_df_{target_lang}"
 if state_key not in st.session_state:
-    st.session_state[state_key] = load_glossary(glossary_path)
+    st.session_state[state_key] = load_glossary()
 
 # -------------------------
 # Instrukcja dla użytkowników (UI)
@@ -135,12 +73,13 @@ st.info(
 - dodajesz nowe frazy
 - poprawiasz istniejące tłumaczenia
 - chcesz zachować wcześniejszą pracę  
-➡️ nic nie ginie; jeśli `term_pl` się powtarza, import **nadpisze** jego tłumaczenie
+➡️ nic nie ginie; jeśli `term_pl` się powtarza, import **nadpisze** jego tłumaczenie (a także locked i notes) —
+  chyba że w pliku `term_target` jest pusty: wtedy istniejące tłumaczenie zostaje
 
 **Nadpisz (overwrite) — OSTROŻNIE**
 - zastępuje CAŁE glossary dla tego języka
 - używaj tylko przy pełnym resecie lub gdy CSV ma kompletną, finalną wersję  
-➡️ aplikacja automatycznie robi **backup** poprzedniej wersji do `/data/backup`
+➡️ aplikacja automatycznie robi **snapshot** poprzedniej wersji (`data/backup/store`, przywracanie: `python backup_store.py restore <id>`)
 """
 )
 
@@ -161,47 +100,86 @@ with c1:
 
 with c2:
     uploaded = st.file_uploader(
-        "⬆️ Import CSV (dla tego języka)",
-        type=["csv"],
-        help="CSV powinien mieć kolumny: term_pl, term_target, locked, notes (locked: True/False lub 1/0)."
+        "⬆️ Import CSV / TBX (dla tego języka)",
+        type=["csv", "tbx", "xml"],
+        help="CSV: kolumny term_pl, term_target, locked, notes (locked: True/False lub 1/0). "
+             "TBX: termin pl → term_pl, termin w języku docelowym → term_target, preferred → locked. "
+             "Bardzo duże pliki: python glossary_import.py PLIK --lang KOD.",
     )
 
 with c3:
     import_mode = st.radio(
         "Tryb importu",
         options=[
-            "Scal (merge) — nadpisuj te same term_pl",
+            "Scal (merge) — nadpisuj te same term_pl (pusty term_target nie kasuje)",
             "Nadpisz (overwrite) — zastąp cały glossary",
         ],
         index=0
     )
 
+
+def show_import_report(report: glossary_import.ImportReport) -> None:
+    m1, m2, m3, m4, m5 = st.columns(5)
+    m1.metric("Wiersze", report.rows)
+    m2.metric("Nowe", report.added)
+    m3.metric("Zmienione", report.updated)
+    m4.metric("Bez zmian", report.unchanged)
+    m5.metric("Błędy", report.error_count)
+    if report.removed:
+        st.warning(f"Overwrite usunie terminy, których nie ma w pliku: {report.removed}")
+    if report.duplicates:
+        st.caption(f"Powtórzone term_pl w pliku (ostatni wygrywa): {report.duplicates}")
+    if report.kept_target:
+        st.caption(f"Pusty term_target w pliku — zostawiono istniejące tłumaczenie: {report.kept_target}")
+    if report.errors:
+        st.write(f"Błędy wierszy (pierwsze {len(report.errors)}):")
+        st.dataframe(pd.DataFrame(report.errors), use_container_width=True)
+
+
 if uploaded is not None:
-    try:
-        imported_df = pd.read_csv(uploaded)
-        imported_df = normalize_df(imported_df)
+    fmt = glossary_import.detect_format(uploaded.name)
+    mode = "merge" if import_mode.startswith("Scal") else "overwrite"
+
+    def run_import(dry_run: bool) -> glossary_import.ImportReport:
+        bar = st.progress(0.0, text="Import...")
+
+        def progress(done: int, total: int, current: str) -> None:
+            bar.progress(min(done / max(total, 1), 1.0), text=f"Import: {current}")
 
-        st.write("Podgląd importu (pierwsze 20):")
-        st.dataframe(imported_df.head(20), use_container_width=True)
+        uploaded.seek(0)
+        report = glossary_import.import_glossary(uploaded, target_lang, fmt, mode, dry_run=dry_run, progress=progress)
+        bar.empty()
+        return report
 
-        if st.button("Zastosuj import", type="primary"):
-            if import_mode.startswith("Scal"):
-                new_df = merge_glossaries(st.session_state[state_key], imported_df)
+    try:
+        b1, b2 = st.columns([1, 1])
+        with b1:
+            check = st.button("🔍 Sprawdź plik (bez zapisu)")
+        with b2:
+            apply = st.button("Zastosuj import", type="primary")
+
+        if check:
+            report = run_import(dry_run=True)
+            st.write("Podgląd importu (pierwsze 20):")
+            st.dataframe(pd.DataFrame(report.preview), use_container_width=True)
+            show_import_report(report)
+
+        if apply:
+            snapshot_id = backup_glossary(glossary_path, target_lang) if mode == "overwrite" else None
+            report = run_import(dry_run=False)
+            st.session_state[state_key] = load_glossary()
+            if mode == "merge":
                 st.info("Zastosowano MERGE: zachowano istniejące terminy, a duplikaty zaktualizowano.")
+            elif snapshot_id:
+                st.warning(f"OVERWRITE: wykonano snapshot poprzedniego glossary → {snapshot_id} "
+                           f"(`python backup_store.py restore {snapshot_id} --to data`)")
             else:
-                backup_path = backup_glossary(glossary_path, target_lang)
-                new_df = imported_df
-                if backup_path:
-                    st.warning(f"OVERWRITE: wykonano backup poprzedniego glossary → {backup_path}")
-                else:
-                    st.warning("OVERWRITE: nie było wcześniejszego pliku do zbackupowania (to pierwszy zapis).")
-
-            st.session_state[state_key] = new_df
-            save_glossary(new_df, glossary_path)
+                st.warning("OVERWRITE: nie było wcześniejszego pliku do zbackupowania (to pierwszy zapis).")
+            show_import_report(report)
             st.success(f"Import zastosowany i zapisany na stałe do: {glossary_path}")
 
     except Exception as e:
-        st.error(f"Błąd importu CSV: {e}")
+        st.error(f"Błąd importu: {e}")
 
 st.divider()
 
@@ -210,18 +188,19 @@ st.divider()
 # -------------------------
 st.caption("Uzupełnij term_target. Zaznacz locked dla terminów, które muszą być konsekwentne.")
 
-edited = st.data_editor(
-    st.session_state[state_key],
-    use_container_width=True,
-    num_rows="dynamic",
-    column_config={"locked": st.column_config.CheckboxColumn("locked")}
-)
+with profiling.span("data_editor"):
+    edited = st.data_editor(
+        st.session_state[state_key],
+        use_container_width=True,
+        num_rows="dynamic",
+        column_config={"locked": st.column_config.CheckboxColumn("locked")}
+    )
 
 col_save, col_info = st.columns([1, 2])
 
 with col_save:
     if st.button("💾 Save glossary", type="primary"):
-        save_glossary(edited, glossary_path)
+        common.save_glossary(target_lang, edited)
         st.session_state[state_key] = edited
         st.success(f"Zapisano na stałe do: {glossary_path}")
 
@@ -230,3 +209,54 @@ with col_info:
 
 st.write("Podgląd (pierwsze 30):")
 st.dataframe(edited.head(30), use_container_width=True)
+
+# -------------------------
+# Ponowne tłumaczenie po zmianie glossary
+# -------------------------
+st.divider()
+st.markdown("### Do ponownego tłumaczenia")
+
+with profiling.span("retranslation_pending"):
+    pending = retranslation.pending(target_lang)
+if not pending:
+    st.caption("Brak tłumaczeń z archiwum, których dotyczą zmiany glossary.")
+else:
+    st.caption(
+        "Tłumaczenia z archiwum zawierające terminy, którym zmieniono term_target lub locked. "
+        "Ponownie tłumaczone są tylko one — w tle, przez worker_pool."
+    )
+    st.dataframe(pd.DataFrame(pending), use_container_width=True)
+
+    providers = ["(jak w oryginale)", "openai", "gemini", "qwen", "auto"]
+    if os.environ.get("LLM_MOCK_ENABLED", "").lower() in ["1", "true", "yes"]:
+        providers.append("mock")
+    r1, r2, r3 = st.columns([2, 2, 1])
+    with r1:
+        retranslate_provider = st.selectbox("Provider", providers)
+    with r2:
+        retranslate_workers = st.number_input("Procesy", min_value=1, max_value=32, value=2)
+    with r3:
+        if st.button("Wyczyść listę"):
+            retranslation.clear_pending(target_lang)
+            st.rerun()
+
+    # wpisy w kolejce / w toku nie idą drugi raz; z błędem — tak
+    to_send = [p for p in pending if p["queue"] not in ("w kolejce", "w toku")]
+    if st.button(f"🔁 Przetłumacz ponownie ({len(to_send)})", type="primary", disabled=not to_send):
+        from worker_pool import launch
+
+        result = retranslation.enqueue_pending(
+            target_lang,
+            provider=None if retranslate_provider.startswith("(") else retranslate_provider,
+            context=st.session_state.get("style_hint", ""),
+        )
+        if result["queued"]:
+            launch(int(retranslate_workers))
+            st.success(f"Dodano do kolejki: {result['queued']} ({', '.join(result['batch_ids'])}) — "
+                       f"postęp w zakładce Batch Jobs. Wpis znika z listy po zapisaniu nowego tłumaczenia.")
+        if result["in_queue"]:
+            st.info(f"Już w kolejce / w toku (pominięte): {result['in_queue']}")
+        if result["missing"]:
+            st.warning(f"Brak tekstu w archiwum — usunięte z listy bez tłumaczenia: {', '.join(result['missing'])}")
+
+prof.finish()
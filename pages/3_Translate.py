@@ -1,32 +1,110 @@
 import streamlit as st
 import pandas as pd
-import os
-from datetime import datetime
 
-from llm_providers import chat_llm, review_llm
+import jobs
+import profiling
+from common import LANGS, build_source
 
 st.set_page_config(page_title="Translate", layout="wide")
+prof = profiling.page("3_Translate")
 st.header("3) Translate — OpenAI / Gemini / Qwen + Review Gemini")
 
-def load_glossary(lang):
-    path = f"data/glossary_{lang}.csv"
-    if not os.path.exists(path):
-        return pd.DataFrame(columns=["term_pl", "term_target", "locked"])
-    df = pd.read_csv(path)
-    if "locked" in df.columns:
-        df["locked"] = df["locked"].astype(str).str.lower().isin(["true", "1", "yes", "y", "t"])
+# tłumaczenie idzie jako zadanie w tle (jobs.py) — rerun / zmiana zakładki / odświeżenie nie przerywa pracy;
+# id zadania jest w URL (?job=...), więc wynik wraca także po odświeżeniu przeglądarki
+jobs.ensure_started()
+
+
+def show_qa(qa):
+    # terminy locked + liczby/jednostki (qa_checks, bez LLM)
+    if not qa:
+        return
+    if qa["passed"]:
+        st.success("Terminy locked, liczby i jednostki zgodne.")
     else:
-        df["locked"] = False
-    return df
-
-def glossary_text(df):
-    rows = []
-    for _, r in df.iterrows():
-        term_pl = str(r.get("term_pl","")).strip()
-        term_target = str(r.get("term_target","")).strip()
-        if term_pl and term_target:
-            rows.append(f"- {term_pl} => {term_target}")
-    return "\n".join(rows)
+        st.error("\n".join(f"- {i}" for i in qa["issues"]))
+
+
+def show_result(res: dict, heading) -> None:
+    heading("Tłumaczenie" + (f" ({res['provider'].upper()})" if res.get("provider") else ""))
+    st.code(res["translation"], language="text")
+    col_review, col_qa = st.columns([2, 1])
+    with col_review:
+        heading(f"Review ({res.get('review_model', 'gemini')})")
+        st.code(res["review"] or "Review pominięte — lokalny QA bez uwag (REVIEW_POLICY=adaptive).", language="text")
+    with col_qa:
+        heading("QA lokalne")
+        show_qa(res.get("qa"))
+
+
+STATUS_ICONS = {"queued": "⏳ w kolejce", "running": "🔄 tłumaczenie", "done": "✅ gotowe", "error": "❌ błąd"}
+
+
+def job_view(job_id: str) -> None:
+    job = jobs.get_job(job_id)
+    if job is None or job["kind"] != "translate":
+        return
+    if job["status"] in jobs.ACTIVE_STATUSES:
+        job_poll(job_id)
+    else:
+        render_job(job)
+
+
+@st.fragment(run_every=2)
+def job_poll(job_id: str) -> None:
+    # odświeżany co 2 s tylko ten fragment; po zakończeniu zadania — pełny rerun (widok bez odpytywania)
+    job = jobs.get_job(job_id)
+    if job is None:
+        return
+    if job["status"] not in jobs.ACTIVE_STATUSES:
+        st.rerun()
+    render_job(job)
+
+
+def render_job(job: dict) -> None:
+    job_id = job["id"]
+    langs = (job["result"] or {}).get("langs", {})
+    active = job["status"] in jobs.ACTIVE_STATUSES
+
+    if active:
+        st.info(f"Zadanie {job_id}: {job['status']} — {job['done']}/{job['total'] or len(job['params']['langs'])} "
+                "języków. Możesz zmieniać zakładki; wynik zostanie zapisany w archiwum.")
+    elif job["status"] == "failed":
+        st.error(f"Zadanie nie powiodło się: {job['error']}")
+    else:
+        ok_count = sum(1 for r in langs.values() if r["status"] == "done")
+        st.success(f"Gotowe: {ok_count}/{len(langs)} w {job['elapsed_s']} s. Wyniki zapisano w archiwum.")
+
+    if len(langs) > 1 or active:
+        st.dataframe(pd.DataFrame([
+            {
+                "Język": r["label"], "Kod": code, "Status": STATUS_ICONS.get(r["status"], r["status"]),
+                "Czas [s]": r.get("elapsed_s"), "Review": r.get("review_model", ""),
+                "QA": "" if not r.get("qa") else ("OK" if r["qa"]["passed"] else f"{len(r['qa']['issues'])} uwag"),
+                "Plik": r.get("filename", ""),
+            }
+            for code, r in langs.items()
+        ]), use_container_width=True)
+
+    if active:
+        return
+    if len(langs) == 1:
+        (res,) = langs.values()
+        if res["status"] == "error":
+            # po wyczerpaniu retry (429/5xx) albo przy otwartym circuit breakerze
+            st.error(f"Błąd wywołania modelu: {res['error']}")
+        else:
+            show_result(res, st.subheader)
+        return
+    tabs = st.tabs([r["label"] for r in langs.values()])
+    for tab, res in zip(tabs, langs.values()):
+        with tab:
+            if res["status"] == "error":
+                st.error(f"Błąd: {res['error']}")
+                continue
+            show_result(res, lambda text: st.markdown(f"**{text}**"))
+
+
+job_id = st.query_params.get("job") or st.session_state.get("translate_job_id")
 
 lang = st.session_state.get("target_language")
 label = st.session_state.get("target_market_label")
@@ -35,82 +113,64 @@ style_hint = st.session_state.get("style_hint", "")
 
 if not lang:
     st.warning("Najpierw wybierz język w Configuration.")
+    if job_id:
+        job_view(job_id)
     st.stop()
 
-st.subheader(f"Rynek: {label}")
+mode = st.radio(
+    "Zakres",
+    [f"Tylko wybrany rynek ({label})", "Wszystkie rynki (13 języków równolegle)"],
+    index=0,
+    horizontal=True,
+)
+fanout = mode.startswith("Wszystkie")
+
+if not fanout:
+    st.subheader(f"Rynek: {label}")
 st.caption(f"Model do tłumaczenia: **{provider.upper()}** | Review: **GEMINI**")
 
 title_pl = st.text_input("Nazwa (PL)")
 body_pl = st.text_area("Dalsza treść (PL)", height=220)
 
-glossary_df = load_glossary(lang)
-glossary = glossary_text(glossary_df)
-
 temperature = st.slider("Temperature (Translate)", 0.0, 0.8, 0.2, 0.05)
 
-if st.button("Translate (auto-review)", type="primary"):
-    source = f"NAME:\n{title_pl}\n\nBODY:\n{body_pl}"
-
-    translated = chat_llm(
-        provider=provider,
-        temperature=temperature,
-        messages=[
-            {"role": "system", "content": "You are a professional translator. Translate precisely. Output plain text only."},
-            {"role": "user", "content": f"""
-Target language: {label}
-
-Context:
-{style_hint}
-
-Mandatory terminology:
-{glossary if glossary else "None"}
-
-Translate and keep structure:
-
-{source}
-"""},
-        ],
-    )
-
-    review = review_llm(
-        temperature=0.1,
-        messages=[
-            {"role": "system", "content": "You are a senior linguistic reviewer."},
-            {"role": "user", "content": f"""
-Check translation quality and terminology.
-
-Return format:
-VERDICT: OK / FIX
-ISSUES:
-- ...
-SUGGESTED FIXES:
-- ...
-CONFIDENCE: 0-100
-
-SOURCE:
-{source}
-
-TRANSLATION:
-{translated}
-"""},
-        ],
-    )
-
-    st.session_state.translated = translated
-    st.session_state.review = review
-
-    ts = datetime.now().strftime("%Y%m%d_%H%M%S")
-    os.makedirs(f"data/translations/{lang}", exist_ok=True)
-
-    with open(f"data/translations/{lang}/{ts}.txt", "w", encoding="utf-8") as f:
-        f.write(
-            f"DATE: {datetime.now()}\nLANGUAGE: {label}\nTRANSLATE_MODEL: {provider}\nREVIEW_MODEL: gemini\n\n"
-            f"SOURCE:\n{source}\n\nTRANSLATION:\n{translated}\n\nREVIEW:\n{review}"
-        )
-
-if "translated" in st.session_state:
-    st.subheader("Tłumaczenie")
-    st.code(st.session_state.translated, language="text")
-
-    st.subheader("Review (Gemini)")
-    st.code(st.session_state.review, language="text")
+button = "Translate → wszystkie rynki (auto-review)" if fanout else "Translate (auto-review)"
+if st.button(button, type="primary"):
+    if not ((title_pl or "").strip() or (body_pl or "").strip()):
+        st.warning("Uzupełnij nazwę lub treść.")
+        st.stop()
+
+    job_id = jobs.submit("translate", {
+        "source": build_source(title_pl, body_pl),
+        "title_pl": title_pl,
+        "langs": LANGS if fanout else [(lang, label)],
+        "provider": provider,
+        "context": style_hint,
+        "temperature": temperature,
+    })
+    st.session_state.translate_job_id = job_id
+    st.query_params["job"] = job_id
+
+if job_id:
+    job_view(job_id)
+
+with st.expander("Ostatnie zadania", expanded=False):
+    recent = jobs.list_jobs(limit=20, kind="translate")
+    if recent:
+        st.dataframe(pd.DataFrame([
+            {"id": j["id"], "status": j["status"], "języki": len(j["params"].get("langs", [])),
+             "postęp": f"{j['done']}/{j['total']}", "czas [s]": j["elapsed_s"], "błąd": j["error"]}
+            for j in recent
+        ]), use_container_width=True)
+    else:
+        st.caption("Brak zadań.")
+
+# etapy tłumaczenia liczą się w wątku zadania — do panelu czasów trafiają z wyniku
+job_timings = {}
+if profiling.panel_enabled() and job_id:
+    job = jobs.get_job(job_id) or {}
+    job_timings = {
+        f"{r['label']} (zadanie {job_id})": r.get("timings_ms")
+        for r in (job.get("result") or {}).get("langs", {}).values()
+    }
+prof.finish(extra=job_timings)
@@ -3,33 +3,46 @@ import pandas as pd
 import os
 from datetime import datetime
 
+import glossary_matrix
+import profiling
+from common import DATA_DIR, LANGS
+from translations_archive import quality_summary, reindex
+
 st.set_page_config(page_title="Glossary Monitoring", layout="wide")
+prof = profiling.page("4_Glossary_Monitoring")
 st.header("4) Glossary — Monitoring")
 
 st.caption("Podgląd stanu glossary per język: liczba fraz + data ostatniej aktualizacji pliku.")
 
-DATA_DIR = "data"
-
-LANGS = [
-    ("ro", "Rumuński (RO)"),
-    ("hu", "Węgierski (HU)"),
-    ("el", "Grecki (GR)"),
-    ("de", "Niemiecki (DE)"),
-    ("cs", "Czeski (CZ)"),
-    ("sk", "Słowacki (SK)"),
-    ("nl", "Niderlandzki (NL)"),
-    ("it", "Włoski (IT)"),
-    ("fr", "Francuski (FR)"),
-    ("hr", "Chorwacki (HR)"),
-    ("lt", "Litewski (LT)"),
-    ("fi", "Fiński (FI)"),
-    ("sv", "Szwedzki (SE)"),
-]
-
 def fmt_mtime(ts: float) -> str:
     # ładny format daty; jeśli nie istnieje plik — pusto
     return datetime.fromtimestamp(ts).strftime("%Y-%m-%d %H:%M:%S")
 
+@st.cache_data(show_spinner=False, max_entries=64)
+def glossary_file_stats(path: str, mtime_ns: int, size: int) -> dict:
+    """Statystyki pliku glossary; klucz z mtime/rozmiarem — rerun bez zmian nie czyta CSV ponownie."""
+    with profiling.span("glossary_csv_read"):
+        df = pd.read_csv(path)
+    # liczba fraz = liczba unikalnych term_pl (bez pustych)
+    if "term_pl" in df.columns:
+        term_pl = df["term_pl"].astype(str).str.strip()
+        count_phrases = int((term_pl.str.len() > 0).sum())
+    else:
+        count_phrases = 0
+
+    # bonus metryki (pomocne w kontroli)
+    filled = 0
+    if "term_target" in df.columns and "term_pl" in df.columns:
+        term_target = df["term_target"].astype(str).str.strip()
+        filled = int((term_target.str.len() > 0).sum())
+
+    locked = 0
+    if "locked" in df.columns:
+        # może być True/False albo 1/0
+        locked = int(pd.Series(df["locked"]).astype(str).str.lower().isin(["true", "1", "yes", "y", "t"]).sum())
+    return {"count_phrases": count_phrases, "filled": filled, "locked": locked}
+
+
 rows = []
 
 for code, label in LANGS:
@@ -37,27 +50,10 @@ for code, label in LANGS:
 
     if os.path.exists(path):
         try:
-            df = pd.read_csv(path)
-            # liczba fraz = liczba unikalnych term_pl (bez pustych)
-            if "term_pl" in df.columns:
-                term_pl = df["term_pl"].astype(str).str.strip()
-                count_phrases = int((term_pl.str.len() > 0).sum())
-            else:
-                count_phrases = 0
-
-            # bonus metryki (pomocne w kontroli)
-            filled = 0
-            if "term_target" in df.columns and "term_pl" in df.columns:
-                term_target = df["term_target"].astype(str).str.strip()
-                filled = int((term_target.str.len() > 0).sum())
-
-            locked = 0
-            if "locked" in df.columns:
-                # może być True/False albo 1/0
-                locked = int(pd.Series(df["locked"]).astype(str).str.lower().isin(["true", "1", "yes", "y", "t"]).sum())
-
-            mtime = os.path.getmtime(path)
-            last_update = fmt_mtime(mtime)
+            stat = os.stat(path)
+            stats = glossary_file_stats(path, stat.st_mtime_ns, stat.st_size)
+            count_phrases, filled, locked = stats["count_phrases"], stats["filled"], stats["locked"]
+            last_update = fmt_mtime(stat.st_mtime)
 
             status = "OK"
         except Exception as e:
@@ -100,3 +96,127 @@ st.download_button(
 )
 
 st.info("Tip: jeśli Status = 'Brak pliku', oznacza to, że glossary dla danego języka nie zostało jeszcze zapisane (Save glossary lub import).")
+
+st.divider()
+st.subheader("Pokrycie terminów (term × język)")
+st.caption(
+    "Macierz wszystkich term_pl ze wszystkich glossary (data/glossary_matrix.db), aktualizowana przy każdym zapisie, "
+    "seedzie i imporcie. Braki = brak wiersza albo pusty term_target; kolizja = ten sam term_target dla różnych "
+    "term_pl w jednym języku; niespójny locked = locked tylko w części języków."
+)
+
+with st.spinner("Synchronizacja macierzy z plikami glossary..."), profiling.span("matrix_sync"):
+    synced = glossary_matrix.ensure_synced()
+if synced:
+    st.caption(f"Dociągnięto zmiany z plików: {', '.join(synced)}")
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def cached_language_summary(version: str) -> list:
+    return glossary_matrix.language_summary()
+
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def cached_coverage(version: str, kind: str, search: str, missing_in, limit: int, offset: int) -> dict:
+    return glossary_matrix.coverage(kind, search=search, missing_in=missing_in, limit=limit, offset=offset)
+
+
+matrix_version = glossary_matrix.matrix_version()
+labels = dict(LANGS)
+summary = pd.DataFrame(cached_language_summary(matrix_version))
+if summary.empty:
+    st.info("Brak terminów w glossary.")
+else:
+    summary["lang"] = summary["lang"].map(lambda c: labels.get(c, c))
+    summary["coverage"] = (summary["coverage"] * 100).round(1)
+    st.dataframe(
+        summary.rename(columns={
+            "lang": "Język", "rows": "Wiersze", "filled": "Uzupełnione", "missing": "Braki",
+            "locked": "Locked", "conflicts": "Kolizje", "coverage": "Pokrycie %",
+        }),
+        use_container_width=True,
+    )
+
+    filter_labels = {
+        "Wszystkie": "all",
+        "Braki (w którymkolwiek języku)": "gaps",
+        "Kolizje tłumaczeń": "conflicts",
+        "Niespójny locked": "locked_mismatch",
+    }
+    f1, f2, f3, f4 = st.columns([2, 2, 2, 1])
+    with f1:
+        kind = filter_labels[st.selectbox("Filtr", list(filter_labels))]
+    with f2:
+        missing_label = st.selectbox("Brak tłumaczenia w języku", ["(dowolny)"] + [labels[c] for c, _ in LANGS])
+        missing_in = next((c for c, label in LANGS if label == missing_label), None)
+    with f3:
+        search = st.text_input("Szukaj term_pl", "")
+    with f4:
+        page_size = st.selectbox("Wierszy", [100, 500, 2000], index=1)
+
+    with profiling.span("coverage_query"):
+        first = cached_coverage(matrix_version, kind, search, missing_in, page_size, 0)
+    pages = max(1, -(-first["total"] // page_size))
+    page_no = st.number_input(f"Strona (z {pages})", min_value=1, max_value=pages, value=1) if pages > 1 else 1
+    result = first if page_no == 1 else cached_coverage(
+        matrix_version, kind, search, missing_in, page_size, (page_no - 1) * page_size
+    )
+    st.caption(f"Terminów spełniających filtr: **{result['total']}**")
+
+    matrix = pd.DataFrame(result["rows"])
+    if not matrix.empty:
+        # komórka: term_target, 🔒 gdy locked, ∅ gdy brak wiersza
+        for code in result["langs"]:
+            matrix[code] = [
+                "∅" if target is None else (f"🔒 {target}" if locked else target)
+                for target, locked in zip(matrix[code], matrix.pop(f"locked_{code}"))
+            ]
+        st.dataframe(
+            matrix.rename(columns={"filled": "Uzupełnione", "locked": "Locked", "conflicts": "Kolizje"}),
+            use_container_width=True,
+        )
+        st.download_button(
+            "⬇️ Pobierz widoczne wiersze (CSV)",
+            data=matrix.to_csv(index=False).encode("utf-8"),
+            file_name=f"glossary_coverage_{kind}.csv",
+            mime="text/csv",
+        )
+
+        if kind == "conflicts":
+            conflict_term = st.selectbox("Szczegóły kolizji dla terminu", matrix["term_pl"].tolist())
+            details = pd.DataFrame(glossary_matrix.conflicts_for(conflict_term))
+            if not details.empty:
+                details["lang"] = details["lang"].map(lambda c: labels.get(c, c))
+                st.dataframe(
+                    details.rename(columns={
+                        "lang": "Język", "term_target": "term_target", "count": "Innych terminów",
+                        "shared_with": "Ten sam term_target mają",
+                    }),
+                    use_container_width=True,
+                )
+
+st.divider()
+st.subheader("Jakość tłumaczeń (review)")
+st.caption("Verdict / confidence z indeksu archiwum (data/translations/archive.db). Stare pliki TXT: przebuduj indeks.")
+
+if st.button("🔄 Przebuduj indeks z plików TXT"):
+    with st.spinner("Indeksowanie archiwum..."):
+        n = reindex()
+    st.success(f"Zaindeksowano plików: {n}")
+
+with profiling.span("quality_summary"):
+    quality = pd.DataFrame(quality_summary())
+if quality.empty:
+    st.info("Brak zaindeksowanych tłumaczeń.")
+else:
+    labels = dict(LANGS)
+    quality["lang"] = quality["lang"].map(lambda c: labels.get(c, c))
+    st.dataframe(
+        quality.rename(columns={
+            "lang": "Język", "verdict": "Verdict", "translations": "Tłumaczenia",
+            "avg_confidence": "Śr. confidence", "issues": "Zgłoszone problemy", "qa_failed": "QA z uwagami",
+        }),
+        use_container_width=True,
+    )
+
+prof.finish()
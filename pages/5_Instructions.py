@@ -134,11 +134,24 @@ W tej zakładce:
 System:
 1. wykonuje tłumaczenie z Glossary,
 2. przeprowadza **review językowe** (OK / FIX),
-3. sprawdza:
-   - brak terminów `locked`,
-   - zgodność liczb i jednostek,
+3. sprawdza lokalnie (`qa_checks.py`, bez LLM):
+   - brak terminów `locked` (z tolerancją na odmianę),
+   - zgodność liczb i jednostek (np. 45 cm ≠ 45 mm),
 4. zapisuje wynik do **archiwum jako plik TXT z datą**.
 
+Przy `REVIEW_POLICY=adaptive` tłumaczenia, które przeszły lokalny pre-check
+(terminy `locked` obecne, liczby zgodne ze źródłem), trafiają do pełnego review tylko
+w losowej próbce (`REVIEW_SAMPLE_RATE`, domyślnie 20%). Pozostałe są pomijane
+albo sprawdzane tańszym modelem (`REVIEW_PASS_TIER=light`, `GEMINI_MODEL_REVIEW_LIGHT`).
+Kolumna REVIEW_MODEL w archiwum pokazuje, która ścieżka została użyta.
+
+Tłumaczenie (i Benchmark) działa w tle jako zadanie (`data/jobs/jobs.db`): można zmieniać
+zakładki i pola formularza, a po odświeżeniu przeglądarki wynik wraca z adresu `?job=...`.
+Zadania przerwane restartem serwera są wznawiane automatycznie.
+
+Tryb **Wszystkie rynki** tłumaczy ten sam tekst na 13 języków równolegle
+(każdy język z własnym glossary), pokazuje postęp per język i archiwizuje każdy wynik.
+
 ---
 
 ## Jak interpretować wyniki
@@ -163,6 +176,19 @@ W archiwum:
 
 ---
 
+## 9) LLM Metrics — czas, tokeny i koszt
+Każde wywołanie modelu (tłumaczenie i review) zapisuje rekord do `data/metrics/llm_calls.jsonl`:
+provider, model żądany i faktycznie użyty (fallback Gemini), czas (connect / TTFB / total),
+tokeny, liczba retry i fallbacków oraz szacowany koszt.
+Zakładka pokazuje p50/p95 czasu i koszt per provider i język.
+
+Prompt tłumaczenia zaczyna się od stałego prefiksu (instrukcje + język + całe glossary języka
++ kontekst), a tekst źródłowy jest na końcu. Dzięki temu kolejne tłumaczenia na ten sam język
+korzystają z cache promptu u providera (kolumna `cached_ratio`); dla dużych glossary Gemini
+dostaje jawny context cache. Po zmianie glossary prefiks (i cache) zmienia się automatycznie.
+
+---
+
 ## Dobre praktyki (polecane)
 - Zacznij od Seed glossaries (wspólny punkt wyjścia).
 - Uzupełnij min. **30–80 kluczowych terminów `locked`** na język.
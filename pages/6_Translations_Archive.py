@@ -1,76 +1,96 @@
 import streamlit as st
 import pandas as pd
-import os
+
+from common import LANGS
+from review_parsing import VERDICTS
+from translations_archive import (
+    SORT_COLUMNS,
+    count_index,
+    ensure_indexed,
+    lang_overview,
+    query_index,
+    read_archive_text,
+)
 
 st.set_page_config(page_title="Translations Archive", layout="wide")
 st.header("6) Translations — Archiwum (TXT)")
 
-BASE_DIR = os.path.join("data", "translations")
-
-LANGS = [
-    ("ro", "Rumuński (RO)"),
-    ("hu", "Węgierski (HU)"),
-    ("el", "Grecki (GR)"),
-    ("de", "Niemiecki (DE)"),
-    ("cs", "Czeski (CZ)"),
-    ("sk", "Słowacki (SK)"),
-    ("nl", "Niderlandzki (NL)"),
-    ("it", "Włoski (IT)"),
-    ("fr", "Francuski (FR)"),
-    ("hr", "Chorwacki (HR)"),
-    ("lt", "Litewski (LT)"),
-    ("fi", "Fiński (FI)"),
-    ("sv", "Szwedzki (SE)"),
-]
-
-def read_index(lang_code: str) -> pd.DataFrame:
-    ip = os.path.join(BASE_DIR, f"index_{lang_code}.csv")
-    if os.path.exists(ip):
-        df = pd.read_csv(ip)
-        # sort newest first
-        if "datetime" in df.columns:
-            df = df.sort_values("datetime", ascending=False)
-        return df
-    return pd.DataFrame(columns=["datetime", "title_pl", "filename"])
-
-tabs = st.tabs([label for _, label in LANGS])
-
-for (lang_code, lang_label), tab in zip(LANGS, tabs):
-    with tab:
-        st.subheader(f"{lang_label}")
-
-        df = read_index(lang_code)
-
-        count = len(df)
-        last_dt = df["datetime"].iloc[0] if count and "datetime" in df.columns else "—"
-
-        c1, c2 = st.columns(2)
-        with c1:
-            st.metric("Liczba tłumaczeń", count)
-        with c2:
-            st.metric("Ostatnie tłumaczenie", last_dt)
-
-        if df.empty:
-            st.info("Brak zapisanych tłumaczeń dla tego języka. Zrób tłumaczenie w zakładce Translate.")
-            continue
-
-        st.dataframe(df, use_container_width=True)
-
-        st.divider()
-        st.markdown("### Pobierz plik TXT")
-
-        options = df["filename"].tolist()
-        chosen = st.selectbox("Wybierz plik", options=options, key=f"file_{lang_code}")
-
-        file_path = os.path.join(BASE_DIR, lang_code, chosen)
-        if os.path.exists(file_path):
-            with open(file_path, "rb") as f:
-                st.download_button(
-                    label="⬇️ Download TXT",
-                    data=f.read(),
-                    file_name=chosen,
-                    mime="text/plain",
-                    key=f"dl_{lang_code}_{chosen}"
-                )
-        else:
-            st.error("Plik nie istnieje (możliwy reset środowiska). Wykonaj tłumaczenie ponownie.")
+PAGE_SIZES = [25, 50, 100, 200]
+
+# ładowany jest tylko wybrany język, a z indeksu (archive.db) tylko bieżąca strona
+codes = [code for code, _ in LANGS]
+default_lang = st.session_state.get("target_language")
+lang_code = st.selectbox(
+    "Język",
+    options=codes,
+    index=codes.index(default_lang) if default_lang in codes else 0,
+    format_func=dict(LANGS).get,
+)
+lang_label = dict(LANGS)[lang_code]
+
+ensure_indexed(lang_code)
+overview = lang_overview(lang_code)
+
+st.subheader(f"{lang_label}")
+c1, c2 = st.columns(2)
+with c1:
+    st.metric("Liczba tłumaczeń", overview["count"])
+with c2:
+    st.metric("Ostatnie tłumaczenie", overview["last_dt"] or "—")
+
+if not overview["count"]:
+    st.info("Brak zapisanych tłumaczeń dla tego języka. Zrób tłumaczenie w zakładce Translate.")
+    st.stop()
+
+f1, f2, f3, f4, f5 = st.columns([3, 2, 2, 2, 1])
+with f1:
+    search = st.text_input("Szukaj (nazwa PL / plik)", key=f"search_{lang_code}")
+with f2:
+    verdicts = st.multiselect("Verdict", options=list(VERDICTS) + ["?"], key=f"verdicts_{lang_code}")
+with f3:
+    provider = st.selectbox("Provider", options=["(wszyscy)"] + overview["providers"], key=f"provider_{lang_code}")
+with f4:
+    sort = st.selectbox("Sortuj wg", options=list(SORT_COLUMNS), key=f"sort_{lang_code}")
+    descending = st.toggle("Malejąco", value=True, key=f"desc_{lang_code}")
+with f5:
+    page_size = st.selectbox("Na stronę", options=PAGE_SIZES, index=1, key=f"page_size_{lang_code}")
+
+filters = (search, tuple(verdicts), provider, sort, descending, page_size)
+# zmiana filtrów → wracamy na pierwszą stronę
+if st.session_state.get(f"filters_{lang_code}") != filters:
+    st.session_state[f"filters_{lang_code}"] = filters
+    st.session_state[f"page_{lang_code}"] = 1
+
+provider = None if provider == "(wszyscy)" else provider
+total = count_index(lang_code, search, verdicts, provider)
+pages = max(1, -(-total // page_size))
+page = st.number_input(f"Strona (z {pages})", min_value=1, max_value=pages, step=1, key=f"page_{lang_code}")
+
+offset = (int(page) - 1) * page_size
+rows = query_index(lang_code, search, verdicts, provider, sort=sort, descending=descending,
+                   limit=page_size, offset=offset)
+st.caption(f"Pasujących: {total} | wiersze {offset + 1 if rows else 0}–{offset + len(rows)}")
+
+if not rows:
+    st.info("Brak tłumaczeń dla wybranych filtrów.")
+    st.stop()
+
+st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+
+st.divider()
+st.markdown("### Pobierz plik TXT")
+
+chosen = st.selectbox("Wybierz plik (bieżąca strona)", options=[r["filename"] for r in rows], key=f"file_{lang_code}")
+
+# rekord z segmentu: seek po offsecie z indeksu i dekompresja jednej ramki (kilka KB)
+text = read_archive_text(lang_code, chosen)
+if text is not None:
+    st.download_button(
+        label="⬇️ Download TXT",
+        data=text.encode("utf-8"),
+        file_name=chosen,
+        mime="text/plain",
+        key=f"dl_{lang_code}_{chosen}"
+    )
+else:
+    st.error("Plik nie istnieje (możliwy reset środowiska). Wykonaj tłumaczenie ponownie.")
@@ -1,56 +1,146 @@
 import streamlit as st
+import pandas as pd
 import os
-import io
-import zipfile
-from datetime import datetime
+
+import jobs
+from backup_store import list_snapshots, store_size
 
 st.set_page_config(page_title="Data Backup (ZIP)", layout="wide")
 st.header("⚠️ 7) Data Backup — eksport danych (ZIP)")
 
+jobs.ensure_started()
+
 st.markdown(
     """
 Ta zakładka umożliwia **ręczny eksport wszystkich danych roboczych**
 (glossary, tłumaczenia, archiwa, backupy) do **jednego pliku ZIP**.
 
-⚠️ **Zalecenie:**  
+⚠️ **Zalecenie:**
 Pobierz ZIP **zawsze po zakończeniu pracy**, zanim zamkniesz aplikację.
 """
 )
 
 DATA_DIR = "data"
+# download_button wczytuje cały plik do pamięci serwera (Streamlit nie streamuje pobrań) —
+# większe backupy tylko jako ścieżka na dysku
+DOWNLOAD_MAX_MB = float(os.environ.get("BACKUP_DOWNLOAD_MAX_MB") or 200)
 
 if not os.path.exists(DATA_DIR):
     st.warning("Brak katalogu `data/` — nie ma czego eksportować.")
     st.stop()
 
-def build_zip():
-    buffer = io.BytesIO()
-    ts = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-    zip_name = f"enzo-translator-backup-{ts}.zip"
+st.divider()
+
+if st.button("📦 Utwórz backup ZIP", type="primary"):
+    # ZIP powstaje w tle (jobs.py) strumieniowo do pliku tymczasowego — UI nie blokuje się
+    job_id = jobs.submit("backup", {})
+    st.session_state.backup_job_id = job_id
+    st.query_params["backup_job"] = job_id
+
+
+@st.fragment(run_every=2)
+def backup_poll(job_id: str) -> None:
+    job = jobs.get_job(job_id)
+    if job is None:
+        return
+    if job["status"] not in jobs.ACTIVE_STATUSES:
+        st.rerun()
+    total = job["total"] or 0
+    current = (job["result"] or {}).get("current", "")
+    st.progress(
+        min(1.0, job["done"] / total) if total else 0.0,
+        text=f"Backup w toku: {job['done'] / 1024 / 1024:.1f} / {total / 1024 / 1024:.1f} MB {current}",
+    )
 
-    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zipf:
-        for root, _, files in os.walk(DATA_DIR):
-            for file in files:
-                full_path = os.path.join(root, file)
-                arcname = os.path.relpath(full_path, DATA_DIR)
-                zipf.write(full_path, arcname)
 
-    buffer.seek(0)
-    return zip_name, buffer
+job_id = st.query_params.get("backup_job") or st.session_state.get("backup_job_id")
+job = jobs.get_job(job_id) if job_id else None
+if job is not None and job["kind"] == "backup":
+    if job["status"] in jobs.ACTIVE_STATUSES:
+        backup_poll(job_id)
+    elif job["status"] == "failed":
+        st.error(f"Backup nie powiódł się: {job['error']}")
+    else:
+        path, size = job["result"]["path"], job["result"]["size"]
+        size_mb = size / 1024 / 1024
+        if not os.path.exists(path):
+            st.warning("Plik backupu został już usunięty (zachowywane są tylko ostatnie). Utwórz nowy.")
+        elif size_mb > DOWNLOAD_MAX_MB:
+            st.success(f"Backup gotowy ({size_mb:.1f} MB, {job['elapsed_s']} s).")
+            st.warning(f"Plik jest za duży na pobranie przez przeglądarkę (> {DOWNLOAD_MAX_MB:.0f} MB). Skopiuj go z serwera:")
+            st.code(os.path.abspath(path))
+        else:
+            st.success(f"Backup ZIP wygenerowany ({size_mb:.1f} MB, {job['elapsed_s']} s). Zapisz go lokalnie lub dodaj do repozytorium.")
+            st.caption(f"Pobieranie wczytuje plik ({size_mb:.1f} MB) do pamięci serwera — limit: "
+                       f"BACKUP_DOWNLOAD_MAX_MB={DOWNLOAD_MAX_MB:.0f}. Plik na dysku: `{os.path.abspath(path)}`")
+            with open(path, "rb") as f:
+                st.download_button(
+                    label="⬇️ Pobierz backup ZIP",
+                    data=f,
+                    file_name=os.path.basename(path),
+                    mime="application/zip"
+                )
 
 st.divider()
 
-if st.button("⬇️ Pobierz backup ZIP", type="primary"):
-    zip_name, zip_buffer = build_zip()
+# -------------------------
+# Snapshoty przyrostowe (backup_store)
+# -------------------------
+st.subheader("Snapshoty przyrostowe")
+st.caption(
+    "Zapisywane są tylko zmienione pliki (deduplikacja kawałków po hashu) — czas zależy od tego, co się zmieniło. "
+    "Store: `data/backup/store` (jest w ZIP). Retencja: ostatnie 10 + dzienne + tygodniowe."
+)
 
-    st.download_button(
-        label="📦 Download ZIP",
-        data=zip_buffer,
-        file_name=zip_name,
-        mime="application/zip"
+if st.button("🧩 Utwórz snapshot"):
+    job_id = jobs.submit("snapshot", {"label": "ręczny (Data Backup)"})
+    st.session_state.snapshot_job_id = job_id
+    st.query_params["snapshot_job"] = job_id
+
+
+@st.fragment(run_every=2)
+def snapshot_poll(job_id: str) -> None:
+    job = jobs.get_job(job_id)
+    if job is None:
+        return
+    if job["status"] not in jobs.ACTIVE_STATUSES:
+        st.rerun()
+    total = job["total"] or 0
+    st.progress(min(1.0, job["done"] / total) if total else 0.0, text=f"Snapshot w toku: {job['done']}/{total} plików")
+
+
+job_id = st.query_params.get("snapshot_job") or st.session_state.get("snapshot_job_id")
+job = jobs.get_job(job_id) if job_id else None
+if job is not None and job["kind"] == "snapshot":
+    if job["status"] in jobs.ACTIVE_STATUSES:
+        snapshot_poll(job_id)
+    elif job["status"] == "failed":
+        st.error(f"Snapshot nie powiódł się: {job['error']}")
+    else:
+        res = job["result"]
+        st.success(
+            f"Snapshot {res['id']}: {res['stats']['changed_files']}/{res['stats']['files']} zmienionych plików, "
+            f"nowe dane {res['stats']['new_bytes'] / 1024 / 1024:.2f} MB, {res['elapsed_s']} s."
+        )
+
+snapshots = list_snapshots()
+if snapshots:
+    st.dataframe(
+        pd.DataFrame([
+            {"id": m["id"], "scope": m["scope"], "label": m["label"], "files": m["stats"]["files"],
+             "changed_files": m["stats"]["changed_files"], "new_MB": round(m["stats"]["new_bytes"] / 1024 / 1024, 2),
+             "total_MB": round(m["stats"]["total_bytes"] / 1024 / 1024, 2)}
+            for m in snapshots
+        ]),
+        use_container_width=True,
     )
-
-    st.success("Backup ZIP wygenerowany. Zapisz go lokalnie lub dodaj do repozytorium.")
+    st.caption(f"Rozmiar store: {store_size() / 1024 / 1024:.2f} MB")
+    st.markdown(
+        "Przywracanie (z konsoli): `python backup_store.py restore <id>` → `restore/<id>/`, "
+        "albo `--to data` (nadpisuje), `--path data/glossary_de.csv` dla pojedynczego pliku."
+    )
+else:
+    st.caption("Brak snapshotów.")
 
 st.divider()
 
@@ -60,14 +150,16 @@ st.info(
 - wszystkie `glossary_*.csv`
 - wszystkie zapisane tłumaczenia `.txt`
 - pliki indeksów tłumaczeń
-- backupy glossary
+- snapshoty przyrostowe (`data/backup/store`, w tym wersje glossary sprzed overwrite)
+- bazy SQLite (spójna kopia, także w trakcie pracy)
 
 ### Czego backup NIE robi
 - nie zapisuje danych automatycznie do GitHuba
 - nie zastępuje commitów (ZIP to kopia bezpieczeństwa)
 
-➡️ **Najlepsza praktyka:**  
+➡️ **Najlepsza praktyka:**
 ZIP + commit do repo = pełne bezpieczeństwo.
+
+Z konsoli: `python backup_zip.py [plik.zip]`
 """
 )
-
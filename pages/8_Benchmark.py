@@ -1,12 +1,14 @@
 import streamlit as st
 import pandas as pd
-import os
 
-from llm_providers import chat_llm, review_llm
+import jobs
+from common import build_source
 
 st.set_page_config(page_title="Benchmark", layout="wide")
 st.header("🧪 8) Benchmark — OpenAI vs Gemini vs Qwen | Review: Gemini")
 
+jobs.ensure_started()
+
 lang = st.session_state.get("target_language")
 label = st.session_state.get("target_market_label")
 style_hint_default = st.session_state.get("style_hint", "")
@@ -18,49 +20,6 @@ if not lang:
 st.subheader(f"Rynek: {label}")
 st.caption("Translate: OpenAI / Gemini / Qwen | Review: zawsze Gemini")
 
-def load_glossary_df(lang_code: str) -> pd.DataFrame:
-    path = f"data/glossary_{lang_code}.csv"
-    if not os.path.exists(path):
-        return pd.DataFrame(columns=["term_pl", "term_target", "locked", "notes"])
-    df = pd.read_csv(path)
-
-    for col in ["term_pl", "term_target", "locked", "notes"]:
-        if col not in df.columns:
-            df[col] = "" if col != "locked" else False
-
-    df["term_pl"] = df["term_pl"].astype(str).str.strip()
-    df["term_target"] = df["term_target"].astype(str).str.strip()
-    df["locked"] = df["locked"].apply(lambda x: str(x).strip().lower() in ["true", "1", "yes", "y", "t"])
-
-    df = df[(df["term_pl"].str.len() > 0) & (df["term_target"].str.len() > 0)].copy()
-    df = df.drop_duplicates(subset=["term_pl"], keep="last").reset_index(drop=True)
-    return df
-
-def filter_glossary_for_source(df: pd.DataFrame, source_text: str) -> pd.DataFrame:
-    if df.empty:
-        return df
-    src = (source_text or "").lower()
-
-    def appears(term: str) -> bool:
-        t = (term or "").strip().lower()
-        if len(t) <= 2:
-            return False
-        return t in src
-
-    mask_locked = df["locked"] == True
-    mask_appears = df["term_pl"].apply(appears)
-
-    filtered = df[mask_locked | mask_appears].copy()
-    filtered["__prio"] = filtered["locked"].apply(lambda x: 0 if x else 1)
-    filtered = filtered.sort_values(["__prio", "term_pl"]).drop(columns=["__prio"]).reset_index(drop=True)
-    return filtered
-
-def glossary_to_text(df: pd.DataFrame) -> str:
-    if df.empty:
-        return ""
-    return "\n".join([f"- {r['term_pl']} => {r['term_target']}" for _, r in df.iterrows()])
-
-
 col1, col2 = st.columns([1, 1])
 with col1:
     title_pl = st.text_input("Nazwa (PL)", placeholder="np. Fotel fryzjerski Enzo X1")
@@ -75,110 +34,56 @@ with col2:
 
 body_pl = st.text_area("Dalsza treść (PL)", height=220)
 
-SYSTEM_TRANSLATE = "You are a professional translator. Translate precisely. Output plain text only."
-SYSTEM_REVIEW = "You are a senior linguistic reviewer."
-
-def build_translate_prompt(source_text: str, glossary_block: str) -> str:
-    return f"""
-Target language: {label}
-
-Context:
-{benchmark_context.strip() if benchmark_context.strip() else "None"}
-
-Mandatory terminology:
-{glossary_block if glossary_block else "None"}
-
-Rules:
-- Output plain text only (no HTML)
-- Preserve structure NAME/BODY
-- Use mandatory terminology when applicable
-- Keep numbers/units consistent
-- Do not add explanations
-
-Translate:
-
-{source_text}
-""".strip()
-
-def build_review_prompt(source_text: str, translation: str, provider_name: str, glossary_block: str) -> str:
-    return f"""
-Compare translation quality objectively.
-
-Mandatory terminology (must be respected):
-{glossary_block if glossary_block else "None"}
-
-Return format:
-VERDICT: OK / FIX
-ISSUES:
-- ...
-SUGGESTED FIXES:
-- ...
-CONFIDENCE: 0-100
-
-SOURCE:
-{source_text}
-
-TRANSLATION ({provider_name}):
-{translation}
-""".strip()
-
 st.divider()
 
+PROVIDERS = [("openai", "OpenAI"), ("gemini", "Gemini"), ("qwen", "Qwen")]
+
 if st.button("Run benchmark", type="primary"):
     if not ((title_pl or "").strip() or (body_pl or "").strip()):
         st.warning("Uzupełnij nazwę lub treść.")
         st.stop()
 
-    source = f"NAME:\n{title_pl.strip()}\n\nBODY:\n{body_pl.strip()}"
+    # benchmark działa w tle (jobs.py) — rerun albo zmiana zakładki go nie przerywa
+    job_id = jobs.submit("benchmark", {
+        "source": build_source(title_pl, body_pl),
+        "lang": lang,
+        "label": label,
+        "context": benchmark_context,
+        "temperature": temperature,
+        "providers": PROVIDERS,
+    })
+    st.session_state.benchmark_job_id = job_id
+    st.query_params["job"] = job_id
+
+
+@st.fragment(run_every=2)
+def benchmark_poll(job_id: str) -> None:
+    job = jobs.get_job(job_id)
+    if job["status"] not in jobs.ACTIVE_STATUSES:
+        st.rerun()
+    st.info(f"Benchmark w toku: {job['done']}/{job['total'] or 2 * len(PROVIDERS)} kroków (tłumaczenia, potem review).")
+
+
+job_id = st.query_params.get("job") or st.session_state.get("benchmark_job_id")
+job = jobs.get_job(job_id) if job_id else None
+if job is not None and job["kind"] == "benchmark":
+    if job["status"] in jobs.ACTIVE_STATUSES:
+        benchmark_poll(job_id)
+    elif job["status"] == "failed":
+        st.error(f"Benchmark nie powiódł się: {job['error']}")
+    else:
+        st.session_state.benchmark = job["result"]
 
-    gdf_all = load_glossary_df(lang)
-    gdf_filtered = filter_glossary_for_source(gdf_all, source)
-    glossary_block = glossary_to_text(gdf_filtered)
+if "benchmark" in st.session_state:
+    st.subheader("Wyniki benchmarku")
 
     c1, c2, c3 = st.columns(3)
     with c1:
-        st.metric("Glossary: wszystkie wpisy", int(len(gdf_all)))
+        st.metric("Glossary: wszystkie wpisy", st.session_state.benchmark.get("glossary_all_count", 0))
     with c2:
-        st.metric("Glossary: użyte w benchmarku", int(len(gdf_filtered)))
+        st.metric("Glossary: użyte w benchmarku", len(st.session_state.benchmark.get("glossary_used", [])))
     with c3:
-        locked_count = int(gdf_all["locked"].sum()) if not gdf_all.empty else 0
-        st.metric("Glossary: locked (łącznie)", locked_count)
-
-    providers = [("openai", "OpenAI"), ("gemini", "Gemini"), ("qwen", "Qwen")]
-    results = {}
-
-    with st.spinner("Tłumaczenie (OpenAI / Gemini / Qwen)…"):
-        for code, name in providers:
-            translated = chat_llm(
-                provider=code,
-                temperature=temperature,
-                messages=[
-                    {"role": "system", "content": SYSTEM_TRANSLATE},
-                    {"role": "user", "content": build_translate_prompt(source, glossary_block)},
-                ],
-            )
-            results[code] = {"translation": translated}
-
-    with st.spinner("Review (Gemini)…"):
-        for code, name in providers:
-            review = review_llm(
-                temperature=0.1,
-                messages=[
-                    {"role": "system", "content": SYSTEM_REVIEW},
-                    {"role": "user", "content": build_review_prompt(source, results[code]["translation"], name, glossary_block)},
-                ],
-            )
-            results[code]["review"] = review
-
-    st.session_state.benchmark = {
-        "context": benchmark_context,
-        "source": source,
-        "glossary_used": gdf_filtered.to_dict(orient="records"),
-        "results": results,
-    }
-
-if "benchmark" in st.session_state:
-    st.subheader("Wyniki benchmarku")
+        st.metric("Glossary: locked (łącznie)", st.session_state.benchmark.get("glossary_locked_count", 0))
 
     with st.expander("Kontekst, źródło i glossary użyte w benchmarku", expanded=False):
         st.markdown("**Kontekst:**")
@@ -191,12 +96,20 @@ if "benchmark" in st.session_state:
             st.markdown("**Glossary użyte:**")
             st.dataframe(pd.DataFrame(g_used)[["term_pl", "term_target", "locked"]], width="stretch")
 
-    tabs = st.tabs(["OpenAI", "Gemini", "Qwen"])
-    mapping = [("openai", "OpenAI"), ("gemini", "Gemini"), ("qwen", "Qwen")]
+    tabs = st.tabs([name for _, name in PROVIDERS])
 
-    for tab, (code, name) in zip(tabs, mapping):
+    for tab, (code, name) in zip(tabs, PROVIDERS):
         with tab:
+            res = st.session_state.benchmark["results"][code]
+            if res.get("error"):
+                st.error(f"Błąd tłumaczenia: {res['error']}")
+                continue
+            if "translate_s" in res:
+                st.caption(
+                    f"Czas: tłumaczenie {res['translate_s']} s | review {res.get('review_s', '—')} s | "
+                    f"verdict: {res.get('verdict') or '?'} | confidence: {res.get('confidence') if res.get('confidence') is not None else '?'}"
+                )
             st.markdown(f"### Translation — {name}")
             st.code(st.session_state.benchmark["results"][code]["translation"], language="text")
             st.markdown("### Review (Gemini)")
-            st.code(st.session_state.benchmark["results"][code]["review"], language="text")
+            st.code(st.session_state.benchmark["results"][code].get("review", ""), language="text")
@@ -0,0 +1,139 @@
+import streamlit as st
+import pandas as pd
+import os
+
+from llm_metrics import load_calls, METRICS_PATH
+from llm_providers import default_review_model, gemini_cache_table, gemini_routing_table, single_flight_stats
+from llm_resilience import breaker_table
+
+st.set_page_config(page_title="LLM Metrics", layout="wide")
+st.header("📈 9) LLM Metrics — latency, tokeny, koszt")
+
+st.caption(f"Każde wywołanie chat_llm / review_llm zapisuje rekord do `{METRICS_PATH}`.")
+
+st.subheader("Routing Gemini (stan w tym procesie)")
+st.caption(
+    "Model, który zwrócił ClientError (brak modelu / brak dostępu / quota), jest pomijany do czasu wygaśnięcia backoffu. "
+    "Tłumaczenie i review idą od razu do pierwszego zdrowego modelu."
+)
+st.dataframe(pd.DataFrame(gemini_routing_table(default_review_model())), use_container_width=True)
+
+caches = gemini_cache_table()
+if caches:
+    st.subheader("Gemini context cache (stałe prefiksy: instrukcje + glossary)")
+    st.dataframe(pd.DataFrame(caches), use_container_width=True)
+
+flights = single_flight_stats()
+st.caption(
+    f"Single-flight (ten proces): {flights['leaders']} wywołań do providerów, {flights['coalesced']} identycznych "
+    f"zapytań dołączonych do trwających, {flights['in_flight']} w toku."
+)
+
+breakers = breaker_table()
+if breakers:
+    st.subheader("Circuit breakers (per provider)")
+    st.dataframe(pd.DataFrame(breakers), use_container_width=True)
+
+st.divider()
+
+limit = st.number_input("Ile ostatnich wywołań analizować", min_value=100, max_value=200_000, value=5000, step=500)
+
+
+@st.cache_data(show_spinner=False, max_entries=8)
+def calls_df(limit: int, mtime_ns: int, size: int) -> pd.DataFrame:
+    # JSONL parsowany tylko po zmianie pliku — zmiana filtrów (rerun) korzysta z cache
+    df = pd.DataFrame(load_calls(limit=limit))
+    if not df.empty:
+        df["lang"] = df["lang"].fillna("—")
+    return df
+
+
+stat = os.stat(METRICS_PATH) if os.path.exists(METRICS_PATH) else None
+df = calls_df(int(limit), stat.st_mtime_ns, stat.st_size) if stat else pd.DataFrame()
+if df.empty:
+    st.info("Brak zapisanych wywołań. Wykonaj tłumaczenie w zakładce Translate lub Benchmark.")
+    st.stop()
+
+c1, c2, c3 = st.columns(3)
+with c1:
+    providers = sorted(df["provider"].dropna().unique().tolist())
+    chosen_providers = st.multiselect("Provider", providers, default=providers)
+with c2:
+    purposes = sorted(df["purpose"].dropna().unique().tolist())
+    chosen_purposes = st.multiselect("Cel", purposes, default=purposes)
+with c3:
+    group_by_lang = st.checkbox("Grupuj także po języku", value=True)
+
+df = df[df["provider"].isin(chosen_providers) & df["purpose"].isin(chosen_purposes)]
+if df.empty:
+    st.info("Brak wywołań dla wybranych filtrów.")
+    st.stop()
+
+keys = ["provider", "lang"] if group_by_lang else ["provider"]
+# odpowiedzi z llm_cache i dołączone do trwającego wywołania (single-flight) nie wchodzą do statystyk latency/kosztu
+coalesced = df["coalesced"] == True if "coalesced" in df.columns else pd.Series(False, index=df.index)
+ok = df[(df["ok"] == True) & (df["cache_hit"] != True) & ~coalesced]
+# wywołania porzucone przez hedge (odpowiedział drugi provider) to nie błędy providera — jak w llm_router._call_stats
+abandoned = df["error"].fillna("").astype(str).str.startswith("abandoned") if "error" in df.columns \
+    else pd.Series(False, index=df.index)
+
+summary = df.assign(_abandoned=abandoned, _failed=(df["ok"] != True) & ~abandoned).groupby(keys).agg(
+    calls=("ok", "size"),
+    errors=("_failed", "sum"),
+    abandoned=("_abandoned", "sum"),
+    fallback_hops=("fallback_hops", "sum"),
+    retries=("retries", "sum"),
+    cache_hits=("cache_hit", lambda s: int((s == True).sum())),
+).reset_index()
+summary = summary.merge(
+    coalesced.groupby([df[k] for k in keys]).sum().astype(int).rename("coalesced").reset_index(), on=keys, how="left"
+)
+
+if not ok.empty:
+    latency = ok.groupby(keys)["total_ms"].quantile([0.5, 0.95]).unstack().reset_index()
+    latency.columns = keys + ["p50_ms", "p95_ms"]
+    ttfb = ok.groupby(keys)["ttfb_ms"].median().reset_index(name="ttfb_p50_ms")
+    cost = ok.groupby(keys).agg(
+        prompt_tokens=("prompt_tokens", "sum"),
+        cached_tokens=("cached_tokens", "sum"),
+        completion_tokens=("completion_tokens", "sum"),
+        cost_usd=("cost_usd", "sum"),
+    ).reset_index()
+    # odsetek tokenów promptu z prefix cache (OpenAI automatic / Gemini implicit + explicit)
+    cost["cached_ratio"] = (cost["cached_tokens"] / cost["prompt_tokens"].where(cost["prompt_tokens"] > 0)).round(3)
+    summary = summary.merge(latency, on=keys, how="left").merge(ttfb, on=keys, how="left").merge(cost, on=keys, how="left")
+    summary["cost_per_call_usd"] = summary["cost_usd"] / summary["calls"]
+
+# budżet tokenów (token_budget): wykorzystanie budżetu promptu, przycięte prompty, odpowiedzi ucięte na max_tokens
+if "budget_used" in df.columns:
+    budget = df.groupby(keys).agg(
+        budget_used_p50=("budget_used", "median"),
+        budget_used_max=("budget_used", "max"),
+        clipped=("clipped", lambda s: int(s.apply(lambda v: isinstance(v, list) and len(v) > 0).sum())),
+        truncated=("truncated", lambda s: int((s == True).sum())),
+    ).reset_index()
+    summary = summary.merge(budget, on=keys, how="left")
+
+summary["error_rate"] = (summary["errors"] / (summary["calls"] - summary["abandoned"]).where(lambda n: n > 0)).round(3)
+
+st.subheader("Podsumowanie")
+st.caption(
+    "budget_used = tokeny promptu / budżet (system + user, token_budget); clipped = prompty przycięte do budżetu; "
+    "truncated = odpowiedzi ucięte na max_tokens; abandoned = wywołania porzucone przez hedge "
+    "(odpowiedział drugi provider) — nie liczą się do errors / error_rate."
+)
+st.dataframe(summary, use_container_width=True)
+
+st.subheader("Modele (requested → resolved)")
+models = df.groupby(["provider", "requested_model", "resolved_model"], dropna=False).size().reset_index(name="calls")
+st.dataframe(models, use_container_width=True)
+
+with st.expander("Surowe rekordy (ostatnie 200)", expanded=False):
+    st.dataframe(df.tail(200).iloc[::-1], use_container_width=True)
+
+st.download_button(
+    "⬇️ Pobierz podsumowanie (CSV)",
+    data=summary.to_csv(index=False).encode("utf-8"),
+    file_name="llm_metrics_summary.csv",
+    mime="text/csv",
+)
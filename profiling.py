@@ -0,0 +1,258 @@
+"""
+Lekkie profilowanie stron Streamlit i pipeline'u:
+- span("nazwa") — context manager mierzący etap (wczytanie glossary, normalizacja, dopasowanie terminów,
+  budowa promptu, wywołania providerów, zapis archiwum). Bez aktywnego pomiaru w wątku to jeden odczyt
+  threading.local i współdzielony nullcontext — można go zostawić w gorących ścieżkach,
+- page("nazwa") na początku strony + finish() na końcu — zbiera spany jednego reruna, pokazuje panel
+  czasów w sidebarze i/lub zapisuje profil całego reruna do data/profiles.
+
+Zadania w tle (jobs.py) działają w innych wątkach — ich etapy strona pokazuje z wyniku zadania
+(finish(extra=...)).
+
+ENV:
+  PROFILE_PANEL  1 = panel czasów w sidebarze
+  PROFILE_DUMP   cprofile | pyinstrument — profil każdego reruna do data/profiles
+                 (pyinstrument tylko jeśli zainstalowany, inaczej cProfile)
+  PROFILE_KEEP   ile ostatnich profili trzymać w data/profiles (200)
+"""
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from typing import Dict, List, Optional
+
+# bez importu common — profiling jest importowany także przez common
+PROFILES_DIR = os.path.join("data", "profiles")
+
+_local = threading.local()
+_NOOP = nullcontext()
+# strony z pomiarem w toku — rerun przerwany przed finish() (st.stop, wyjątek) zostawia włączony profiler
+_open_lock = threading.Lock()
+_open_pages: List["PageProfile"] = []
+
+
+def panel_enabled() -> bool:
+    return os.environ.get("PROFILE_PANEL", "").lower() in ["1", "true", "yes"]
+
+
+def dump_mode() -> str:
+    mode = os.environ.get("PROFILE_DUMP", "").lower().strip()
+    return mode if mode in ("cprofile", "pyinstrument") else ""
+
+
+class Collector:
+    """Spany jednego pomiaru (jeden wątek): (nazwa, głębokość, start ms, czas ms) w kolejności startu."""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.records: List[tuple] = []
+        self.started = time.perf_counter()
+        self._depth = 0
+
+    @contextmanager
+    def span(self, name: str):
+        started = time.perf_counter()
+        record = [name, self._depth, (started - self.started) * 1000, None]
+        self.records.append(record)
+        self._depth += 1
+        try:
+            yield
+        finally:
+            self._depth -= 1
+            record[3] = (time.perf_counter() - started) * 1000
+
+    def elapsed_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def summary(self) -> List[dict]:
+        """Agregat po nazwie (kolejność pierwszego wystąpienia): liczba, suma i max ms."""
+        out: Dict[str, dict] = {}
+        for name, depth, _, ms in self.records:
+            item = out.setdefault(name, {"span": name, "depth": depth, "calls": 0, "total_ms": 0.0, "max_ms": 0.0})
+            ms = ms or 0.0
+            item["calls"] += 1
+            item["total_ms"] += ms
+            item["max_ms"] = max(item["max_ms"], ms)
+        return [{**v, "total_ms": round(v["total_ms"], 1), "max_ms": round(v["max_ms"], 1)} for v in out.values()]
+
+
+def span(name: str):
+    """Etap do pomiaru; no-op, gdy w tym wątku nic nie zbiera."""
+    collector = getattr(_local, "collector", None)
+    return _NOOP if collector is None else collector.span(name)
+
+
+@contextmanager
+def collect(name: str):
+    """Zbiera spany bloku (bieżący wątek) — np. benchmark albo zadanie w tle."""
+    previous = getattr(_local, "collector", None)
+    collector = _local.collector = Collector(name)
+    try:
+        yield collector
+    finally:
+        _local.collector = previous
+
+
+class _Profiler:
+    """cProfile albo pyinstrument dla całego reruna."""
+
+    def __init__(self, mode: str):
+        self.kind = "cprofile"
+        self._impl = None
+        if mode == "pyinstrument":
+            try:
+                from pyinstrument import Profiler
+
+                self._impl = Profiler()
+                self.kind = "pyinstrument"
+            except ImportError:
+                pass
+        if self._impl is None:
+            import cProfile
+
+            self._impl = cProfile.Profile()
+
+    def start(self) -> bool:
+        try:
+            self._impl.start() if self.kind == "pyinstrument" else self._impl.enable()
+            return True
+        except (RuntimeError, ValueError):
+            # inny profiler już działa w tym wątku (np. zewnętrzny) — rerun bez zrzutu
+            return False
+
+    def stop(self) -> None:
+        self._impl.stop() if self.kind == "pyinstrument" else self._impl.disable()
+
+    def dump(self, base: str, collector: Collector) -> str:
+        spans = "\n".join(
+            f"{'  ' * s['depth']}{s['span']:<30} {s['calls']:>5}x {s['total_ms']:>10.1f} ms (max {s['max_ms']:.1f})"
+            for s in collector.summary()
+        )
+        header = f"{collector.name}: {collector.elapsed_ms():.1f} ms\n\nSpany:\n{spans}\n\n"
+        if self.kind == "pyinstrument":
+            path = base + ".html"
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self._impl.output_html())
+            with open(base + ".txt", "w", encoding="utf-8") as f:
+                f.write(header + self._impl.output_text())
+            return path
+
+        import io
+        import pstats
+
+        path = base + ".prof"
+        self._impl.dump_stats(path)
+        out = io.StringIO()
+        pstats.Stats(self._impl, stream=out).sort_stats("cumulative").print_stats(40)
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(header + out.getvalue())
+        return path
+
+
+def _prune(keep: int) -> None:
+    files = sorted(
+        (os.path.join(PROFILES_DIR, n) for n in os.listdir(PROFILES_DIR)),
+        key=os.path.getmtime,
+    )
+    for path in files[:-keep] if keep > 0 else []:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+class PageProfile:
+    def __init__(self, name: str, panel: bool, mode: str):
+        self.name = name
+        self.panel = panel
+        self.collector = Collector(name)
+        self.profiler = _Profiler(mode) if mode else None
+        self.dump_path: Optional[str] = None
+        self.thread = threading.current_thread()
+
+    def _start(self) -> None:
+        _local.collector = self.collector
+        if self.profiler is not None and not self.profiler.start():
+            self.profiler = None
+        with _open_lock:
+            _open_pages.append(self)
+
+    def _stop(self) -> None:
+        with _open_lock:
+            if self not in _open_pages:
+                return
+            _open_pages.remove(self)
+        if self.profiler is not None:
+            self.profiler.stop()
+        if self.thread is threading.current_thread():
+            _local.collector = None
+
+    def finish(self, extra: Optional[Dict[str, Dict[str, float]]] = None) -> None:
+        """Koniec reruna: zrzut profilu i panel w sidebarze. extra: {etykieta: {etap: ms}} np. z zadań w tle."""
+        self._stop()
+        if self.profiler is not None:
+            os.makedirs(PROFILES_DIR, exist_ok=True)
+            base = os.path.join(PROFILES_DIR, f"{self.name}_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}")
+            self.dump_path = self.profiler.dump(base, self.collector)
+            try:
+                keep = int(os.environ.get("PROFILE_KEEP") or 200)
+            except ValueError:
+                keep = 200
+            # .prof/.html + .txt na rerun
+            _prune(keep * 2)
+        if self.panel:
+            render_panel(self, extra)
+
+
+class _DisabledPage:
+    collector = None
+    dump_path = None
+
+    def finish(self, extra=None) -> None:
+        pass
+
+
+_DISABLED = _DisabledPage()
+
+
+def page(name: str):
+    """
+    Początek pomiaru reruna strony (po set_page_config). Zwraca obiekt z finish() do wywołania na końcu
+    strony; przy wyłączonym profilowaniu — obiekt, który nic nie robi.
+    """
+    current = threading.current_thread()
+    with _open_lock:
+        leftovers = [p for p in _open_pages if p.thread is current or not p.thread.is_alive()]
+    for leftover in leftovers:
+        # poprzedni rerun skończył się przed finish() (st.stop / wyjątek / przerwany rerun)
+        leftover._stop()
+    panel, mode = panel_enabled(), dump_mode()
+    if not panel and not mode:
+        return _DISABLED
+    profile = PageProfile(name, panel, mode)
+    profile._start()
+    return profile
+
+
+def render_panel(profile: PageProfile, extra: Optional[Dict[str, Dict[str, float]]] = None) -> None:
+    import pandas as pd
+    import streamlit as st
+
+    with st.sidebar.expander(f"⏱️ Czasy: {profile.collector.elapsed_ms():.0f} ms", expanded=False):
+        rows = profile.collector.summary()
+        if rows:
+            df = pd.DataFrame(rows)
+            df["span"] = ["  " * d + s for d, s in zip(df.pop("depth"), df["span"])]
+            st.dataframe(df, use_container_width=True, hide_index=True)
+        else:
+            st.caption("Brak spanów w tym rerunie.")
+        for label, stages in (extra or {}).items():
+            if stages:
+                st.caption(label)
+                st.dataframe(
+                    pd.DataFrame([{"etap": k, "ms": round(v, 1)} for k, v in stages.items()]),
+                    use_container_width=True, hide_index=True,
+                )
+        if profile.dump_path:
+            st.caption(f"Profil: `{profile.dump_path}`")
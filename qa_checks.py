@@ -0,0 +1,254 @@
+"""
+Lokalna, deterministyczna kontrola tłumaczenia (bez LLM, mikrosekundy):
+- terminy locked: term_target musi wystąpić w tłumaczeniu (z tolerancją na odmianę),
+- liczby i jednostki: te same wartości i jednostki co w źródle (separatory wg języka tłumaczenia).
+
+Przykłady w number_mismatches: python -m doctest qa_checks.py
+"""
+import math
+import re
+import unicodedata
+from collections import Counter, defaultdict
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# liczby z separatorem dziesiętnym (1,5 == 1.5) i tysięcy: spacja (1 200) albo kropka / przecinek (2.000, 1.234,5);
+# znaczenie kropki zależy od języka — patrz _numbers
+_NUMBER = r"(?<![\w.,])\d{1,3}(?:[ \u00a0\u202f]\d{3})+(?:[.,]\d+)?(?![\w])|\d+(?:[.,]\d+)*"
+_NUMBER_RE = re.compile(_NUMBER)
+_SPACES = " \u00a0\u202f"
+# języki, w których kropka grupuje tysiące (2.000 = 2000), a przecinek jest dziesiętny
+DOT_GROUPING_LANGS = {"de", "nl", "it", "ro", "el", "hr"}
+
+# jednostka → postać kanoniczna (porównujemy tylko kanoniczne)
+_UNITS = {
+    "mm": "mm", "cm": "cm", "m": "m", "km": "km", "µm": "µm",
+    "mg": "mg", "g": "g", "kg": "kg", "t": "t",
+    "ml": "ml", "l": "l",
+    "w": "W", "kw": "kW", "v": "V", "mah": "mAh", "wh": "Wh", "kwh": "kWh",
+    "hz": "Hz", "khz": "kHz", "db": "dB", "rpm": "rpm", "obr/min": "rpm",
+    "°c": "°C", "°": "°", "%": "%",
+    "h": "h", "min": "min", "s": "s",
+    '"': "in", "″": "in",
+}
+_UNIT_RE = re.compile(
+    r"(" + _NUMBER + r")\s?("
+    + "|".join(sorted((re.escape(u) for u in _UNITS), key=len, reverse=True))
+    + r")(?![\w])",
+    re.I,
+)
+_TOKEN_RE = re.compile(r"\w+", re.U)
+
+
+def _strip_zeros(n: str) -> str:
+    if "." in n:
+        n = n.rstrip("0").rstrip(".")
+    return n
+
+
+def _numbers(raw: str, lang: Optional[str] = None) -> List[str]:
+    """
+    Liczba z tekstu → wartości znormalizowane (kropka dziesiętna). Zwykle jedna; kilka, gdy zapis
+    to w rzeczywistości lista ("1,2,3").
+    - obie: kropka i przecinek → ostatni z nich jest dziesiętny ("1.234,5", "1,234.5"),
+    - sama kropka + dokładnie 3 cyfry w każdej grupie w języku z DOT_GROUPING_LANGS → tysiące ("2.000"),
+    - pojedynczy przecinek / kropka → dziesiętny.
+    """
+    n = "".join(ch for ch in raw if ch not in _SPACES)
+    if "." in n and "," in n:
+        decimal = "," if n.rfind(",") > n.rfind(".") else "."
+        group = "." if decimal == "," else ","
+        whole, _, frac = n.rpartition(decimal)
+        if group in frac or decimal in whole:
+            return [_strip_zeros(x) for x in re.split(r"[.,]", n)]
+        return [_strip_zeros(whole.replace(group, "") + "." + frac)]
+    sep = "." if "." in n else "," if "," in n else ""
+    if not sep:
+        return [n]
+    if sep == "." and lang in DOT_GROUPING_LANGS and re.fullmatch(r"\d{1,3}(?:\.\d{3})+", n):
+        return [n.replace(".", "")]
+    if n.count(sep) > 1:
+        return [_strip_zeros(x) for x in n.split(sep)]
+    return [_strip_zeros(n.replace(",", "."))]
+
+
+_Token = Tuple[List[List[str]], List[str]]
+
+
+def _number_tokens(text: str, lang: Optional[str] = None) -> List[_Token]:
+    """
+    (możliwe odczytania, odczytanie domyślne) dla każdej liczby. Niejednoznaczne zapisy rozstrzyga
+    porównanie z drugim tekstem (_resolve):
+    - grupy rozdzielone spacją ("1 200", "3 400 500") — jedna liczba albo osobne (domyślnie osobne),
+    - "1.000" w języku z DOT_GROUPING_LANGS — tysiące albo kropka dziesiętna (domyślnie tysiące).
+    """
+    out = []
+    for m in _NUMBER_RE.finditer(text or ""):
+        raw = m.group(0)
+        values = _numbers(raw, lang)
+        if any(ch in raw for ch in _SPACES):
+            parts = [v for part in re.split(f"[{_SPACES}]", raw) for v in _numbers(part, lang)]
+            out.append(([values, parts], parts))
+        elif lang in DOT_GROUPING_LANGS and re.fullmatch(r"\d{1,3}(?:\.\d{3})+", raw):
+            out.append(([values, _numbers(raw)], values))
+        else:
+            out.append(([values], values))
+    return out
+
+
+def extract_numbers(text: str, lang: Optional[str] = None) -> List[str]:
+    return [v for _, values in _number_tokens(text, lang) for v in values]
+
+
+def extract_quantities(text: str, lang: Optional[str] = None) -> List[Tuple[str, str]]:
+    """Pary (wartość, jednostka kanoniczna), np. "45 cm" → ("45", "cm")."""
+    return [(_numbers(m.group(1), lang)[-1], _UNITS[m.group(2).lower()]) for m in _UNIT_RE.finditer(text or "")]
+
+
+def _fold(text: str) -> str:
+    # bez wielkości liter i znaków diakrytycznych (ß, ä, ő, č... — modele bywają niekonsekwentne)
+    text = unicodedata.normalize("NFKD", (text or "").casefold())
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _stem_len(word: str) -> int:
+    # ~70% słowa musi się zgadzać: końcówki fleksyjne (FI, HU, HR, LT...) mogą mieć kilka liter
+    return len(word) if len(word) <= 3 else max(3, math.ceil(len(word) * 0.7))
+
+
+def token_prefixes(text: str) -> Set[str]:
+    """Wszystkie prefiksy tokenów tłumaczenia — sprawdzenie terminu to kilka lookupów w secie."""
+    return {tok[:i] for tok in set(_TOKEN_RE.findall(_fold(text))) for i in range(1, len(tok) + 1)}
+
+
+@lru_cache(maxsize=50_000)
+def _term_stems(term: str) -> Tuple[str, ...]:
+    # terminy glossary powtarzają się między wywołaniami — normalizacja liczona raz
+    return tuple(word[:_stem_len(word)] for word in _TOKEN_RE.findall(_fold(term)))
+
+
+def term_present(term: str, prefixes: Set[str]) -> bool:
+    """Każde słowo terminu występuje jako token tłumaczenia (dla dłuższych słów wystarczy wspólny rdzeń)."""
+    return all(stem in prefixes for stem in _term_stems(term))
+
+
+def missing_locked_terms(translation: str, glossary_df: "pd.DataFrame") -> List[str]:
+    """Locked term_target, których nie ma w tłumaczeniu (tolerancja na odmianę i diakrytyki)."""
+    if glossary_df is None or glossary_df.empty:
+        return []
+    prefixes = token_prefixes(translation)
+    return [
+        str(t) for t, locked in zip(glossary_df["term_target"], glossary_df["locked"])
+        if locked == True and str(t).strip() and not term_present(str(t), prefixes)
+    ]
+
+
+def _resolve(tokens: List[_Token], other: Set[str]) -> Counter:
+    # pierwsze odczytanie, które druga strona potwierdza ("3 400 500" → 3400500, jeśli tam jest); inaczej domyślne
+    values: Counter = Counter()
+    for readings, default in tokens:
+        values.update(next((r for r in readings if set(r) <= other), default))
+    return values
+
+
+def _all_readings(tokens: List[_Token]) -> Set[str]:
+    return {v for readings, _ in tokens for r in readings for v in r}
+
+
+def number_mismatches(source: str, translation: str, lang: Optional[str] = None) -> dict:
+    """
+    Liczby ze źródła (PL) bez odpowiednika w tłumaczeniu i odwrotnie; lang = język tłumaczenia.
+    Obie strony czytane z tymi samymi regułami (lang) — ten sam zapis po obu stronach zawsze się zgadza.
+
+    >>> number_mismatches("Moc 2000 W", "Leistung 2.000 W", "de")
+    {'missing': [], 'extra': []}
+    >>> number_mismatches("Cena 1 234,50 zł", "Preis 1.234,5 zł", "de")
+    {'missing': [], 'extra': []}
+    >>> number_mismatches("Waga 2.5 kg", "Gewicht 2,5 kg", "de")
+    {'missing': [], 'extra': []}
+    >>> number_mismatches("Moc 2000 W", "Power 2.000 W", "fi")
+    {'missing': ['2000'], 'extra': ['2']}
+    >>> number_mismatches("Zestaw 3 400 500", "Set 3, 400, 500", "de")
+    {'missing': [], 'extra': []}
+    >>> number_mismatches("Obroty 3 400 500", "Drehzahl 3.400.500", "de")
+    {'missing': [], 'extra': []}
+    >>> number_mismatches("Obroty 12 345", "Drehzahl 12", "de")
+    {'missing': ['345'], 'extra': []}
+    >>> number_mismatches("1.000 W", "1.000 W", "de")
+    {'missing': [], 'extra': []}
+    >>> number_mismatches("Cena 1.500 zł", "Preis 1.500 zł", "de")
+    {'missing': [], 'extra': []}
+    >>> number_mismatches("Moc 2.000 W", "Teho 2.000 W", "fi")
+    {'missing': [], 'extra': []}
+    >>> number_mismatches("Waga 1.250 kg", "Gewicht 1,25 kg", "de")
+    {'missing': [], 'extra': []}
+    >>> number_mismatches("Cena 1.500 zł", "Preis 1.600 zł", "de")
+    {'missing': ['1500'], 'extra': ['1600']}
+    """
+    src_tokens, out_tokens = _number_tokens(source, lang), _number_tokens(translation, lang)
+    src, out = _resolve(src_tokens, _all_readings(out_tokens)), _resolve(out_tokens, _all_readings(src_tokens))
+    return {
+        "missing": sorted((src - out).elements()),
+        "extra": sorted((out - src).elements()),
+    }
+
+
+def unit_mismatches(source: str, translation: str, lang: Optional[str] = None) -> List[str]:
+    """Ta sama wartość z inną jednostką (np. 45 cm → 45 mm)."""
+    src: Dict[str, Counter] = defaultdict(Counter)
+    out: Dict[str, Counter] = defaultdict(Counter)
+    for value, unit in extract_quantities(source, lang):
+        src[value][unit] += 1
+    for value, unit in extract_quantities(translation, lang):
+        out[value][unit] += 1
+    issues = []
+    for value in sorted(set(src) & set(out)):
+        if src[value] != out[value]:
+            issues.append(
+                f"{value} {'/'.join(sorted(src[value]))} → {value} {'/'.join(sorted(out[value]))}"
+            )
+    return issues
+
+
+def validate(source: str, translation: str, glossary_df: "pd.DataFrame", lang: Optional[str] = None) -> dict:
+    """
+    Pełna lokalna kontrola. glossary_df: glossary przefiltrowane do źródła (filter_glossary_for_source).
+    lang: język tłumaczenia — decyduje, czy kropka w liczbie to separator tysięcy (DOT_GROUPING_LANGS).
+    issues: lista czytelnych komunikatów (UI / archiwum).
+    """
+    missing = missing_locked_terms(translation, glossary_df)
+    numbers = number_mismatches(source, translation, lang)
+    units = unit_mismatches(source, translation, lang)
+    issues = (
+        [f"Brak terminu locked: {t}" for t in missing]
+        + [f"Brak liczby ze źródła: {n}" for n in numbers["missing"]]
+        + [f"Liczba spoza źródła: {n}" for n in numbers["extra"]]
+        + [f"Inna jednostka: {u}" for u in units]
+    )
+    return {
+        "passed": not issues,
+        "missing_locked": missing,
+        "numbers_missing": numbers["missing"],
+        "numbers_extra": numbers["extra"],
+        "unit_mismatches": units,
+        "issues": issues,
+    }
+
+
+def format_qa(qa: dict) -> str:
+    """Tekst do UI i archiwum TXT (sekcja "QA: ...", parsowana z powrotem przez parse_qa)."""
+    if not qa:
+        return ""
+    if qa.get("passed"):
+        return "QA: OK (terminy locked, liczby, jednostki)"
+    return "QA: UWAGI\n" + "\n".join(f"- {i}" for i in qa.get("issues") or [])
+
+
+def parse_qa(text: str) -> dict:
+    """Odwrotność format_qa (reindex archiwum z plików TXT)."""
+    text = (text or "").strip()
+    issues = [line.strip()[2:] for line in text.splitlines() if line.strip().startswith("- ")]
+    return {"passed": text.startswith("QA: OK"), "issues": issues}
@@ -0,0 +1,160 @@
+"""
+Ponowne tłumaczenie po zmianie glossary: common.save_glossary porównuje stare i nowe glossary,
+a tłumaczenia z archiwum, których źródło zawiera termin ze zmienionym term_target / locked
+(indeks termin → tłumaczenia w archive.db), trafiają do listy oczekujących. Z niej — przyciskiem
+w Glossary albo automatycznie (GLOSSARY_AUTO_RETRANSLATE=1) — do kolejki worker_pool.
+
+Zmiana jednego terminu = tyle wywołań, ile tłumaczeń go zawiera, a nie cały katalog.
+Wpis znika z oczekujących dopiero, gdy nowe tłumaczenie zastąpi oryginał (save_translation(replaces=...));
+zadanie zakończone błędem można wysłać do kolejki ponownie.
+
+ENV:
+  GLOSSARY_AUTO_RETRANSLATE  1 = od razu do kolejki + start workerów (domyślnie 0: tylko lista oczekujących)
+  RETRANSLATE_WORKERS        liczba procesów przy automatycznym starcie (2)
+"""
+import json
+import os
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, List, Optional
+
+from common import LANG_LABELS
+from translations_archive import (
+    connect_db,
+    forget_term_scans,
+    parse_archive_txt,
+    read_archive_text,
+    translations_for_terms,
+)
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def glossary_diff(old: "pd.DataFrame", new: "pd.DataFrame") -> Dict[str, List[str]]:
+    """Terminy (lower): changed — inny term_target albo locked, added, removed, emptied — term_target usunięty."""
+    def entries(df) -> Dict[str, tuple]:
+        return {
+            str(pl).strip().lower(): (str(target).strip(), bool(locked))
+            for pl, target, locked in zip(df["term_pl"], df["term_target"], df["locked"])
+        }
+
+    before, after = entries(old), entries(new)
+    changed = sorted(t for t in before.keys() & after.keys() if before[t] != after[t])
+    return {
+        "changed": changed,
+        "added": sorted(after.keys() - before.keys()),
+        "removed": sorted(before.keys() - after.keys()),
+        "emptied": [t for t in changed if not after[t][0]],
+    }
+
+
+def on_glossary_change(lang_code: str, old: "pd.DataFrame", new: "pd.DataFrame") -> int:
+    """Wołane przy zapisie glossary. Zwraca liczbę tłumaczeń dopisanych do oczekujących."""
+    diff = glossary_diff(old, new)
+    # te terminy nie trafiają do indeksu przy zapisie tłumaczeń — przy powrocie wymagają skanu archiwum
+    forget_term_scans(lang_code, diff["removed"] + diff["emptied"])
+    if not diff["changed"]:
+        return 0
+    affected = translations_for_terms(lang_code, diff["changed"])
+    add_pending(lang_code, affected)
+    if affected and os.environ.get("GLOSSARY_AUTO_RETRANSLATE", "").strip().lower() in ["1", "true", "yes"]:
+        from worker_pool import launch
+
+        enqueue_pending(lang_code)
+        launch(int(os.environ.get("RETRANSLATE_WORKERS") or 2))
+    return len(affected)
+
+
+def add_pending(lang_code: str, affected: Dict[str, List[str]]) -> None:
+    if not affected:
+        return
+    now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    conn = connect_db()
+    try:
+        existing = {
+            r["filename"]: json.loads(r["terms"])
+            for r in conn.execute("SELECT filename, terms FROM pending_retranslation WHERE lang = ?", (lang_code,))
+        }
+        # kolejne zapisy glossary przed ponownym tłumaczeniem sumują terminy
+        conn.executemany(
+            "INSERT OR REPLACE INTO pending_retranslation (lang, filename, terms, created) VALUES (?, ?, ?, ?)",
+            [(lang_code, filename, json.dumps(sorted(set(terms) | set(existing.get(filename, [])))), now)
+             for filename, terms in affected.items()],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+_QUEUE_LABELS = {"queued": "w kolejce", "claimed": "w toku", "failed": "błąd — do ponowienia"}
+
+
+def pending(lang_code: str) -> List[dict]:
+    """Oczekujące ponowne tłumaczenia języka (z danymi z indeksu archiwum i stanem zadania w worker_pool)."""
+    from worker_pool import replacement_status
+
+    conn = connect_db()
+    try:
+        rows = conn.execute(
+            "SELECT p.filename, p.terms, p.created, t.datetime, t.title_pl, t.provider, t.verdict"
+            " FROM pending_retranslation p LEFT JOIN translations t ON t.lang = p.lang AND t.filename = p.filename"
+            " WHERE p.lang = ? AND t.superseded_by IS NULL ORDER BY t.datetime DESC",
+            (lang_code,),
+        ).fetchall()
+    finally:
+        conn.close()
+    queue = replacement_status(lang_code, [r["filename"] for r in rows])
+    return [
+        {**dict(r), "terms": ", ".join(json.loads(r["terms"])),
+         "queue": _QUEUE_LABELS.get((queue.get(r["filename"]) or {}).get("status"), ""),
+         "queue_error": (queue.get(r["filename"]) or {}).get("error") or ""}
+        for r in rows
+    ]
+
+
+def clear_pending(lang_code: str, filenames: Optional[List[str]] = None) -> None:
+    conn = connect_db()
+    try:
+        if filenames is None:
+            conn.execute("DELETE FROM pending_retranslation WHERE lang = ?", (lang_code,))
+        else:
+            conn.executemany("DELETE FROM pending_retranslation WHERE lang = ? AND filename = ?",
+                             [(lang_code, f) for f in filenames])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def enqueue_pending(lang_code: str, provider: Optional[str] = None, context: str = "") -> dict:
+    """
+    Oczekujące → kolejka worker_pool (źródło z archiwum). provider=None: ten sam provider co oryginał.
+    Wpisy już w kolejce / w toku są pomijane, te z błędem idą ponownie. Lista oczekujących nie jest tu
+    czyszczona — wpis usuwa zapis nowego tłumaczenia (replaces), wyjątkiem są rekordy bez tekstu w archiwum.
+    Zwraca {"batch_ids": [...] (jeden na providera), "queued": n, "in_queue": n, "missing": [filename]}.
+    """
+    from worker_pool import enqueue
+
+    by_provider: Dict[str, List[dict]] = {}
+    missing, in_queue = [], 0
+    for row in pending(lang_code):
+        if row["queue"] in (_QUEUE_LABELS["queued"], _QUEUE_LABELS["claimed"]):
+            in_queue += 1
+            continue
+        text = read_archive_text(lang_code, row["filename"])
+        if text is None:
+            # rekord usunięty z archiwum — nie ma czego tłumaczyć, zgłaszamy wołającemu
+            missing.append(row["filename"])
+            continue
+        rec = parse_archive_txt(text)
+        original = (row["provider"] or rec["provider"] or "openai").replace(" (batch)", "").strip().lower()
+        # replaces: nowy rekord zastępuje oryginał (worker_pool → save_translation), bez duplikatów w archiwum
+        by_provider.setdefault(provider or original, []).append(
+            {"name": rec["title_pl"], "source": rec["source"], "replaces": row["filename"]}
+        )
+
+    label = LANG_LABELS.get(lang_code, lang_code)
+    batch_ids = [enqueue(samples, [(lang_code, label)], prov, context=context) for prov, samples in by_provider.items()]
+    clear_pending(lang_code, missing)
+    return {"batch_ids": batch_ids, "queued": sum(len(s) for s in by_provider.values()), "in_queue": in_queue,
+            "missing": missing}
+
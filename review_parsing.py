@@ -0,0 +1,121 @@
+import json
+import re
+from typing import List, Optional
+
+VERDICTS = ("OK", "FIX")
+
+# dopisywane do promptu review — model ma zwrócić wyłącznie JSON
+REVIEW_JSON_FORMAT = """Return ONLY a JSON object (no markdown, no comments) with exactly these keys:
+{
+  "verdict": "OK" or "FIX",
+  "issues": ["short description of each problem", ...],
+  "fixes": ["suggested fix for each problem", ...],
+  "confidence": integer 0-100
+}"""
+
+
+def _empty(fmt: str) -> dict:
+    return {"verdict": None, "issues": [], "fixes": [], "confidence": None, "format": fmt}
+
+
+def _as_list(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        value = [value]
+    if not isinstance(value, list):
+        return []
+    return [str(v).strip() for v in value if str(v).strip() and str(v).strip().lower() not in ("-", "...", "none", "brak")]
+
+
+def _as_confidence(value) -> Optional[int]:
+    try:
+        c = int(round(float(str(value).strip().rstrip("%"))))
+    except (TypeError, ValueError):
+        return None
+    return max(0, min(100, c))
+
+
+def _as_verdict(value) -> Optional[str]:
+    v = str(value or "").strip().upper()
+    return v if v in VERDICTS else None
+
+
+def parse_review_json(text: str) -> Optional[dict]:
+    """JSON z review (także w ```json``` albo z tekstem dookoła). None, gdy to nie jest poprawny obiekt review."""
+    if not text:
+        return None
+    candidate = text.strip()
+    fence = re.search(r"```(?:json)?\s*(\{.*?\})\s*```", candidate, re.S)
+    if fence:
+        candidate = fence.group(1)
+    elif not candidate.startswith("{"):
+        start, end = candidate.find("{"), candidate.rfind("}")
+        if start < 0 or end <= start:
+            return None
+        candidate = candidate[start:end + 1]
+    try:
+        data = json.loads(candidate)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    data = {str(k).lower(): v for k, v in data.items()}
+    verdict = _as_verdict(data.get("verdict"))
+    if verdict is None:
+        return None
+    return {
+        "verdict": verdict,
+        "issues": _as_list(data.get("issues")),
+        "fixes": _as_list(data.get("fixes") or data.get("suggested_fixes")),
+        "confidence": _as_confidence(data.get("confidence")),
+        "format": "json",
+    }
+
+
+_SECTION_RE = re.compile(r"^\s*(VERDICT|ISSUES|SUGGESTED FIXES|FIXES|CONFIDENCE)\s*:\s*(.*)$", re.I)
+
+
+def parse_review_text(text: str) -> dict:
+    """Parser starego formatu "VERDICT: OK / FIX ... CONFIDENCE: 0-100" (archiwa TXT)."""
+    out = _empty("text")
+    section = None
+    for line in (text or "").splitlines():
+        m = _SECTION_RE.match(line.replace("*", ""))
+        if m:
+            section, rest = m.group(1).upper(), m.group(2).strip()
+            if section == "VERDICT":
+                word = re.match(r"[A-Za-z]+", rest)
+                out["verdict"] = _as_verdict(word.group(0) if word else "")
+            elif section == "CONFIDENCE":
+                num = re.search(r"\d+", rest)
+                out["confidence"] = _as_confidence(num.group(0)) if num else None
+            elif rest:
+                (out["issues"] if section == "ISSUES" else out["fixes"]).extend(_as_list(rest.lstrip("-• ")))
+            continue
+        item = line.strip().lstrip("-•*").strip()
+        if section == "ISSUES":
+            out["issues"].extend(_as_list(item))
+        elif section in ("SUGGESTED FIXES", "FIXES"):
+            out["fixes"].extend(_as_list(item))
+    if out["verdict"] is None and out["confidence"] is None:
+        out["format"] = "unparsed"
+    return out
+
+
+def parse_review(text: str) -> dict:
+    """JSON (nowy format) → fallback: regex na tekście (stare archiwa)."""
+    return parse_review_json(text) or parse_review_text(text)
+
+
+def format_review(parsed: dict) -> str:
+    """Czytelny tekst w dotychczasowym formacie (UI + archiwum TXT)."""
+    issues = parsed.get("issues") or ["none"]
+    fixes = parsed.get("fixes") or ["none"]
+    confidence = parsed.get("confidence")
+    return (
+        f"VERDICT: {parsed.get('verdict') or '?'}\n"
+        "ISSUES:\n" + "\n".join(f"- {i}" for i in issues) + "\n"
+        "SUGGESTED FIXES:\n" + "\n".join(f"- {f}" for f in fixes) + "\n"
+        f"CONFIDENCE: {confidence if confidence is not None else '?'}"
+    )
@@ -0,0 +1,62 @@
+"""
+Adaptacyjne review: pełne review (Gemini Pro) dostają tłumaczenia, które nie przeszły lokalnego
+pre-checku (qa_checks) oraz losowa próbka; pozostałe są pomijane albo idą do tańszego modelu (flash).
+
+ENV:
+  REVIEW_POLICY       full (domyślnie — review zawsze) | adaptive
+  REVIEW_SAMPLE_RATE  odsetek czystych tłumaczeń, które i tak idą do pełnego review (0.2)
+  REVIEW_PASS_TIER    skip | light — co z czystymi tłumaczeniami spoza próbki (skip)
+  GEMINI_MODEL_REVIEW_LIGHT  model dla tier "light" (gemini-2.5-flash)
+"""
+import os
+import random
+from dataclasses import dataclass
+from typing import Optional, Tuple
+
+TIERS = ("full", "light", "skip")
+
+_rng = random.Random()
+
+
+@dataclass
+class ReviewPolicy:
+    mode: str = "full"
+    sample_rate: float = 0.2
+    pass_tier: str = "skip"
+    light_model: str = "gemini-2.5-flash"
+
+
+def current_review_policy() -> ReviewPolicy:
+    try:
+        sample_rate = float(os.environ.get("REVIEW_SAMPLE_RATE") or 0.2)
+    except ValueError:
+        sample_rate = 0.2
+    pass_tier = (os.environ.get("REVIEW_PASS_TIER") or "skip").lower().strip()
+    return ReviewPolicy(
+        mode=(os.environ.get("REVIEW_POLICY") or "full").lower().strip(),
+        sample_rate=max(0.0, min(1.0, sample_rate)),
+        pass_tier=pass_tier if pass_tier in ("skip", "light") else "skip",
+        light_model=os.environ.get("GEMINI_MODEL_REVIEW_LIGHT") or "gemini-2.5-flash",
+    )
+
+
+def decide_tier(precheck: dict, policy: Optional[ReviewPolicy] = None) -> Tuple[str, str]:
+    """Zwraca (tier, powód): full | light | skip."""
+    policy = policy or current_review_policy()
+    if policy.mode != "adaptive":
+        return "full", "policy"
+    if not precheck.get("passed"):
+        return "full", "precheck_failed"
+    if _rng.random() < policy.sample_rate:
+        return "full", "sample"
+    return policy.pass_tier, "precheck_passed"
+
+
+def tier_label(tier: str, reason: str, review_model: str, policy: Optional[ReviewPolicy] = None) -> str:
+    """Opis do archiwum (REVIEW_MODEL) i UI."""
+    policy = policy or current_review_policy()
+    if tier == "skip":
+        return "— (pominięte: QA OK)"
+    if tier == "light":
+        return f"{policy.light_model} (light)"
+    return review_model if reason == "policy" else f"{review_model} ({reason})"
@@ -0,0 +1,60 @@
+"""
+Single-flight: współbieżne identyczne wywołania (ten sam klucz) dzielą jedno wykonanie.
+Pierwszy wątek (lider) wykonuje fn, pozostali czekają i dostają jego wynik albo jego wyjątek.
+Po zakończeniu klucz jest zwalniany — to nie jest cache (od tego jest llm_cache).
+
+Zasięg: jeden proces (wszystkie sesje Streamlit i wątki jobs.py); procesy worker_pool mają własne.
+"""
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Zwraca (wynik, czy_współdzielony). Wyjątek lidera trafia do wszystkich czekających."""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+            else:
+                flight.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._flights.pop(key, None)
+            flight.done.set()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"leaders": self.leaders, "coalesced": self.coalesced, "in_flight": len(self._flights)}
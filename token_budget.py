@@ -0,0 +1,221 @@
+"""
+Budżet tokenów dla wywołań LLM: liczenie/estymacja tokenów per provider/model, limity promptu
+(system/user) zamiast limitów znakowych, dobór glossary i kawałków tekstu do budżetu oraz max_tokens
+dla odpowiedzi.
+
+Liczenie: tiktoken (jeśli zainstalowany) dla modeli OpenAI; w pozostałych przypadkach estymacja
+wg pisma — ~4 znaki ASCII na token, ~2 znaki dla łacinki z diakrytykami, greki i cyrylicy,
+1 znak dla CJK. Estymacja celowo zawyża (tekst grecki liczony jak łaciński był przycinany za późno,
+a polski za wcześnie).
+
+ENV:
+  LLM_TOKENIZER            auto (tiktoken, gdy dostępny) | heuristic
+  LLM_SYSTEM_MAX_TOKENS    budżet prefiksu system (instrukcje + glossary + kontekst), 16000
+  LLM_USER_MAX_TOKENS      budżet części user (tekst do tłumaczenia / review), 8000
+  LLM_GLOSSARY_MAX_TOKENS  budżet samego glossary w prompcie, 12000
+  LLM_MAX_OUTPUT_TOKENS    górny limit max_tokens odpowiedzi (limit modelu i tak obowiązuje), 8192
+  LLM_REVIEW_MAX_TOKENS    max_tokens dla review (JSON), 2048
+  LLM_CONTEXT_TOKENS       nadpisuje okno kontekstu modelu
+"""
+import math
+import os
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Tuple
+
+# prefiks nazwy modelu → (okno kontekstu, max output); pierwszy pasujący wygrywa
+MODEL_LIMITS = [
+    ("gpt-4.1", (1_047_576, 32_768)),
+    ("gpt-4o", (128_000, 16_384)),
+    ("gpt-5", (400_000, 128_000)),
+    ("qwen-turbo", (1_000_000, 8_192)),
+    ("qwen-plus", (131_072, 8_192)),
+    ("qwen-max", (32_768, 8_192)),
+    ("gemini-2.5", (1_048_576, 65_536)),
+    ("gemini-2.0", (1_048_576, 8_192)),
+    ("gemini-1.5", (1_048_576, 8_192)),
+    ("mock", (32_768, 4_096)),
+]
+DEFAULT_LIMITS = (32_768, 4_096)
+
+# ile tokenów odpowiedzi na token polskiego źródła (długość tekstu + pismo docelowe)
+OUTPUT_RATIO = {"el": 2.0, "hu": 1.5, "fi": 1.5, "de": 1.4, "nl": 1.4, "lt": 1.4}
+DEFAULT_OUTPUT_RATIO = 1.3
+# modele "thinking" liczą rozumowanie do limitu outputu
+THINKING_ALLOWANCE = {"gemini-2.5": 4096}
+
+_WIDE_RE = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uf900-\ufaff]")
+_TRUNCATED_NOTE = "\n\n[...truncated due to length...]\n"
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+def model_limits(model: Optional[str]) -> Tuple[int, int]:
+    """(okno kontekstu, max output) dla modelu."""
+    name = (model or "").lower()
+    context, max_out = next((limits for prefix, limits in MODEL_LIMITS if name.startswith(prefix)), DEFAULT_LIMITS)
+    return _env_int("LLM_CONTEXT_TOKENS", context), max_out
+
+
+@lru_cache(maxsize=16)
+def _tiktoken_encoding(model: str):
+    if (os.environ.get("LLM_TOKENIZER") or "auto").lower().strip() == "heuristic":
+        return None
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        # brak pliku BPE offline itp. — zostaje estymacja
+        return None
+
+
+def _encoding_for(provider: Optional[str], model: Optional[str]):
+    # tiktoken zna tylko tokenizery OpenAI; Qwen/Gemini mają własne → estymacja
+    if (provider or "").lower() != "openai" or not model:
+        return None
+    return _tiktoken_encoding(model)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estymacja wg pisma (bez tokenizera)."""
+    if not text:
+        return 0
+    n = len(text)
+    n_ascii = len(text.encode("ascii", "ignore"))
+    if n_ascii == n:
+        return math.ceil(n / 4)
+    n_wide = len(_WIDE_RE.findall(text))
+    return math.ceil(n_ascii / 4 + (n - n_ascii - n_wide) / 2 + n_wide)
+
+
+def count_tokens(text: str, provider: Optional[str] = None, model: Optional[str] = None) -> int:
+    if not text:
+        return 0
+    enc = _encoding_for(provider, model)
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def tokenizer_name(provider: Optional[str] = None, model: Optional[str] = None) -> str:
+    enc = _encoding_for(provider, model)
+    return f"tiktoken:{enc.name}" if enc is not None else "heuristic"
+
+
+@dataclass
+class PromptBudget:
+    system_tokens: int
+    user_tokens: int
+    context_tokens: int
+    max_output_tokens: int
+
+
+def prompt_budget(provider: Optional[str] = None, model: Optional[str] = None) -> PromptBudget:
+    context, max_out = model_limits(model)
+    max_out = min(max_out, _env_int("LLM_MAX_OUTPUT_TOKENS", 8192))
+    system = _env_int("LLM_SYSTEM_MAX_TOKENS", 16000)
+    user = _env_int("LLM_USER_MAX_TOKENS", 8000)
+    # małe okno (np. qwen-max, mock): prompt + odpowiedź muszą się zmieścić, dzielimy proporcjonalnie
+    room = context - max_out
+    if system + user > room > 0:
+        system, user = room * system // (system + user), room * user // (system + user)
+    return PromptBudget(system, user, context, max_out)
+
+
+def glossary_budget(provider: Optional[str] = None, model: Optional[str] = None) -> int:
+    """Budżet glossary w prefiksie system — zostawia miejsce na instrukcje i kontekst."""
+    return min(_env_int("LLM_GLOSSARY_MAX_TOKENS", 12000), prompt_budget(provider, model).system_tokens * 3 // 4)
+
+
+def clip_to_tokens(text: str, max_tokens: int, provider: Optional[str] = None,
+                   model: Optional[str] = None) -> Tuple[str, bool]:
+    """Przycina tekst do max_tokens (z notką o przycięciu). Zwraca (tekst, czy_przycięty)."""
+    if not text or count_tokens(text, provider, model) <= max_tokens:
+        return text, False
+    note_tokens = estimate_tokens(_TRUNCATED_NOTE)
+    lo, hi = 0, len(text)
+    # wyszukiwanie binarne po długości w znakach (tokeny rosną monotonicznie z prefiksem)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if count_tokens(text[:mid], provider, model) + note_tokens <= max_tokens:
+            lo = mid
+        else:
+            hi = mid - 1
+    return text[:lo] + _TRUNCATED_NOTE, True
+
+
+def fit_lines(lines: List[str], max_tokens: int, provider: Optional[str] = None,
+              model: Optional[str] = None) -> List[str]:
+    """Najdłuższy prefiks listy linii (w podanej kolejności priorytetu), który mieści się w budżecie."""
+    kept, used = [], 0
+    for line in lines:
+        cost = count_tokens(line, provider, model) + 1  # +1 za znak nowej linii
+        if used + cost > max_tokens:
+            break
+        kept.append(line)
+        used += cost
+    return kept
+
+
+def split_to_budget(text: str, max_tokens: int, provider: Optional[str] = None,
+                    model: Optional[str] = None) -> List[str]:
+    """
+    Dzieli tekst na kawałki mieszczące się w max_tokens — po akapitach, a za długie akapity po zdaniach.
+    Tekst mieszczący się w budżecie zwracany jest jako jeden kawałek.
+    """
+    if count_tokens(text, provider, model) <= max_tokens:
+        return [text]
+    max_tokens = max(max_tokens, 32)
+
+    # (fragment, separator przed nim): akapity łączymy pustą linią, zdania spacją
+    pieces: List[Tuple[str, str]] = []
+    for para in re.split(r"\n\s*\n", text):
+        sep = "\n\n"
+        for sentence in [para] if count_tokens(para, provider, model) <= max_tokens else re.split(r"(?<=[.!?])\s+", para):
+            while count_tokens(sentence, provider, model) > max_tokens:
+                head, _ = clip_to_tokens(sentence, max_tokens, provider, model)
+                head = head[: -len(_TRUNCATED_NOTE)] or sentence[:1]
+                pieces.append((head, sep))
+                sentence, sep = sentence[len(head):], ""
+            pieces.append((sentence, sep))
+            sep = " "
+
+    chunks, current, used = [], "", 0
+    for piece, sep in pieces:
+        cost = count_tokens(piece, provider, model) + 1
+        if current and used + cost > max_tokens:
+            chunks.append(current)
+            current, used = "", 0
+        current = current + sep + piece if current else piece
+        used += cost
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def output_budget(provider: Optional[str], model: Optional[str], purpose: str,
+                  lang: Optional[str], user_text: str) -> int:
+    """
+    max_tokens odpowiedzi: review → stały limit na JSON; tłumaczenie → tokeny źródła × współczynnik
+    języka docelowego z zapasem; dla modeli "thinking" doliczany jest budżet rozumowania.
+    """
+    _, max_out = model_limits(model)
+    if purpose.endswith("review"):  # review / batch_review
+        wanted = _env_int("LLM_REVIEW_MAX_TOKENS", 2048)
+    else:
+        source_tokens = estimate_tokens(user_text)
+        wanted = int(source_tokens * OUTPUT_RATIO.get(lang or "", DEFAULT_OUTPUT_RATIO) * 1.25) + 256
+    name = (model or "").lower()
+    wanted += next((extra for prefix, extra in THINKING_ALLOWANCE.items() if name.startswith(prefix)), 0)
+    return max(256, min(wanted, max_out, _env_int("LLM_MAX_OUTPUT_TOKENS", 8192)))
@@ -0,0 +1,274 @@
+import os
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional, Tuple
+
+import pandas as pd
+
+from common import load_glossary, matched_terms, term_matches
+from llm_providers import chat_llm_detailed, default_model, review_llm, review_provider
+from llm_router import record_quality
+from profiling import span
+from qa_checks import validate
+from review_parsing import REVIEW_JSON_FORMAT, format_review, parse_review
+from review_policy import current_review_policy, decide_tier, tier_label
+from token_budget import count_tokens, fit_lines, glossary_budget, prompt_budget, split_to_budget
+
+
+SYSTEM_TRANSLATE = "You are a professional translator. Translate precisely. Output plain text only."
+SYSTEM_REVIEW = "You are a senior linguistic reviewer."
+
+
+@contextmanager
+def stage(timings: Optional[Dict[str, float]], name: str):
+    """Mierzy czas etapu (ms) do słownika timings; timings=None = bez pomiaru. Etap jest też spanem profiling."""
+    with span(name):
+        if timings is None:
+            yield
+            return
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            timings[name] = timings.get(name, 0.0) + (time.perf_counter() - started) * 1000
+
+
+def load_glossary_df(lang_code: str) -> pd.DataFrame:
+    """Glossary języka do promptu — tylko wpisy z uzupełnionym term_target (cache w common.load_glossary)."""
+    df = load_glossary(lang_code)
+    return df[df["term_target"].str.len() > 0].reset_index(drop=True)
+
+
+def filter_glossary_for_source(df: pd.DataFrame, source_text: str) -> pd.DataFrame:
+    if df.empty:
+        return df
+    src = (source_text or "").lower()
+
+    mask_locked = df["locked"] == True
+    mask_appears = df["term_pl"].apply(lambda term: term_matches(term, src))
+
+    filtered = df[mask_locked | mask_appears].copy()
+    # kolejność = priorytet przy przycinaniu do budżetu: locked z tekstu, pozostałe z tekstu, locked spoza tekstu
+    filtered["__prio"] = (~mask_appears[filtered.index]).astype(int) * 2 + (~mask_locked[filtered.index]).astype(int)
+    filtered = filtered.sort_values(["__prio", "term_pl"]).drop(columns=["__prio"]).reset_index(drop=True)
+    return filtered
+
+
+def _glossary_lines(df: pd.DataFrame) -> list:
+    return [f"- {pl} => {target}" for pl, target in zip(df["term_pl"], df["term_target"])]
+
+
+def glossary_to_text(df: pd.DataFrame) -> str:
+    if df.empty:
+        return ""
+    return "\n".join(_glossary_lines(df))
+
+
+def fit_glossary_block(df: pd.DataFrame, provider: Optional[str] = None, model: Optional[str] = None) -> str:
+    """Glossary jako tekst przycięty do budżetu tokenów (token_budget) — kolejność df to priorytet."""
+    if df.empty:
+        return ""
+    return "\n".join(fit_lines(_glossary_lines(df), glossary_budget(provider, model), provider, model))
+
+
+# PROMPT_GLOSSARY_SCOPE=language: całe glossary języka w stałym prefiksie (prompt caching);
+# source: tylko terminy występujące w tekście (krótszy prompt, ale inny dla każdego tekstu).
+# Powyżej PROMPT_PREFIX_MAX_TERMS terminów albo budżetu tokenów glossary wracamy do filtrowania per tekst.
+PROMPT_PREFIX_MAX_TERMS = int(os.environ.get("PROMPT_PREFIX_MAX_TERMS") or 1500)
+
+
+def prompt_glossary_scope() -> str:
+    return (os.environ.get("PROMPT_GLOSSARY_SCOPE") or "language").lower().strip()
+
+
+def sort_glossary(df: pd.DataFrame) -> pd.DataFrame:
+    """Deterministyczna kolejność (locked najpierw, potem alfabetycznie) — stabilny tekst glossary."""
+    if df.empty:
+        return df
+    out = df.copy()
+    out["__prio"] = out["locked"].apply(lambda x: 0 if x else 1)
+    return out.sort_values(["__prio", "term_pl"], kind="stable").drop(columns=["__prio"]).reset_index(drop=True)
+
+
+def prompt_glossary_block(
+    gdf_all: pd.DataFrame, gdf_filtered: pd.DataFrame, provider: Optional[str] = None, model: Optional[str] = None
+) -> str:
+    """
+    Glossary do promptu tłumaczenia: całe (stałe per język i wersja glossary), jeśli mieści się w budżecie
+    tokenów, w przeciwnym razie przefiltrowane i przycięte do budżetu.
+    """
+    if prompt_glossary_scope() == "language" and len(gdf_all) <= PROMPT_PREFIX_MAX_TERMS:
+        full = glossary_to_text(sort_glossary(gdf_all))
+        if count_tokens(full, provider, model) <= glossary_budget(provider, model):
+            return full
+    return fit_glossary_block(gdf_filtered, provider, model)
+
+
+def build_translate_prefix(glossary_block: str, label: str, context: str) -> str:
+    """
+    Stały prefiks (system): instrukcje + język + glossary + kontekst. Nie zawiera tekstu źródłowego,
+    więc jest bajtowo identyczny dla wszystkich tekstów danego języka → OpenAI prefix caching,
+    Gemini implicit / explicit context caching.
+    """
+    return f"""
+{SYSTEM_TRANSLATE}
+
+Target language: {label}
+
+Rules:
+- Output plain text only (no HTML)
+- Preserve structure NAME/BODY
+- Use mandatory terminology when applicable
+- Keep numbers/units consistent
+- Do not add explanations
+
+Mandatory terminology:
+{glossary_block if glossary_block else "None"}
+
+Context:
+{context.strip() if (context or "").strip() else "None"}
+""".strip()
+
+
+# "Translate:\n\n" przed tekstem w części user
+_TRANSLATE_USER_OVERHEAD_TOKENS = 16
+
+
+def build_translate_messages(source_text: str, glossary_block: str, label: str, context: str) -> list:
+    """[system: stały prefiks, user: tylko tekst do tłumaczenia] — zmienna część zawsze na końcu."""
+    return [
+        {"role": "system", "content": build_translate_prefix(glossary_block, label, context)},
+        {"role": "user", "content": f"Translate:\n\n{source_text}"},
+    ]
+
+
+REVIEW_INSTRUCTIONS = f"""
+{SYSTEM_REVIEW}
+
+Compare translation quality objectively. Mandatory terminology must be respected.
+
+{REVIEW_JSON_FORMAT}
+""".strip()
+
+
+def build_review_prompt(source_text: str, translation: str, provider_name: str, glossary_block: str) -> str:
+    return f"""
+Mandatory terminology (must be respected):
+{glossary_block if glossary_block else "None"}
+
+SOURCE:
+{source_text}
+
+TRANSLATION ({provider_name}):
+{translation}
+""".strip()
+
+
+def build_review_messages(source_text: str, translation: str, provider_name: str, glossary_block: str) -> list:
+    # instrukcje + format JSON są wspólne dla wszystkich review (prefiks), dane w wiadomości user
+    return [
+        {"role": "system", "content": REVIEW_INSTRUCTIONS},
+        {"role": "user", "content": build_review_prompt(source_text, translation, provider_name, glossary_block)},
+    ]
+
+
+def run_review(
+    source: str,
+    translation: str,
+    provider_name: str,
+    glossary_block: str,
+    lang: Optional[str] = None,
+    model_hint: Optional[str] = None,
+) -> Tuple[str, dict]:
+    """
+    Review w trybie JSON. Zwraca (tekst do wyświetlenia/archiwum, sparsowane pola).
+    Gdy model nie odda poprawnego JSON, parser próbuje starego formatu tekstowego.
+    """
+    raw = review_llm(
+        temperature=0.1,
+        model_hint=model_hint,
+        lang=lang,
+        json_mode=True,
+        messages=build_review_messages(source, translation, provider_name, glossary_block),
+    )
+    parsed = parse_review(raw)
+    return (format_review(parsed) if parsed["verdict"] else raw), parsed
+
+
+def translate_and_review(
+    source: str,
+    lang: str,
+    label: str,
+    provider: str,
+    context: str = "",
+    temperature: float = 0.2,
+    review: bool = True,
+    glossary_df: Optional[pd.DataFrame] = None,
+    timings: Optional[Dict[str, float]] = None,
+) -> dict:
+    """
+    Pełny pipeline dla jednego źródła: glossary → filtr terminów → prompt → tłumaczenie → lokalny QA (qa_checks) → review.
+    glossary_df można podać z zewnątrz (np. wczytane raz dla wielu tekstów).
+    timings: słownik, do którego trafiają czasy etapów w ms.
+    Review wg review_policy (REVIEW_POLICY=adaptive: czyste tłumaczenia tylko w próbce / tańszym modelem).
+    Tekst dłuższy niż budżet user (token_budget) jest tłumaczony kawałkami po akapitach z tym samym prefiksem.
+    """
+    model = default_model(provider)
+    with stage(timings, "glossary_load"):
+        gdf_all = glossary_df if glossary_df is not None else load_glossary_df(lang)
+    with stage(timings, "term_filter"):
+        gdf_filtered = filter_glossary_for_source(gdf_all, source)
+    with stage(timings, "prompt_build"):
+        glossary_block = fit_glossary_block(gdf_filtered, provider, model)
+        prefix_glossary = prompt_glossary_block(gdf_all, gdf_filtered, provider, model)
+        user_budget = prompt_budget(provider, model).user_tokens - _TRANSLATE_USER_OVERHEAD_TOKENS
+        chunks = split_to_budget(source, user_budget, provider, model)
+
+    with stage(timings, "translate_call"):
+        parts = []
+        provider_used = provider
+        for chunk in chunks:
+            text, rec = chat_llm_detailed(
+                provider_used,
+                temperature=temperature,
+                lang=lang,
+                messages=build_translate_messages(chunk, prefix_glossary, label, context),
+            )
+            # "auto": kolejne kawałki do providera wybranego dla pierwszego
+            provider_used = rec["provider"]
+            parts.append(text)
+        translated = "\n\n".join(parts)
+
+    with stage(timings, "precheck"):
+        qa = validate(source, translated, gdf_filtered, lang)
+
+    review_text, review_parsed, review_tier, review_model = "", None, "none", "—"
+    if review:
+        policy = current_review_policy()
+        review_tier, reason = decide_tier(qa, policy)
+        model_hint = None
+        if review_tier == "light" and review_provider() == "gemini":
+            model_hint = policy.light_model
+        review_model = tier_label(review_tier, reason, review_provider(), policy)
+        if review_tier != "skip":
+            with stage(timings, "review_call"):
+                review_text, review_parsed = run_review(
+                    source, translated, provider_used, glossary_block, lang=lang, model_hint=model_hint
+                )
+            record_quality(lang, provider_used, review_parsed["verdict"], review_parsed["confidence"])
+
+    return {
+        "source": source,
+        "provider": provider_used,
+        "translation": translated,
+        "review": review_text,
+        "review_parsed": review_parsed,
+        "review_tier": review_tier,
+        "review_model": review_model,
+        "qa": qa,
+        "glossary_used": gdf_filtered,
+        "glossary_all_count": int(len(gdf_all)),
+        # do indeksu termin → tłumaczenia w archiwum (ponowne tłumaczenie po zmianie glossary)
+        "matched_terms": matched_terms(source, gdf_all["term_pl"]) if not gdf_all.empty else [],
+        "chunks": len(chunks),
+    }
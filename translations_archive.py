@@ -0,0 +1,524 @@
+import csv
+import json
+import os
+import sqlite3
+import sys
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import archive_segments
+from common import matched_terms
+from profiling import span
+from qa_checks import format_qa, parse_qa
+from review_parsing import parse_review
+
+BASE_DIR = os.path.join("data", "translations")
+INDEX_COLS = ["datetime", "title_pl", "filename", "provider"]
+
+# indeks z polami review (verdict / confidence) — zapytania dla Archive / Monitoring / batch
+ARCHIVE_DB = os.path.join(BASE_DIR, "archive.db")
+
+# segments (domyślnie) — rekordy w skompresowanych segmentach (archive_segments); txt — plik na tłumaczenie
+STORAGE = (os.environ.get("ARCHIVE_STORAGE") or "segments").lower().strip()
+
+_lock = threading.Lock()
+
+
+def index_path(lang_code: str) -> str:
+    return os.path.join(BASE_DIR, f"index_{lang_code}.csv")
+
+
+def connect_db() -> sqlite3.Connection:
+    os.makedirs(BASE_DIR, exist_ok=True)
+    conn = sqlite3.connect(ARCHIVE_DB, timeout=30)
+    conn.row_factory = sqlite3.Row
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS translations ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT, lang TEXT NOT NULL, filename TEXT NOT NULL,"
+        " datetime TEXT NOT NULL, title_pl TEXT, provider TEXT, review_model TEXT,"
+        " verdict TEXT, confidence INTEGER, issues_count INTEGER, issues_json TEXT, fixes_json TEXT,"
+        " review_format TEXT, UNIQUE (lang, filename))"
+    )
+    # kolumny dodane później — starsze bazy uzupełniamy w miejscu
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(translations)")}
+    for name, decl in (("qa_passed", "INTEGER"), ("qa_issues_json", "TEXT"), ("segment", "TEXT"),
+                       ("seg_offset", "INTEGER"), ("seg_length", "INTEGER"), ("superseded_by", "TEXT")):
+        if name not in cols:
+            conn.execute(f"ALTER TABLE translations ADD COLUMN {name} {decl}")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tr_lang_dt ON translations(lang, datetime)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tr_lang_verdict ON translations(lang, verdict)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tr_verdict_conf ON translations(verdict, confidence)")
+    # odwrócony indeks termin glossary (lower) → tłumaczenia, których źródło go zawiera
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS translation_terms (lang TEXT NOT NULL, term_pl TEXT NOT NULL,"
+        " filename TEXT NOT NULL, PRIMARY KEY (lang, term_pl, filename)) WITHOUT ROWID"
+    )
+    # terminy dopasowane już do całego archiwum języka (nowsze rekordy dostają je przy zapisie)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS term_scans (lang TEXT NOT NULL, term_pl TEXT NOT NULL,"
+        " PRIMARY KEY (lang, term_pl)) WITHOUT ROWID"
+    )
+    # tłumaczenia do ponownego wykonania po zmianie glossary (retranslation.py)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS pending_retranslation (lang TEXT NOT NULL, filename TEXT NOT NULL,"
+        " terms TEXT NOT NULL, created TEXT NOT NULL, PRIMARY KEY (lang, filename))"
+    )
+    return conn
+
+
+def _index_row(conn, lang_code: str, filename: str, dt: str, title_pl: str, provider: str,
+               review_model: str, review_parsed: dict, qa: Optional[dict] = None,
+               location: Optional[Tuple[str, int, int]] = None) -> None:
+    """location: (segment, offset, długość) rekordu w segmencie; None = plik TXT (istniejąca lokalizacja zostaje)."""
+    segment, seg_offset, seg_length = location or (None, None, None)
+    conn.execute(
+        "INSERT INTO translations (lang, filename, datetime, title_pl, provider, review_model, verdict, confidence,"
+        " issues_count, issues_json, fixes_json, review_format, qa_passed, qa_issues_json,"
+        " segment, seg_offset, seg_length)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+        " ON CONFLICT(lang, filename) DO UPDATE SET datetime = excluded.datetime, title_pl = excluded.title_pl,"
+        " provider = excluded.provider, review_model = excluded.review_model, verdict = excluded.verdict,"
+        " confidence = excluded.confidence, issues_count = excluded.issues_count, issues_json = excluded.issues_json,"
+        " fixes_json = excluded.fixes_json, review_format = excluded.review_format,"
+        " qa_passed = excluded.qa_passed, qa_issues_json = excluded.qa_issues_json,"
+        " segment = COALESCE(excluded.segment, segment), seg_offset = COALESCE(excluded.seg_offset, seg_offset),"
+        " seg_length = COALESCE(excluded.seg_length, seg_length)",
+        (
+            lang_code, filename, dt, title_pl, provider, review_model,
+            review_parsed.get("verdict"), review_parsed.get("confidence"), len(review_parsed.get("issues") or []),
+            json.dumps(review_parsed.get("issues") or [], ensure_ascii=False),
+            json.dumps(review_parsed.get("fixes") or [], ensure_ascii=False),
+            review_parsed.get("format"),
+            None if qa is None else int(bool(qa.get("passed"))),
+            None if qa is None else json.dumps(qa.get("issues") or [], ensure_ascii=False),
+            segment, seg_offset, seg_length,
+        ),
+    )
+
+
+def _create_txt(lang_dir: str, ts: str, text: str) -> str:
+    # kilka zapisów w tej samej sekundzie (batch, worker_pool) — dopisujemy sufiks;
+    # tryb "x" jest atomowy także między procesami
+    filename = f"{ts}.txt"
+    n = 1
+    while True:
+        try:
+            f = open(os.path.join(lang_dir, filename), "x", encoding="utf-8")
+            break
+        except FileExistsError:
+            n += 1
+            filename = f"{ts}_{n}.txt"
+    with f:
+        f.write(text)
+    return filename
+
+
+def _name_taken(conn, lang_code: str, filename: str) -> bool:
+    return bool(
+        conn.execute("SELECT 1 FROM translations WHERE lang = ? AND filename = ?", (lang_code, filename)).fetchone()
+        or os.path.exists(os.path.join(BASE_DIR, lang_code, filename))
+    )
+
+
+def _supersede(conn, lang_code: str, old: str, new: str) -> None:
+    conn.execute("UPDATE translations SET superseded_by = ? WHERE lang = ? AND filename = ?", (new, lang_code, old))
+    conn.execute("DELETE FROM translation_terms WHERE lang = ? AND filename = ?", (lang_code, old))
+    conn.execute("DELETE FROM pending_retranslation WHERE lang = ? AND filename = ?", (lang_code, old))
+
+
+def save_translation(
+    lang_code: str,
+    lang_label: str,
+    provider: str,
+    source: str,
+    translated: str,
+    review: str,
+    title_pl: str = "",
+    review_model: str = "gemini",
+    now: Optional[datetime] = None,
+    review_parsed: Optional[dict] = None,
+    qa: Optional[dict] = None,
+    terms: Optional[List[str]] = None,
+    replaces: Optional[str] = None,
+) -> str:
+    """
+    Zapisuje tłumaczenie (rekord TXT) w segmencie data/translations/{lang}/seg-*.zseg albo — przy
+    ARCHIVE_STORAGE=txt — jako osobny plik, dopisuje wiersz do index_{lang}.csv i do indeksu archive.db.
+    Zwraca nazwę pliku (klucz rekordu; pobieranie przez read_archive_text).
+    qa: wynik qa_checks.validate — dopisywany jako sekcja QA w TXT i kolumny w indeksie.
+    terms: terminy glossary występujące w źródle (common.matched_terms) — indeks termin → tłumaczenia.
+    replaces: filename rekordu, który to tłumaczenie zastępuje (ponowne tłumaczenie po zmianie glossary) —
+    stary rekord zostaje w archiwum jako superseded_by, ale znika z indeksu terminów i oczekujących.
+    """
+    now = now or datetime.now()
+    ts = now.strftime("%Y%m%d_%H%M%S")
+    dt = now.strftime("%Y-%m-%d %H:%M:%S")
+    lang_dir = os.path.join(BASE_DIR, lang_code)
+    if review_parsed is None:
+        review_parsed = parse_review(review)
+
+    text = (
+        f"DATE: {now}\nLANGUAGE: {lang_label}\nTRANSLATE_MODEL: {provider}\nREVIEW_MODEL: {review_model}\n\n"
+        f"SOURCE:\n{source}\n\nTRANSLATION:\n{translated}\n\nREVIEW:\n{review}"
+        + (f"\n\n{format_qa(qa)}" if qa else "")
+    )
+
+    with span("archive_write"), _lock:
+        os.makedirs(lang_dir, exist_ok=True)
+        conn = connect_db()
+        try:
+            if STORAGE == "txt":
+                filename = _create_txt(lang_dir, ts, text)
+                location = None
+            else:
+                # blokada zapisu bazy (także między procesami worker_pool) chroni dopisywanie do segmentu
+                conn.execute("BEGIN IMMEDIATE")
+                filename = f"{ts}.txt"
+                n = 1
+                while _name_taken(conn, lang_code, filename):
+                    n += 1
+                    filename = f"{ts}_{n}.txt"
+                location = archive_segments.append(lang_dir, {"lang": lang_code, "filename": filename}, text)
+
+            _index_row(conn, lang_code, filename, dt, title_pl, provider, review_model, review_parsed, qa, location)
+            if terms:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO translation_terms (lang, term_pl, filename) VALUES (?, ?, ?)",
+                    [(lang_code, t, filename) for t in terms],
+                )
+            if replaces:
+                _supersede(conn, lang_code, replaces, filename)
+            conn.commit()
+        finally:
+            conn.close()
+
+        ip = index_path(lang_code)
+        new_file = not os.path.exists(ip)
+        with open(ip, "a", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            if new_file:
+                writer.writerow(INDEX_COLS)
+            writer.writerow([dt, title_pl, filename, provider])
+
+    return filename
+
+
+def parse_archive_txt(text: str) -> dict:
+    """Rozbiera plik TXT archiwum na nagłówek i sekcje SOURCE / TRANSLATION / REVIEW / QA."""
+    head, _, rest = text.partition("\n\nSOURCE:\n")
+    header = {}
+    for line in head.splitlines():
+        key, sep, value = line.partition(": ")
+        if sep:
+            header[key.strip()] = value.strip()
+    source, _, rest = rest.partition("\n\nTRANSLATION:\n")
+    translation, _, review = rest.partition("\n\nREVIEW:\n")
+    review, qa_sep, qa_text = review.partition("\n\nQA: ")
+    title = ""
+    if source.startswith("NAME:\n"):
+        title = source[len("NAME:\n"):].split("\n\nBODY:", 1)[0].strip()
+    return {
+        "date": header.get("DATE", ""),
+        "language": header.get("LANGUAGE", ""),
+        "provider": header.get("TRANSLATE_MODEL", ""),
+        "review_model": header.get("REVIEW_MODEL", ""),
+        "title_pl": title,
+        "source": source,
+        "translation": translation,
+        "review": review,
+        "qa": parse_qa("QA: " + qa_text) if qa_sep else None,
+    }
+
+
+def _index_text(conn, lang_code: str, filename: str, text: str, fallback_dt: str,
+                location: Optional[Tuple[str, int, int]] = None) -> None:
+    rec = parse_archive_txt(text)
+    _index_row(conn, lang_code, filename, rec["date"][:19] or fallback_dt, rec["title_pl"], rec["provider"],
+               rec["review_model"], parse_review(rec["review"]), rec["qa"], location)
+
+
+def reindex(lang_codes: Optional[List[str]] = None) -> int:
+    """
+    Odbudowuje archive.db z segmentów i plików TXT (także starych, sprzed indeksu) — review parsowane
+    parserem regex ze starego formatu tekstowego. Zwraca liczbę zaindeksowanych rekordów.
+    """
+    if not os.path.isdir(BASE_DIR):
+        return 0
+    langs = lang_codes or sorted(d for d in os.listdir(BASE_DIR) if os.path.isdir(os.path.join(BASE_DIR, d)))
+    count = 0
+    with _lock:
+        conn = connect_db()
+        try:
+            for lang_code in langs:
+                lang_dir = os.path.join(BASE_DIR, lang_code)
+                if not os.path.isdir(lang_dir):
+                    continue
+                for segment in archive_segments.list_segments(lang_dir):
+                    path = os.path.join(lang_dir, segment)
+                    mtime = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M:%S")
+                    for offset, length, meta, text in archive_segments.iter_records(path):
+                        _index_text(conn, lang_code, meta["filename"], text, mtime, (segment, offset, length))
+                        count += 1
+                for filename in sorted(os.listdir(lang_dir)):
+                    if not filename.endswith(".txt"):
+                        continue
+                    path = os.path.join(lang_dir, filename)
+                    with open(path, "r", encoding="utf-8", errors="replace") as f:
+                        text = f.read()
+                    mtime = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M:%S")
+                    _index_text(conn, lang_code, filename, text, mtime)
+                    count += 1
+            conn.commit()
+        finally:
+            conn.close()
+    return count
+
+
+def compact(lang_codes: Optional[List[str]] = None, batch: int = 500) -> int:
+    """
+    Migracja: pliki TXT → segmenty (rekord + lokalizacja w indeksie), potem usunięcie TXT.
+    Partie po `batch` plików w jednej transakcji; TXT znikają dopiero po commicie. Zwraca liczbę plików.
+    """
+    if not os.path.isdir(BASE_DIR):
+        return 0
+    langs = lang_codes or sorted(d for d in os.listdir(BASE_DIR) if os.path.isdir(os.path.join(BASE_DIR, d)))
+    count = 0
+    for lang_code in langs:
+        lang_dir = os.path.join(BASE_DIR, lang_code)
+        if not os.path.isdir(lang_dir):
+            continue
+        files = sorted(f for f in os.listdir(lang_dir) if f.endswith(".txt"))
+        for i in range(0, len(files), batch):
+            done = []
+            with _lock:
+                conn = connect_db()
+                try:
+                    conn.execute("BEGIN IMMEDIATE")
+                    for filename in files[i:i + batch]:
+                        path = os.path.join(lang_dir, filename)
+                        with open(path, "r", encoding="utf-8", errors="replace") as f:
+                            text = f.read()
+                        location = archive_segments.append(lang_dir, {"lang": lang_code, "filename": filename}, text)
+                        mtime = datetime.fromtimestamp(os.path.getmtime(path)).strftime("%Y-%m-%d %H:%M:%S")
+                        _index_text(conn, lang_code, filename, text, mtime, location)
+                        done.append(path)
+                    conn.commit()
+                finally:
+                    conn.close()
+            for path in done:
+                os.remove(path)
+            count += len(done)
+    return count
+
+
+def iter_archive_records(lang_code: str) -> Iterator[Tuple[str, str]]:
+    """(filename, treść TXT) wszystkich rekordów języka — sekwencyjnie po segmentach, potem pliki TXT."""
+    lang_dir = os.path.join(BASE_DIR, lang_code)
+    if not os.path.isdir(lang_dir):
+        return
+    for segment in archive_segments.list_segments(lang_dir):
+        for _, _, meta, text in archive_segments.iter_records(os.path.join(lang_dir, segment)):
+            yield meta["filename"], text
+    for filename in sorted(os.listdir(lang_dir)):
+        if filename.endswith(".txt"):
+            with open(os.path.join(lang_dir, filename), "r", encoding="utf-8", errors="replace") as f:
+                yield filename, f.read()
+
+
+def _chunks(items: list, size: int = 500) -> Iterator[list]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def translations_for_terms(lang_code: str, terms: List[str]) -> Dict[str, List[str]]:
+    """
+    Tłumaczenia języka, których źródło zawiera któryś z terminów: {filename: [terminy]}.
+    Terminy jeszcze niedopasowane do całego archiwum (np. dodane do glossary po części tłumaczeń)
+    są najpierw dopasowane jednym przebiegiem po segmentach; potem wystarcza sam indeks.
+    """
+    terms = sorted({t.strip().lower() for t in terms if t and t.strip()})
+    if not terms:
+        return {}
+    with _lock:
+        conn = connect_db()
+        try:
+            scanned = set()
+            for part in _chunks(terms):
+                scanned.update(r[0] for r in conn.execute(
+                    f"SELECT term_pl FROM term_scans WHERE lang = ? AND term_pl IN ({','.join('?' * len(part))})",
+                    (lang_code, *part),
+                ))
+            missing = [t for t in terms if t not in scanned]
+            if missing:
+                superseded = {r[0] for r in conn.execute(
+                    "SELECT filename FROM translations WHERE lang = ? AND superseded_by IS NOT NULL", (lang_code,)
+                )}
+                rows = [
+                    (lang_code, t, filename)
+                    for filename, text in iter_archive_records(lang_code) if filename not in superseded
+                    for t in matched_terms(parse_archive_txt(text)["source"], missing)
+                ]
+                conn.executemany("INSERT OR IGNORE INTO translation_terms (lang, term_pl, filename) VALUES (?, ?, ?)", rows)
+                conn.executemany("INSERT OR IGNORE INTO term_scans (lang, term_pl) VALUES (?, ?)",
+                                 [(lang_code, t) for t in missing])
+                conn.commit()
+
+            affected: Dict[str, List[str]] = {}
+            for part in _chunks(terms):
+                # zastąpione rekordy nie mają wierszy w indeksie, ale filtr chroni też przed starszymi danymi
+                for term, filename in conn.execute(
+                    f"SELECT tt.term_pl, tt.filename FROM translation_terms tt"
+                    f" LEFT JOIN translations t ON t.lang = tt.lang AND t.filename = tt.filename"
+                    f" WHERE tt.lang = ? AND t.superseded_by IS NULL"
+                    f" AND tt.term_pl IN ({','.join('?' * len(part))})",
+                    (lang_code, *part),
+                ):
+                    affected.setdefault(filename, []).append(term)
+        finally:
+            conn.close()
+    return affected
+
+
+def forget_term_scans(lang_code: str, terms: List[str]) -> None:
+    """Termin usunięty z glossary (albo bez term_target) — przy powrocie trzeba go znów dopasować do archiwum."""
+    terms = sorted({t.strip().lower() for t in terms if t and t.strip()})
+    if not terms:
+        return
+    with _lock:
+        conn = connect_db()
+        try:
+            conn.executemany("DELETE FROM term_scans WHERE lang = ? AND term_pl = ?", [(lang_code, t) for t in terms])
+            conn.commit()
+        finally:
+            conn.close()
+
+
+def read_archive_text(lang_code: str, filename: str) -> Optional[str]:
+    """Treść rekordu (format TXT) — z segmentu (seek po offsecie z indeksu) albo z pliku TXT."""
+    conn = connect_db()
+    try:
+        row = conn.execute(
+            "SELECT segment, seg_offset, seg_length FROM translations WHERE lang = ? AND filename = ?",
+            (lang_code, filename),
+        ).fetchone()
+    finally:
+        conn.close()
+    lang_dir = os.path.join(BASE_DIR, lang_code)
+    if row is not None and row["segment"]:
+        return archive_segments.read_record(lang_dir, row["segment"], row["seg_offset"], row["seg_length"])
+    path = archive_file_path(lang_code, filename)
+    if os.path.exists(path):
+        with open(path, "r", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    return None
+
+
+def quality_summary() -> List[dict]:
+    """Liczba tłumaczeń per język i verdict + średnia confidence (z indeksu, bez czytania TXT)."""
+    conn = connect_db()
+    try:
+        rows = conn.execute(
+            "SELECT lang, COALESCE(verdict, '?') AS verdict, COUNT(*) AS translations,"
+            " ROUND(AVG(confidence), 1) AS avg_confidence, SUM(issues_count) AS issues,"
+            " SUM(CASE WHEN qa_passed = 0 THEN 1 ELSE 0 END) AS qa_failed"
+            " FROM translations GROUP BY lang, COALESCE(verdict, '?') ORDER BY lang, verdict"
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(r) for r in rows]
+
+
+# kolumny, po których Archive może sortować (ORDER BY budowany tylko z tej listy)
+SORT_COLUMNS = ("datetime", "title_pl", "provider", "verdict", "confidence", "issues_count")
+
+
+def archive_file_path(lang_code: str, filename: str) -> str:
+    return os.path.join(BASE_DIR, lang_code, os.path.basename(filename))
+
+
+def ensure_indexed(lang_code: str) -> None:
+    """Archiwum sprzed archive.db (są pliki TXT, brak wierszy w bazie) — jednorazowy reindex języka."""
+    conn = connect_db()
+    try:
+        has_rows = conn.execute("SELECT 1 FROM translations WHERE lang = ? LIMIT 1", (lang_code,)).fetchone()
+    finally:
+        conn.close()
+    if not has_rows and os.path.isdir(os.path.join(BASE_DIR, lang_code)):
+        reindex([lang_code])
+
+
+def lang_overview(lang_code: str) -> dict:
+    """Liczba tłumaczeń, ostatnia data i providerzy dla języka (z indeksu)."""
+    conn = connect_db()
+    try:
+        row = conn.execute(
+            "SELECT COUNT(*) AS count, MAX(datetime) AS last_dt FROM translations WHERE lang = ?", (lang_code,)
+        ).fetchone()
+        providers = [r[0] for r in conn.execute(
+            "SELECT DISTINCT provider FROM translations WHERE lang = ? AND provider IS NOT NULL ORDER BY provider",
+            (lang_code,),
+        )]
+    finally:
+        conn.close()
+    return {"count": row["count"], "last_dt": row["last_dt"], "providers": providers}
+
+
+def _index_filter(lang_code: str, search: str = "", verdicts: Optional[List[str]] = None,
+                  provider: Optional[str] = None) -> Tuple[str, list]:
+    where, args = ["lang = ?"], [lang_code]
+    if search.strip():
+        where.append("(title_pl LIKE ? OR filename LIKE ?)")
+        args += [f"%{search.strip()}%"] * 2
+    if verdicts:
+        where.append(f"COALESCE(verdict, '?') IN ({', '.join('?' * len(verdicts))})")
+        args += list(verdicts)
+    if provider:
+        where.append("provider = ?")
+        args.append(provider)
+    return " AND ".join(where), args
+
+
+def count_index(lang_code: str, search: str = "", verdicts: Optional[List[str]] = None,
+                provider: Optional[str] = None) -> int:
+    where, args = _index_filter(lang_code, search, verdicts, provider)
+    conn = connect_db()
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM translations WHERE {where}", args).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def query_index(
+    lang_code: str,
+    search: str = "",
+    verdicts: Optional[List[str]] = None,
+    provider: Optional[str] = None,
+    sort: str = "datetime",
+    descending: bool = True,
+    limit: int = 50,
+    offset: int = 0,
+) -> List[dict]:
+    """Jedna strona indeksu języka — filtry, sortowanie i LIMIT/OFFSET po stronie SQLite."""
+    where, args = _index_filter(lang_code, search, verdicts, provider)
+    sort = sort if sort in SORT_COLUMNS else "datetime"
+    order = "DESC" if descending else "ASC"
+    conn = connect_db()
+    try:
+        rows = conn.execute(
+            f"SELECT datetime, title_pl, provider, review_model, verdict, confidence, issues_count, qa_passed, filename"
+            f" FROM translations WHERE {where} ORDER BY {sort} {order}, id {order} LIMIT ? OFFSET ?",
+            (*args, limit, offset),
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(r) for r in rows]
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "reindex":
+        print(f"Zaindeksowano rekordów: {reindex(sys.argv[2:] or None)}")
+    elif len(sys.argv) > 1 and sys.argv[1] == "compact":
+        print(f"Przeniesiono do segmentów plików TXT: {compact(sys.argv[2:] or None)}")
+    else:
+        print("Użycie: python translations_archive.py reindex|compact [lang ...]")
@@ -0,0 +1,361 @@
+"""
+Tryb worker pool dla dużych przebiegów: N procesów pobiera zadania z lokalnej kolejki SQLite
+(data/workers/queue.db), tłumaczy (translate_and_review) i zapisuje wyniki do wspólnego archiwum.
+Wywołania LLM ograniczane są wspólnym dla wszystkich procesów token bucketem per provider.
+
+Uruchomienie:
+    python worker_pool.py start -n 4        # 4 procesy, działają aż kolejka będzie pusta
+    python worker_pool.py start -n 4 --wait # ... i czekają na nowe zadania
+    python worker_pool.py stats
+
+ENV (limity per provider, zapytania na minutę; 0 = bez limitu):
+    WORKER_RPM_OPENAI, WORKER_RPM_GEMINI, WORKER_RPM_QWEN, WORKER_RPM_MOCK
+    WORKER_BURST        pojemność kubełka (domyślnie 5)
+    WORKER_CLAIM_TIMEOUT_S  po ilu sekundach zadanie zajęte przez martwy proces wraca do kolejki (600)
+    WORKER_HEARTBEAT_S      co ile sekund `start` odświeża swój wpis w tabeli pools (5; 6x dłużej = martwy)
+"""
+import argparse
+import multiprocessing
+import os
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional, Tuple
+
+from common import build_source
+
+QUEUE_DIR = os.path.join("data", "workers")
+QUEUE_DB = os.path.join(QUEUE_DIR, "queue.db")
+
+DEFAULT_RPM = {"openai": 500, "gemini": 150, "qwen": 300, "mock": 0}
+
+_launch_lock = threading.Lock()
+
+
+def _connect() -> sqlite3.Connection:
+    os.makedirs(QUEUE_DIR, exist_ok=True)
+    # isolation_level=None: transakcje sterowane ręcznie (BEGIN IMMEDIATE = blokada zapisu między procesami)
+    conn = sqlite3.connect(QUEUE_DB, timeout=60, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS tasks ("
+        " id INTEGER PRIMARY KEY AUTOINCREMENT, batch_id TEXT NOT NULL, lang TEXT NOT NULL, label TEXT NOT NULL,"
+        " title_pl TEXT, source TEXT NOT NULL, provider TEXT NOT NULL, context TEXT, temperature REAL NOT NULL,"
+        " status TEXT NOT NULL DEFAULT 'queued', worker TEXT, claimed_at REAL, attempts INTEGER NOT NULL DEFAULT 0,"
+        " filename TEXT, error TEXT, elapsed_s REAL, created REAL NOT NULL, finished REAL)"
+    )
+    # kolumny dodane później — starsze kolejki uzupełniamy w miejscu
+    cols = {r[1] for r in conn.execute("PRAGMA table_info(tasks)")}
+    if "replaces" not in cols:
+        conn.execute("ALTER TABLE tasks ADD COLUMN replaces TEXT")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_replaces ON tasks(replaces)")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, id)")
+    conn.execute("CREATE TABLE IF NOT EXISTS buckets (provider TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+    # działające `start` (także z launch): ile procesów-workerów ma dany proces nadrzędny, heartbeat co kilka s
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS pools (host TEXT NOT NULL, pid INTEGER NOT NULL, workers INTEGER NOT NULL,"
+        " heartbeat REAL NOT NULL, PRIMARY KEY (host, pid))"
+    )
+    return conn
+
+
+# -------------------------
+# Token bucket (wspólny dla procesów)
+# -------------------------
+
+def provider_rpm(provider: str) -> float:
+    raw = os.environ.get(f"WORKER_RPM_{provider.upper()}")
+    try:
+        return float(raw) if raw else float(DEFAULT_RPM.get(provider, 0))
+    except ValueError:
+        return float(DEFAULT_RPM.get(provider, 0))
+
+
+def acquire(provider: str, conn: Optional[sqlite3.Connection] = None) -> float:
+    """Blokuje do czasu wolnego tokenu dla providera. Zwraca czas oczekiwania w s."""
+    rpm = provider_rpm(provider)
+    if rpm <= 0:
+        return 0.0
+    rate = rpm / 60.0
+    burst = max(1.0, float(os.environ.get("WORKER_BURST") or 5))
+    own = conn is None
+    conn = conn or _connect()
+    waited = 0.0
+    try:
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            now = time.time()
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE provider = ?", (provider,)).fetchone()
+            tokens = burst if row is None else min(burst, row["tokens"] + (now - row["updated"]) * rate)
+            if tokens >= 1.0:
+                conn.execute("INSERT OR REPLACE INTO buckets (provider, tokens, updated) VALUES (?, ?, ?)",
+                             (provider, tokens - 1.0, now))
+                conn.execute("COMMIT")
+                return waited
+            conn.execute("INSERT OR REPLACE INTO buckets (provider, tokens, updated) VALUES (?, ?, ?)",
+                         (provider, tokens, now))
+            conn.execute("COMMIT")
+            delay = (1.0 - tokens) / rate
+            time.sleep(delay)
+            waited += delay
+    finally:
+        if own:
+            conn.close()
+
+
+# -------------------------
+# Kolejka
+# -------------------------
+
+def enqueue(
+    samples: List[dict],
+    langs: List[Tuple[str, str]],
+    provider: str,
+    context: str = "",
+    temperature: float = 0.2,
+) -> str:
+    """
+    samples: [{"name": ..., "body": ...}] albo [{"name": ..., "source": ...}] (gotowy tekst NAME/BODY,
+    np. ponowne tłumaczenie z archiwum; opcjonalnie "replaces" — filename zastępowanego rekordu archiwum),
+    langs: [(code, label)]. Zwraca batch_id.
+    """
+    batch_id = f"pool-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+    now = time.time()
+    rows = [
+        (batch_id, code, label, s.get("name", ""), s.get("source") or build_source(s.get("name", ""), s.get("body", "")),
+         provider, context, temperature, s.get("replaces"), now)
+        for code, label in langs for s in samples
+    ]
+    conn = _connect()
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.executemany(
+            "INSERT INTO tasks (batch_id, lang, label, title_pl, source, provider, context, temperature, replaces,"
+            " created) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows,
+        )
+        conn.execute("COMMIT")
+    finally:
+        conn.close()
+    return batch_id
+
+
+def claim(conn: sqlite3.Connection, worker: str) -> Optional[sqlite3.Row]:
+    """Atomowo zajmuje najstarsze wolne zadanie (także porzucone przez martwy proces)."""
+    timeout = float(os.environ.get("WORKER_CLAIM_TIMEOUT_S") or 600)
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute(
+            "SELECT id FROM tasks WHERE status = 'queued' OR (status = 'claimed' AND claimed_at < ?)"
+            " ORDER BY id LIMIT 1", (now - timeout,),
+        ).fetchone()
+        if row is None:
+            conn.execute("COMMIT")
+            return None
+        task = conn.execute(
+            "UPDATE tasks SET status = 'claimed', worker = ?, claimed_at = ?, attempts = attempts + 1"
+            " WHERE id = ? RETURNING *", (worker, now, row["id"]),
+        ).fetchone()
+        conn.execute("COMMIT")
+        return task
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _finish(conn: sqlite3.Connection, task_id: int, **fields) -> None:
+    fields["finished"] = time.time()
+    sets = ", ".join(f"{k} = ?" for k in fields)
+    conn.execute(f"UPDATE tasks SET {sets} WHERE id = ?", (*fields.values(), task_id))
+
+
+def replacement_status(lang: str, filenames: List[str]) -> Dict[str, dict]:
+    """Najnowsze zadanie ponownego tłumaczenia per zastępowany rekord: {filename: {"status", "error"}}."""
+    out: Dict[str, dict] = {}
+    if not filenames:
+        return out
+    conn = _connect()
+    try:
+        for i in range(0, len(filenames), 500):
+            part = filenames[i:i + 500]
+            for r in conn.execute(
+                f"SELECT replaces, status, error FROM tasks WHERE lang = ? AND replaces IN ({','.join('?' * len(part))})"
+                f" ORDER BY id", (lang, *part),
+            ):
+                out[r["replaces"]] = {"status": r["status"], "error": r["error"]}
+    finally:
+        conn.close()
+    return out
+
+
+def queue_stats(batch_id: Optional[str] = None) -> List[dict]:
+    conn = _connect()
+    try:
+        where, args = ("WHERE batch_id = ?", (batch_id,)) if batch_id else ("", ())
+        rows = conn.execute(
+            f"SELECT batch_id, provider, COUNT(*) AS tasks,"
+            f" SUM(status = 'queued') AS queued, SUM(status = 'claimed') AS running,"
+            f" SUM(status = 'done') AS done, SUM(status = 'failed') AS failed,"
+            f" ROUND(AVG(elapsed_s), 2) AS avg_s, MIN(created) AS created, MAX(finished) AS finished"
+            f" FROM tasks {where} GROUP BY batch_id, provider ORDER BY created DESC", args,
+        ).fetchall()
+    finally:
+        conn.close()
+    return [dict(r) for r in rows]
+
+
+# -------------------------
+# Worker
+# -------------------------
+
+def work(wait: bool = False, poll_s: float = 2.0, max_tasks: Optional[int] = None) -> int:
+    """Pętla jednego procesu. Zwraca liczbę wykonanych zadań."""
+    import llm_providers
+    from translation_pipeline import translate_and_review
+    from translations_archive import save_translation
+
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    conn = _connect()
+    # każde wywołanie LLM w tym procesie (tłumaczenie i review) czeka na token swojego providera
+    llm_providers.set_rate_limiter(acquire)
+    done = 0
+    try:
+        while max_tasks is None or done < max_tasks:
+            task = claim(conn, worker)
+            if task is None:
+                if not wait:
+                    break
+                time.sleep(poll_s)
+                continue
+            started = time.perf_counter()
+            try:
+                res = translate_and_review(
+                    task["source"], lang=task["lang"], label=task["label"], provider=task["provider"],
+                    context=task["context"] or "", temperature=task["temperature"],
+                )
+                filename = save_translation(
+                    task["lang"], task["label"], res["provider"], task["source"], res["translation"], res["review"],
+                    title_pl=task["title_pl"] or "", review_model=res["review_model"],
+                    review_parsed=res["review_parsed"], qa=res["qa"], terms=res["matched_terms"],
+                    replaces=task["replaces"],
+                )
+                _finish(conn, task["id"], status="done", filename=filename, error=None,
+                        elapsed_s=round(time.perf_counter() - started, 2))
+            except Exception as e:
+                _finish(conn, task["id"], status="failed", error=f"{type(e).__name__}: {e}"[:500],
+                        elapsed_s=round(time.perf_counter() - started, 2))
+            done += 1
+    finally:
+        llm_providers.set_rate_limiter(None)
+        conn.close()
+    return done
+
+
+def _work_entry(wait: bool) -> None:
+    work(wait=wait)
+
+
+def _heartbeat_s() -> float:
+    return max(1.0, float(os.environ.get("WORKER_HEARTBEAT_S") or 5))
+
+
+def _register_pool(conn: sqlite3.Connection, pid: int, workers: int) -> None:
+    conn.execute("INSERT OR REPLACE INTO pools (host, pid, workers, heartbeat) VALUES (?, ?, ?, ?)",
+                 (socket.gethostname(), pid, workers, time.time()))
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def live_workers() -> int:
+    """Procesy-workery działające teraz (wszystkie hosty z tą samą kolejką); martwe wpisy są usuwane."""
+    host = socket.gethostname()
+    stale_before = time.time() - 6 * _heartbeat_s()
+    conn = _connect()
+    try:
+        live, dead = 0, []
+        for r in conn.execute("SELECT host, pid, workers, heartbeat FROM pools").fetchall():
+            if r["heartbeat"] < stale_before or (r["host"] == host and not _pid_alive(r["pid"])):
+                dead.append((r["host"], r["pid"]))
+            else:
+                live += r["workers"]
+        if dead:
+            conn.executemany("DELETE FROM pools WHERE host = ? AND pid = ?", dead)
+    finally:
+        conn.close()
+    return live
+
+
+def start(n: int, wait: bool = False) -> None:
+    """Uruchamia n procesów (spawn) i czeka na ich zakończenie; liczba żywych workerów trafia do tabeli pools."""
+    ctx = multiprocessing.get_context("spawn")
+    procs = [ctx.Process(target=_work_entry, args=(wait,), name=f"translate-worker-{i}") for i in range(n)]
+    for p in procs:
+        p.start()
+    conn = _connect()
+    try:
+        while True:
+            procs = [p for p in procs if p.is_alive()]
+            _register_pool(conn, os.getpid(), len(procs))
+            if not procs:
+                break
+            procs[0].join(_heartbeat_s())
+    finally:
+        conn.execute("DELETE FROM pools WHERE host = ? AND pid = ?", (socket.gethostname(), os.getpid()))
+        conn.close()
+
+
+def launch(n: int) -> int:
+    """
+    Dopełnia pulę do n procesów w tle, poza procesem wołającym (Streamlit) — kończą po opróżnieniu kolejki.
+    Już działające workery (tabela pools) się liczą: drugi launch przy pracującej puli nic nie startuje.
+    Zwraca liczbę uruchomionych procesów.
+    """
+    with _launch_lock:
+        missing = int(n) - live_workers()
+        if missing <= 0:
+            return 0
+        proc = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "start", "-n", str(missing)],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True,
+        )
+        # wpis od razu — `start` nadpisze go po uruchomieniu workerów; bez tego szybki drugi launch by nie wiedział
+        conn = _connect()
+        try:
+            _register_pool(conn, proc.pid, missing)
+        finally:
+            conn.close()
+    return missing
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Worker pool tłumaczeń (kolejka SQLite, wspólne limity per provider).")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p_start = sub.add_parser("start")
+    p_start.add_argument("-n", "--workers", type=int, default=os.cpu_count() or 2)
+    p_start.add_argument("--wait", action="store_true", help="nie kończ po opróżnieniu kolejki")
+    sub.add_parser("stats")
+    args = ap.parse_args()
+
+    if args.cmd == "start":
+        started = time.perf_counter()
+        start(args.workers, wait=args.wait)
+        print(f"Zakończono w {time.perf_counter() - started:.1f} s")
+    for row in queue_stats():
+        print(row)
+
+
+if __name__ == "__main__":
+    main()